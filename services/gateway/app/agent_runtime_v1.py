@@ -13,7 +13,7 @@ from fastapi import HTTPException, Request
 
 from app.backends import backend_provider_name
 from app.config import S, logger
-from app.models import AgentRunRequest, AgentSpecModel, ChatCompletionRequest, ChatMessage, ToolFunction, ToolSpec
+from app.models import AgentRunRequest, AgentSpecModel, ChatCompletionRequest, ChatMessage, ToolFunction, ToolSpec, dump_messages
 from app.openai_utils import new_id, now_unix
 from app.router import decide_route
 from app.router_cfg import router_cfg
@@ -323,7 +323,7 @@ async def run_agent_v1(*, req: Request, run_req: AgentRunRequest) -> Tuple[Dict[
         cfg=router_cfg(),
         request_model=spec.model,
         headers=hdrs,
-        messages=[m.model_dump(exclude_none=True) for m in messages],
+        messages=dump_messages(messages),
         has_tools=bool(tools),
         enable_policy=getattr(S, "ROUTER_ENABLE_POLICY", True),
         enable_request_type=getattr(S, "ROUTER_ENABLE_REQUEST_TYPE", False),
@@ -340,7 +340,7 @@ async def run_agent_v1(*, req: Request, run_req: AgentRunRequest) -> Tuple[Dict[
                 {
                     "agent": run_req.agent,
                     "spec": spec.model_dump(),
-                    "messages": [m.model_dump(exclude_none=True) for m in messages],
+                    "messages": dump_messages(messages),
                     "backend": backend,
                     "upstream_model": upstream_model,
                 }
@@ -35,7 +35,7 @@ class BackendConfig:
     base_url: str
     description: str
     supported_capabilities: List[RouteKind]
-    concurrency_limits: Dict[RouteKind, int]
+    concurrency_limits: Dict[RouteKind, Optional[int]]
     health_liveness: str
     health_readiness: str
     payload_policy: Dict[str, Any]
@@ -44,8 +44,8 @@ class BackendConfig:
         """Check if this backend supports the given route kind."""
         return route_kind in self.supported_capabilities
 
-    def get_limit(self, route_kind: RouteKind) -> int:
-        """Get concurrency limit for a route kind."""
+    def get_limit(self, route_kind: RouteKind) -> Optional[int]:
+        """Get concurrency limit for a route kind; None means unbounded."""
         return self.concurrency_limits.get(route_kind, 1)
 
 
@@ -374,6 +374,7 @@ async def refresh_registry_from_etcd() -> None:
         except Exception as exc:
             logger.warning("etcd registry refresh failed: %s: %s", type(exc).__name__, exc)
     _apply_service_records(registry, service_records)
+    _bump_registry_generation()
     if _admission is not None:
         _admission.sync_registry(registry)
 
@@ -462,75 +463,84 @@ def _capability_availability(route_kind: RouteKind) -> Dict[str, Any]:
     }
 
 
+def _is_unbounded_limit(limit: Any) -> bool:
+    """A null (or infinite) concurrency limit disables admission gating."""
+    return limit is None or limit == float("inf")
+
+
 class AdmissionController:
-    """Enforces concurrency limits with semaphore-based admission control.
+    """Enforces concurrency limits with per-pair inflight counters.
 
     Tracks inflight requests per (backend_class, route_kind) pair.
     Returns 429 immediately when limit is exceeded (no queueing).
+    Pairs configured with a null limit are unbounded and skip gating entirely;
+    numeric limits below 1 are clamped to 1.
     """
 
     def __init__(self, registry: BackendRegistry):
         self.registry = registry
-        # Semaphores keyed by (backend_class, route_kind)
-        self._semaphores: Dict[tuple[str, RouteKind], asyncio.Semaphore] = {}
-        # Locks to make admission checks atomic per backend/route
-        self._locks: Dict[tuple[str, RouteKind], asyncio.Lock] = {}
-        self._init_semaphores()
-
-    def _init_semaphores(self):
-        """Initialize semaphores for all backend/route combinations."""
+        # Concurrency limit and current inflight count keyed by (backend_class, route_kind)
+        self._limits: Dict[tuple[str, RouteKind], int] = {}
+        self._inflight: Dict[tuple[str, RouteKind], int] = {}
+        # Pairs without a concurrency limit; acquire/release are no-ops for these.
+        self._unbounded: set[tuple[str, RouteKind]] = set()
+        self._init_limits()
+
+    def _init_limits(self):
+        """Initialize limits for all backend/route combinations."""
         for backend_class, config in self.registry.backends.items():
             for route_kind in config.supported_capabilities:
                 limit = config.get_limit(route_kind)
                 key = (backend_class, route_kind)
-                self._semaphores[key] = asyncio.Semaphore(limit)
-                setattr(self._semaphores[key], "_initial_value", limit)  # type: ignore[attr-defined]
-                self._locks[key] = asyncio.Lock()
+                if _is_unbounded_limit(limit):
+                    self._unbounded.add(key)
+                    logger.info(f"Admission control: {backend_class}.{route_kind} limit=unbounded")
+                    continue
+                limit = max(1, int(limit))
+                self._limits[key] = limit
+                self._inflight[key] = 0
                 logger.info(
                     f"Admission control: {backend_class}.{route_kind} limit={limit}"
                 )
 
     def sync_registry(self, registry: BackendRegistry) -> None:
         self.registry = registry
-        next_semaphores: Dict[tuple[str, RouteKind], asyncio.Semaphore] = {}
-        next_locks: Dict[tuple[str, RouteKind], asyncio.Lock] = {}
+        next_limits: Dict[tuple[str, RouteKind], int] = {}
+        next_inflight: Dict[tuple[str, RouteKind], int] = {}
+        next_unbounded: set[tuple[str, RouteKind]] = set()
         for backend_class, config in self.registry.backends.items():
             for route_kind in config.supported_capabilities:
                 key = (backend_class, route_kind)
-                limit = max(1, config.get_limit(route_kind))
-                sem = self._semaphores.get(key)
-                current_limit = getattr(sem, "_initial_value", None) if sem is not None else None  # type: ignore[attr-defined]
-                if sem is None or current_limit != limit:
-                    sem = asyncio.Semaphore(limit)
-                    setattr(sem, "_initial_value", limit)  # type: ignore[attr-defined]
-                next_semaphores[key] = sem
-                next_locks[key] = self._locks.get(key) or asyncio.Lock()
-        self._semaphores = next_semaphores
-        self._locks = next_locks
-
-    def _get_semaphore(
-        self, backend_class: str, route_kind: RouteKind
-    ) -> Optional[asyncio.Semaphore]:
-        """Get semaphore for a backend/route pair."""
+                limit = config.get_limit(route_kind)
+                if _is_unbounded_limit(limit):
+                    next_unbounded.add(key)
+                    continue
+                next_limits[key] = max(1, int(limit))
+                # Requests admitted before the reload still hold their slot,
+                # even if the limit changed.
+                next_inflight[key] = self._inflight.get(key, 0)
+        self._limits = next_limits
+        self._inflight = next_inflight
+        self._unbounded = next_unbounded
+
+    def _key(self, backend_class: str, route_kind: RouteKind) -> tuple[str, RouteKind]:
+        """Key for a backend/route pair."""
         # Resolve legacy names
-        actual_class = self.registry.resolve_backend_class(backend_class)
-        return self._semaphores.get((actual_class, route_kind))
+        return (self.registry.resolve_backend_class(backend_class), route_kind)
 
-    def _get_lock(self, backend_class: str, route_kind: RouteKind) -> Optional[asyncio.Lock]:
-        """Get lock for a backend/route pair."""
-        actual_class = self.registry.resolve_backend_class(backend_class)
-        return self._locks.get((actual_class, route_kind))
+    def try_acquire_nowait(self, backend_class: str, route_kind: RouteKind) -> bool:
+        """Take a slot synchronously if one is free; False when at capacity.
 
-    async def acquire(self, backend_class: str, route_kind: RouteKind):
-        """Acquire a slot for the request. Raises HTTPException 429 if overloaded.
-
-        This is a non-blocking check - if the semaphore is at capacity,
-        we immediately fail rather than waiting.
+        The check and increment run without an await in between, so they
+        cannot be interleaved with another acquire on the event loop.
+        Raises HTTPException 400 if the backend doesn't support the route.
         """
-        sem = self._get_semaphore(backend_class, route_kind)
-        lock = self._get_lock(backend_class, route_kind)
-        if sem is None:
-            # No semaphore means this backend doesn't support this route
+        key = self._key(backend_class, route_kind)
+        if key in self._unbounded:
+            return True
+        limit = self._limits.get(key)
+        if limit is None:
+            # No limit means this backend doesn't support this route
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -541,47 +551,50 @@ class AdmissionController:
                     **_capability_availability(route_kind),
                 },
             )
+        inflight = self._inflight.get(key, 0)
+        if inflight >= limit:
+            return False
+        self._inflight[key] = inflight + 1
+        return True
 
-        if lock is None:
-            await sem.acquire()
-            return
-
-        # Try to acquire without blocking, guarding against race conditions.
-        async with lock:
-            if sem._value == 0:
-                # Semaphore is at capacity
-                raise HTTPException(
-                    status_code=429,
-                    detail={
-                        "error": "backend_overloaded",
-                        "backend_class": backend_class,
-                        "route_kind": route_kind,
-                        "message": f"Backend {backend_class} is at capacity for {route_kind} requests",
-                    },
-                    headers={"Retry-After": "5"},
-                )
+    async def acquire(self, backend_class: str, route_kind: RouteKind):
+        """Acquire a slot for the request. Raises HTTPException 429 if overloaded.
 
-            await sem.acquire()
+        This is a non-blocking check - if the pair is at capacity,
+        we immediately fail rather than waiting.
+        """
+        if self.try_acquire_nowait(backend_class, route_kind):
+            return
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "backend_overloaded",
+                "backend_class": backend_class,
+                "route_kind": route_kind,
+                "message": f"Backend {backend_class} is at capacity for {route_kind} requests",
+            },
+            headers={"Retry-After": "5"},
+        )
 
     def release(self, backend_class: str, route_kind: RouteKind):
         """Release a slot after request completes."""
-        sem = self._get_semaphore(backend_class, route_kind)
-        if sem is not None:
-            sem.release()
+        key = self._key(backend_class, route_kind)
+        inflight = self._inflight.get(key, 0)
+        if inflight > 0:
+            self._inflight[key] = inflight - 1
 
     def get_stats(self) -> Dict[str, Any]:
         """Get current admission control statistics."""
-        stats = {}
-        for (backend_class, route_kind), sem in self._semaphores.items():
+        stats: Dict[str, Any] = {}
+        for backend_class, route_kind in self._unbounded:
+            stats[f"{backend_class}.{route_kind}"] = {"limit": None, "unbounded": True}
+        for (backend_class, route_kind), limit in self._limits.items():
             key = f"{backend_class}.{route_kind}"
-            # Use _value for available, calculate limit from initial config
-            config = self.registry.get_backend(backend_class)
-            limit = config.get_limit(route_kind) if config else 1
-            available = sem._value
+            inflight = self._inflight.get((backend_class, route_kind), 0)
             stats[key] = {
                 "limit": limit,
-                "available": available,
-                "inflight": limit - available,
+                "available": max(0, limit - inflight),
+                "inflight": inflight,
             }
         return stats
 
@@ -723,6 +736,19 @@ def _default_registry() -> BackendRegistry:
 # Global registry and admission controller
 _registry: Optional[BackendRegistry] = None
 _admission: Optional[AdmissionController] = None
+# Bumped whenever the registry contents may have changed; callers can key
+# caches of registry-derived values on it.
+_registry_generation = 0
+
+
+def _bump_registry_generation() -> None:
+    global _registry_generation
+    _registry_generation += 1
+
+
+def registry_generation() -> int:
+    """Return a counter that changes whenever the backend registry is reloaded."""
+    return _registry_generation
 
 
 def init_backends():
@@ -730,6 +756,7 @@ def init_backends():
     global _registry, _admission
     _registry = load_backends_config()
     _admission = AdmissionController(_registry)
+    _bump_registry_generation()
     logger.info("Backend registry and admission control initialized")
 
 
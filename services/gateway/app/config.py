@@ -110,6 +110,10 @@ class Settings(BaseSettings):
     USER_DB_PATH: str = "/var/lib/gateway/data/users.sqlite"
     USER_SESSION_TTL_SEC: int = 60 * 60 * 12  # 12 hours
     USER_SESSION_COOKIE: str = "gateway_session"
+    # PBKDF2 implementation for password hashes. "hashlib" uses the OpenSSL Python links
+    # against (logged at startup); "cryptography" uses that package's OpenSSL build instead,
+    # for images whose libcrypto lacks SHA extensions. Hashes are identical either way.
+    USER_PASSWORD_KDF_BACKEND: Literal["hashlib", "cryptography"] = "hashlib"
 
     # Images (text-to-image)
     # Default backend is "mock" which returns an SVG placeholder.
@@ -184,6 +188,12 @@ class Settings(BaseSettings):
     # Optional: LightOnOCR shim
     LIGHTON_OCR_API_BASE_URL: str = ""
     LIGHTON_OCR_TIMEOUT_SEC: float = 120.0
+    LIGHTON_OCR_TTL_SEC: float = 3600.0  # OCR result cache per image URL
+    # Images whose HEAD Content-Length exceeds this are rejected before OCR (0 disables the preflight).
+    LIGHTON_OCR_MAX_BYTES: int = 20_000_000
+    # Disk budget for source images the gateway downloads once and sends to the
+    # shim as base64 (revalidated by ETag); 0 lets the shim fetch the URL itself.
+    LIGHTON_OCR_IMAGE_CACHE_BYTES: int = 0
     OCR_BACKEND_CLASS: str = "lighton_ocr"
 
     # Optional: PersonaPlex chat shim (custom UI)
@@ -307,6 +317,12 @@ class Settings(BaseSettings):
 
     EMBEDDINGS_BACKEND: str = "local_vllm_embeddings"
     EMBEDDINGS_MODEL: str = ""
+    # Larger embedding requests are split into batches of this many texts,
+    # sent at most EMBEDDINGS_CONCURRENCY at a time.
+    EMBEDDINGS_BATCH_SIZE: int = 64
+    EMBEDDINGS_CONCURRENCY: int = 8
+    # Memory-path embeddings kept in-process by (backend, model, text); 0 disables.
+    EMBEDDINGS_CACHE_SIZE: int = 2048
 
     MEMORY_ENABLED: bool = True
     MEMORY_DB_PATH: str = "/var/lib/gateway/data/memory.sqlite"
@@ -13,7 +13,7 @@ from app.config import S
 from app.health_checker import check_backend_ready
 from app.memory_routes import inject_memory
 from app.model_aliases import get_aliases
-from app.models import ChatCompletionRequest, ChatMessage, CoordinatorRunRequest
+from app.models import ChatCompletionRequest, ChatMessage, CoordinatorRunRequest, dump_messages
 from app.openai_utils import new_id, now_unix
 from app.router import _is_probably_coding_request, decide_route
 from app.router_cfg import router_cfg
@@ -119,7 +119,7 @@ def _default_participants(messages: Sequence[ChatMessage]) -> list[str]:
 
     selected.extend(defaults)
 
-    raw_messages = [m.model_dump(exclude_none=True) for m in messages]
+    raw_messages = dump_messages(messages)
     if bool(getattr(S, "COORDINATOR_INCLUDE_CODER_ON_CODE", True)) and _is_probably_coding_request(raw_messages):
         for candidate in ("coder",):
             if candidate in aliases:
@@ -171,7 +171,7 @@ async def _call_coordinator_model(
         cfg=router_cfg(),
         request_model=request_model,
         headers={},
-        messages=[m.model_dump(exclude_none=True) for m in messages],
+        messages=dump_messages(messages),
         has_tools=False,
         enable_policy=False,
     )
@@ -274,7 +274,7 @@ async def run_coordinator_v1(*, req: Request, run_req: CoordinatorRunRequest) ->
     request_hash = _sha256_hex(
         _canonical_json(
             {
-                "messages": [m.model_dump(exclude_none=True) for m in messages],
+                "messages": dump_messages(messages),
                 "participants": participants,
                 "synthesizer": synthesizer,
                 "participant_prompt": run_req.participant_prompt,
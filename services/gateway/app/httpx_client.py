@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
 
 import httpx
@@ -7,12 +8,7 @@ import httpx
 from app.config import S
 
 
-@asynccontextmanager
-async def httpx_client(*, timeout: float | None = None):
-    """Create an httpx.AsyncClient configured by gateway backend TLS settings.
-
-    Honors S.BACKEND_VERIFY_TLS, S.BACKEND_CA_BUNDLE, and S.BACKEND_CLIENT_CERT.
-    """
+def _client_kwargs() -> dict[str, object]:
     kwargs: dict[str, object] = {}
     # verify can be True/False or a path to a CA bundle
     if S.BACKEND_CA_BUNDLE:
@@ -26,6 +22,96 @@ async def httpx_client(*, timeout: float | None = None):
             kwargs["cert"] = parts[0]
         elif len(parts) >= 2:
             kwargs["cert"] = (parts[0], parts[1])
+    return kwargs
+
+
+@asynccontextmanager
+async def httpx_client(*, timeout: float | None = None):
+    """Create an httpx.AsyncClient configured by gateway backend TLS settings.
 
-    async with httpx.AsyncClient(timeout=timeout, **kwargs) as client:
+    Honors S.BACKEND_VERIFY_TLS, S.BACKEND_CA_BUNDLE, and S.BACKEND_CLIENT_CERT.
+    """
+    async with httpx.AsyncClient(timeout=timeout, **_client_kwargs()) as client:
         yield client
+
+
+# Shared keep-alive pools, bound to the app's event loop (httpx pools cannot be
+# used from another loop). Only that loop's thread creates, replaces or closes
+# entries, so the check-then-set below needs no lock; every other loop (e.g.
+# tools_bus running coroutines via asyncio.run in a worker thread) gets a
+# short-lived client from pooled_httpx_client() instead.
+_app_loop: asyncio.AbstractEventLoop | None = None
+_shared_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def init_shared_httpx_clients() -> None:
+    """Bind the shared pools to the running loop; call once from the app lifespan."""
+    global _app_loop
+    _app_loop = asyncio.get_running_loop()
+
+
+def _on_app_loop() -> bool:
+    return _app_loop is not None and asyncio.get_running_loop() is _app_loop
+
+
+def _shared_client(name: str, kwargs: dict[str, object]) -> httpx.AsyncClient:
+    if not _on_app_loop():
+        raise RuntimeError("shared httpx clients are only available on the app event loop; use pooled_httpx_client()")
+    client = _shared_clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=None,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            **kwargs,
+        )
+        _shared_clients[name] = client
+    return client
+
+
+def shared_httpx_client(name: str) -> httpx.AsyncClient:
+    """Return a long-lived, keep-alive client for `name` (same TLS settings as httpx_client).
+
+    Use for hot upstreams to avoid a fresh TCP/TLS handshake per request; pass
+    per-call timeouts on the request itself. Only callable on the app's event
+    loop (after init_shared_httpx_clients()); code that may run on another loop
+    should use pooled_httpx_client(). Closed by close_shared_httpx_clients().
+    """
+    return _shared_client(name, _client_kwargs())
+
+
+_PUBLIC_CLIENT_NAME = "public"
+
+
+def public_httpx_client() -> httpx.AsyncClient:
+    """Return the shared client for fetching user-supplied (third-party) URLs.
+
+    Unlike shared_httpx_client it carries none of the backend TLS settings: the
+    system trust store instead of BACKEND_CA_BUNDLE, and no BACKEND_CLIENT_CERT
+    identity. It never follows redirects on its own; callers must vet each hop.
+    Same event-loop rule as shared_httpx_client.
+    """
+    return _shared_client(_PUBLIC_CLIENT_NAME, {"verify": True, "follow_redirects": False})
+
+
+@asynccontextmanager
+async def pooled_httpx_client(name: str):
+    """Yield the shared client for `name` on the app loop, or a short-lived one anywhere else.
+
+    Sync helpers (e.g. tools_bus) run coroutines via asyncio.run() in worker
+    threads; those must neither touch the app loop's pools nor own shared
+    ones, since nothing would close them when their loop ends.
+    """
+    if _on_app_loop():
+        yield shared_httpx_client(name)
+        return
+    async with httpx.AsyncClient(timeout=None, **_client_kwargs()) as client:
+        yield client
+
+
+async def close_shared_httpx_clients() -> None:
+    global _app_loop
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    _app_loop = None
+    for client in clients:
+        await client.aclose()
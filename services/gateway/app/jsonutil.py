@@ -0,0 +1,26 @@
+"""JSON helpers backed by orjson (a hard dependency, see requirements.txt).
+
+orjson refuses a few inputs stdlib json accepts (non-str dict keys, ints beyond
+64 bits); the dumps helpers fall back to stdlib json for those.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import orjson
+
+loads = orjson.loads
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, non-ASCII left unescaped."""
+    try:
+        return orjson.dumps(obj)
+    except TypeError:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps_bytes(obj).decode("utf-8")
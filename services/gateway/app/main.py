@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
+import ssl
 import time
 
 from fastapi import FastAPI, Request
@@ -20,6 +21,15 @@ from app.model_aliases import get_aliases, get_aliases_state
 from app.tools_bus import router as tools_router
 from app.agent_routes import router as agent_router
 from app.ui_routes import router as ui_router
+from app.httpx_client import close_shared_httpx_clients, init_shared_httpx_clients
+from app.ui_routes import (
+    drain_pending_persists,
+    start_session_gc,
+    start_ui_ttl_sweeper,
+    stop_session_gc,
+    stop_ui_ttl_sweeper,
+    ui_auth_middleware,
+)
 from app.images_routes import router as images_router
 from app.music_routes import router as music_router
 from app import memory_v2
@@ -99,6 +109,7 @@ async def lifespan(_app: FastAPI):
     from app.backends import init_backends, start_registry_sync, stop_registry_sync
     from app.health_checker import init_health_checker, start_health_checker, stop_health_checker
     
+    init_shared_httpx_clients()
     init_backends()
     await start_registry_sync()
     init_health_checker(
@@ -111,15 +122,23 @@ async def lifespan(_app: FastAPI):
         user_store.init_db(S.USER_DB_PATH)
     except Exception as e:
         logger.warning("startup: failed to init user db (%s: %s)", type(e).__name__, e)
+    kdf_backend = user_store.configure_password_kdf(S.USER_PASSWORD_KDF_BACKEND)
+    logger.info("startup: password kdf=%s openssl=%s", kdf_backend, ssl.OPENSSL_VERSION)
     
     # Start background health checking
     await start_health_checker()
+    await start_ui_ttl_sweeper()
+    await start_session_gc()
     
     await _startup_check_models()
     yield
     
     # Stop health checker on shutdown
     await stop_health_checker()
+    await stop_ui_ttl_sweeper()
+    await stop_session_gc()
+    await drain_pending_persists()
+    await close_shared_httpx_clients()
     await stop_registry_sync()
     observability.stop()
 
@@ -131,6 +150,10 @@ app = FastAPI(title="Local AI Gateway", version="0.1", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 
+# Registered first so it runs innermost, after request ids are assigned.
+app.middleware("http")(ui_auth_middleware)
+
+
 @app.middleware("http")
 async def guard_requests(req: Request, call_next):
     try:
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, Iterable, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 
 class ChatMessage(BaseModel):
@@ -13,6 +13,14 @@ class ChatMessage(BaseModel):
     tool_call_id: Optional[str] = None
 
 
+_CHAT_MESSAGES = TypeAdapter(List[ChatMessage])
+
+
+def dump_messages(messages: Iterable[ChatMessage]) -> List[Dict[str, Any]]:
+    """`[m.model_dump(exclude_none=True) for m in messages]` as one serializer call."""
+    return _CHAT_MESSAGES.dump_python(list(messages), exclude_none=True)
+
+
 class ToolFunction(BaseModel):
     name: str
     description: Optional[str] = None
@@ -19,6 +19,7 @@ from app.models import (
     CompletionRequest,
     EmbeddingsRequest,
     RerankRequest,
+    dump_messages,
 )
 from app.openai_utils import new_id, now_unix, sse_done
 from app.model_aliases import get_aliases
@@ -31,6 +32,7 @@ from app.upstreams import (
     call_backend_chat,
     default_embeddings_model_for_backend,
     embed_backend,
+    embed_one_backend,
     stream_backend_chat_as_openai,
 )
 from app.memory_routes import inject_memory
@@ -194,11 +196,12 @@ async def chat_completions(req: Request):
         allowed_tools = None
 
     hdrs = {k.lower(): v for k, v in req.headers.items()}
+    messages_dumped = dump_messages(cc.messages)
     route = decide_route(
         cfg=router_cfg(),
         request_model=cc.model,
         headers=hdrs,
-        messages=[m.model_dump(exclude_none=True) for m in cc.messages],
+        messages=messages_dumped,
         has_tools=bool(cc.tools),
         enable_policy=S.ROUTER_ENABLE_POLICY,
         enable_request_type=getattr(S, "ROUTER_ENABLE_REQUEST_TYPE", False),
@@ -257,7 +260,7 @@ async def chat_completions(req: Request):
             raise HTTPException(status_code=400, detail="stream=true not supported when tools are provided")
 
         if cc.stream:
-            gen = stream_backend_chat_as_openai(cc, backend, model_name)
+            gen = stream_backend_chat_as_openai(cc, backend, model_name, messages_dumped=messages_dumped)
             out = StreamingResponse(gen, media_type="text/event-stream")
             out.headers["X-Backend-Used"] = backend
             out.headers["X-Model-Used"] = model_name
@@ -268,7 +271,7 @@ async def chat_completions(req: Request):
         if cc.tools:
             resp = await tool_loop(cc, backend, model_name, allowed_tools=allowed_tools)
         else:
-            resp = await call_backend_chat(cc, backend, model_name)
+            resp = await call_backend_chat(cc, backend, model_name, messages_dumped=messages_dumped)
         try:
             inst = getattr(req.state, "instrument", None)
             if isinstance(inst, dict):
@@ -308,11 +311,12 @@ async def completions(req: Request):
     )
 
     hdrs = {k.lower(): v for k, v in req.headers.items()}
+    messages_dumped = dump_messages(cc.messages)
     route = decide_route(
         cfg=router_cfg(),
         request_model=cc.model,
         headers=hdrs,
-        messages=[m.model_dump(exclude_none=True) for m in cc.messages],
+        messages=messages_dumped,
         has_tools=False,
         enable_policy=S.ROUTER_ENABLE_POLICY,
     )
@@ -329,7 +333,7 @@ async def completions(req: Request):
         used_model_id = backend_model_id(backend, model_name)
 
         async def gen() -> AsyncIterator[bytes]:
-            async for sse_bytes in stream_backend_chat_as_openai(cc, backend, model_name):
+            async for sse_bytes in stream_backend_chat_as_openai(cc, backend, model_name, messages_dumped=messages_dumped):
                 for line in sse_bytes.splitlines():
                     if not line.startswith(b"data:"):
                         continue
@@ -359,7 +363,7 @@ async def completions(req: Request):
         out.headers["X-Router-Reason"] = route.reason
         return out
 
-    chat_resp = await call_backend_chat(cc, backend, model_name)
+    chat_resp = await call_backend_chat(cc, backend, model_name, messages_dumped=messages_dumped)
 
     msg = ((chat_resp.get("choices") or [{}])[0].get("message") or {})
     text = msg.get("content")
@@ -402,7 +406,7 @@ async def rerank(req: Request):
     model_used = _normalize_embeddings_request_model(rr.model, backend)
 
     try:
-        q_emb = (await embed_backend([rr.query], backend, model_used))[0]
+        q_emb = await embed_one_backend(rr.query, backend, model_used)
         doc_embs = await embed_backend(rr.documents, backend, model_used)
     except httpx.HTTPStatusError as e:
         detail = {"upstream": backend, "status": e.response.status_code, "body": e.response.text[:5000]}
@@ -517,11 +521,12 @@ async def responses(req: Request):
         raise HTTPException(status_code=400, detail="stream=true not supported when tools are provided")
 
     hdrs = {k.lower(): v for k, v in req.headers.items()}
+    messages_dumped = dump_messages(cc.messages)
     route = decide_route(
         cfg=router_cfg(),
         request_model=cc.model,
         headers=hdrs,
-        messages=[m.model_dump(exclude_none=True) for m in cc.messages],
+        messages=messages_dumped,
         has_tools=bool(cc.tools),
         enable_policy=S.ROUTER_ENABLE_POLICY,
     )
@@ -536,7 +541,7 @@ async def responses(req: Request):
         created = now_unix()
         used_model_id = backend_model_id(backend, model_name)
 
-        upstream_gen = stream_backend_chat_as_openai(cc, backend, model_name)
+        upstream_gen = stream_backend_chat_as_openai(cc, backend, model_name, messages_dumped=messages_dumped)
 
         async def gen() -> AsyncIterator[bytes]:
             # Best-effort Responses API SSE.
@@ -587,7 +592,7 @@ async def responses(req: Request):
             allowed_tools = None
         chat_resp = await tool_loop(cc, backend, model_name, allowed_tools=allowed_tools)
     else:
-        chat_resp = await call_backend_chat(cc, backend, model_name)
+        chat_resp = await call_backend_chat(cc, backend, model_name, messages_dumped=messages_dumped)
 
     msg = ((chat_resp.get("choices") or [{}])[0].get("message") or {})
     text = msg.get("content")
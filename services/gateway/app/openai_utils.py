@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import json
 import secrets
 import time
 from typing import Any
 
+from app.jsonutil import dumps_bytes
+
 
 def now_unix() -> int:
     return int(time.time())
@@ -15,7 +16,7 @@ def new_id(prefix: str) -> str:
 
 
 def sse(data_obj: Any) -> bytes:
-    return f"data: {json.dumps(data_obj, separators=(',', ':'))}\n\n".encode("utf-8")
+    return b"data: " + dumps_bytes(data_obj) + b"\n\n"
 
 
 def sse_done() -> bytes:
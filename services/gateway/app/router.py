@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 from dataclasses import dataclass
 import re
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Mapping, Optional
 
 from app.backends import backend_provider_name, get_registry
 from app.config import S
@@ -229,7 +229,7 @@ def decide_route(
     *,
     cfg: RouterConfig,
     request_model: str,
-    headers: Dict[str, str],
+    headers: Mapping[str, str],
     messages: Optional[Iterable[Dict[str, Any]]] = None,
     has_tools: bool = False,
     enable_policy: bool = False,
@@ -1,14 +1,37 @@
 from __future__ import annotations
 
-import json
 import asyncio
-from typing import Any, AsyncIterator, Dict
+from typing import Any, AsyncIterable, AsyncIterator, Dict
 
 import httpx
 
+from app.jsonutil import loads as _json_loads
 from app.openai_utils import ThinkTagStreamParser, new_id, now_unix, sanitize_chat_choices, sse, sse_done
 
 
+async def iter_lines_bytes(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte-chunk stream into lines (without the trailing CR/LF).
+
+    Chunks are arbitrary byte slices, so partial lines are carried across chunk
+    boundaries. Splitting on raw bytes avoids aiter_lines() decoding every line
+    to str only for it to be parsed as JSON.
+    """
+    buf = bytearray()
+    async for chunk in chunks:
+        buf += chunk
+        start = 0
+        while True:
+            idx = buf.find(b"\n", start)
+            if idx < 0:
+                break
+            yield bytes(buf[start:idx]).rstrip(b"\r")
+            start = idx + 1
+        if start:
+            del buf[:start]
+    if buf:
+        yield bytes(buf).rstrip(b"\r")
+
+
 async def passthrough_sse(resp: httpx.Response) -> AsyncIterator[bytes]:
     """
     Pass-through upstream SSE (already 'data: ...\n\n') from MLX-style OpenAI servers.
@@ -16,15 +39,12 @@ async def passthrough_sse(resp: httpx.Response) -> AsyncIterator[bytes]:
     done_seen = False
     parser = ThinkTagStreamParser()
     try:
-        async for line in resp.aiter_lines():
-            if not line:
-                continue
-
-            if not line.startswith("data:"):
+        async for line in iter_lines_bytes(resp.aiter_bytes()):
+            if not line.startswith(b"data:"):
                 continue
 
-            data = line[len("data:") :].strip()
-            if data == "[DONE]":
+            data = line[len(b"data:") :].strip()
+            if data == b"[DONE]":
                 done_seen = True
                 tail_visible, tail_thinking = parser.flush()
                 if tail_visible or tail_thinking:
@@ -48,9 +68,9 @@ async def passthrough_sse(resp: httpx.Response) -> AsyncIterator[bytes]:
                 return
 
             try:
-                obj = json.loads(data)
+                obj = _json_loads(data)
             except Exception:
-                yield f"{line}\n\n".encode("utf-8")
+                yield line + b"\n\n"
                 continue
 
             yield sse(sanitize_chat_choices(obj, stream_parser=parser))
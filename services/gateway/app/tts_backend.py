@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import base64
+import functools
 import time
 from dataclasses import dataclass, field
 from typing import Any, Dict, Literal
 
 import httpx
 
-from app.backends import get_registry
+from app.backends import get_registry, registry_generation
 from app.config import S
 
 
@@ -21,6 +22,12 @@ class TtsResult:
 
 
 def _effective_tts_base_url(*, backend_class: str) -> str:
+    return _tts_base_url_for(backend_class, registry_generation())
+
+
+@functools.lru_cache(maxsize=16)
+def _tts_base_url_for(backend_class: str, _generation: int) -> str:
+    # Keyed on the registry generation so etcd refreshes invalidate stale URLs.
     try:
         reg = get_registry()
         cfg = reg.get_backend(backend_class)
@@ -3,10 +3,13 @@ from __future__ import annotations
 import json
 import os
 import secrets
+import tempfile
+import threading
 import time
+import weakref
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from app.config import S
 
@@ -52,6 +55,22 @@ def _path_for(conversation_id: str) -> str:
     return str(Path(base).joinpath(f"{conversation_id}.json"))
 
 
+# Every write is a read-modify-write of the conversation's JSON file, and they come
+# from several worker threads (request handlers, background persists); one lock per
+# conversation id serializes them. Entries vanish once no thread holds the lock.
+_LOCKS: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_LOCKS_GUARD = threading.Lock()
+
+
+def _lock_for(conversation_id: str) -> threading.Lock:
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(conversation_id)
+        if lock is None:
+            lock = threading.Lock()
+            _LOCKS[conversation_id] = lock
+        return lock
+
+
 def cleanup_expired() -> None:
     ttl = _ttl_sec()
     if ttl <= 0:
@@ -102,14 +121,8 @@ class Conversation:
         }
 
 
-def load(conversation_id: str) -> Optional[Conversation]:
-    if not _is_safe_id(conversation_id):
-        return None
-
-    cleanup_expired()
-    path = _path_for(conversation_id)
+def _from_json(raw: str, conversation_id: str) -> Optional[Conversation]:
     try:
-        raw = Path(path).read_text(encoding="utf-8")
         obj = json.loads(raw)
         if not isinstance(obj, dict):
             return None
@@ -123,10 +136,61 @@ def load(conversation_id: str) -> Optional[Conversation]:
         if not isinstance(msgs, list):
             msgs = []
         return Conversation(id=cid, created=created, updated=updated, summary=summary, messages=list(msgs))
-    except FileNotFoundError:
+    except Exception:
         return None
+
+
+def load(conversation_id: str) -> Optional[Conversation]:
+    if not _is_safe_id(conversation_id):
+        return None
+
+    cleanup_expired()
+    path = _path_for(conversation_id)
+    try:
+        raw = Path(path).read_text(encoding="utf-8")
     except Exception:
         return None
+    return _from_json(raw, conversation_id)
+
+
+def load_or_create(conversation_id: str) -> Conversation:
+    """Load a conversation, creating an empty one under the same id on a miss.
+
+    Clients keep conversation ids in localStorage, so an id can outlive its
+    file (cleanup, redeploy); recreating it lets the UI keep using that id.
+    Raises ValueError if the id is not filesystem-safe.
+    """
+    if not _is_safe_id(conversation_id):
+        raise ValueError("invalid conversation id")
+
+    cleanup_expired()
+    path = _path_for(conversation_id)
+    try:
+        raw: Optional[str] = Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raw = None
+    if raw is not None:
+        convo = _from_json(raw, conversation_id)
+        if convo is not None:
+            return convo
+
+    now = _now()
+    convo = Conversation(id=conversation_id, created=now, updated=now, summary="", messages=[])
+    if raw is None:
+        _ensure_dir(_ui_chat_dir())
+        try:
+            # O_EXCL create: concurrent first requests for the same id cannot
+            # clobber each other.
+            with open(path, "x", encoding="utf-8") as f:
+                f.write(json.dumps(convo.to_dict(), ensure_ascii=False, separators=(",", ":")))
+            return convo
+        except FileExistsError:
+            existing = load(conversation_id)
+            if existing is not None:
+                return existing
+    # Unreadable file (or lost a race to one): replace it with an empty conversation.
+    save(convo)
+    return convo
 
 
 def create() -> Conversation:
@@ -141,7 +205,8 @@ def create() -> Conversation:
     return convo
 
 
-def save(convo: Conversation) -> None:
+def _write(convo: Conversation) -> None:
+    # Caller holds _lock_for(convo.id).
     base = _ui_chat_dir()
     _ensure_dir(base)
     path = _path_for(convo.id)
@@ -154,16 +219,42 @@ def save(convo: Conversation) -> None:
         # Fail closed; caller should summarize/prune before saving.
         raise ValueError("conversation too large")
 
-    tmp = f"{path}.tmp"
-    Path(tmp).write_text(data, encoding="utf-8")
-    os.replace(tmp, path)
+    # Unique temp name in the same directory, so os.replace stays atomic and no two
+    # writers share a temp file.
+    fd, tmp = tempfile.mkstemp(dir=base, prefix=f".{convo.id}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
 
 
-def append_message(conversation_id: str, msg: Dict[str, Any]) -> Conversation:
-    convo = load(conversation_id)
-    if convo is None:
-        raise FileNotFoundError("conversation not found")
+def save(convo: Conversation) -> None:
+    with _lock_for(convo.id):
+        _write(convo)
+
+
+def update(conversation_id: str, fn: Callable[[Conversation], None]) -> Conversation:
+    """Apply `fn` to a freshly loaded conversation and save it, under the conversation's lock.
+
+    Use this instead of load()+save() when time passes between the two (e.g. an
+    LLM call), so messages appended in the meantime are not overwritten.
+    """
+    with _lock_for(conversation_id):
+        convo = load(conversation_id)
+        if convo is None:
+            raise FileNotFoundError("conversation not found")
+        fn(convo)
+        _write(convo)
+        return convo
 
+
+def _message_entry(msg: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(msg, dict):
         raise ValueError("message must be an object")
 
@@ -182,8 +273,19 @@ def append_message(conversation_id: str, msg: Dict[str, Any]) -> Conversation:
     for k in ["type", "url", "backend", "model", "reason", "mime", "sha256", "filename", "bytes", "attachments"]:
         if k in msg and msg.get(k) is not None:
             entry[k] = msg.get(k)
+    return entry
 
-    convo.messages.append(entry)
-    convo.updated = _now()
-    save(convo)
-    return convo
+
+def append_messages(conversation_id: str, msgs: List[Dict[str, Any]]) -> Conversation:
+    """Append several messages with a single load/save of the conversation file."""
+    entries = [_message_entry(m) for m in msgs]
+
+    def _append(convo: Conversation) -> None:
+        convo.messages.extend(entries)
+        convo.updated = _now()
+
+    return update(conversation_id, _append)
+
+
+def append_message(conversation_id: str, msg: Dict[str, Any]) -> Conversation:
+    return append_messages(conversation_id, [msg])
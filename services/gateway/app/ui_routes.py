@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import copy
+import functools
 import io
 import hashlib
 import ipaddress
@@ -11,18 +13,30 @@ import mimetypes
 import os
 import re
 import secrets
+import socket
 import tempfile
+import threading
 import time
+import types
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
 
 import httpx
+
 from app.httpx_client import httpx_client as _httpx_client
+from app.httpx_client import public_httpx_client, shared_httpx_client
+from app.jsonutil import dumps_bytes, dumps_str, loads as _json_loads
 import subprocess
 from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
 from fastapi.responses import FileResponse
 from fastapi.responses import HTMLResponse
 from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from fastapi.responses import StreamingResponse
 
 from app.backends import (
@@ -42,6 +56,7 @@ from app.models import ChatCompletionRequest, ChatMessage
 from app.openai_utils import now_unix, sse, sse_done
 from app.router import decide_route
 from app.router_cfg import router_cfg
+from app.streaming import iter_lines_bytes
 from app.upstreams import call_backend_chat, stream_backend_chat_as_openai
 from app.images_backend import generate_images, resolve_images_backend_class
 from app.tts_backend import generate_tts, _effective_tts_base_url
@@ -95,35 +110,92 @@ def _apply_model_location(item: Dict[str, Any], location: Dict[str, str]) -> Dic
     return item
 
 
-def _lighton_ocr_base_url() -> str:
-    return (
-        _backend_base_url("lighton_ocr")
-        or (getattr(S, "LIGHTON_OCR_API_BASE_URL", "") or os.environ.get("LIGHTON_OCR_API_BASE_URL") or "").strip().rstrip("/")
+def _float_setting(name: str, default: float) -> float:
+    try:
+        return float(getattr(S, name, default) or default)
+    except Exception:
+        return default
+
+
+def _path_setting(name: str, default: str) -> str:
+    path = (getattr(S, name, "") or default).strip()
+    return path if path.startswith("/") else "/" + path
+
+
+@dataclass(frozen=True, slots=True)
+class _UiCfg:
+    """Settings-derived values used by the UI proxy handlers.
+
+    Settings do not change at runtime, so this is computed once; call
+    `_ui_cfg.cache_clear()` if `S` is ever reloaded. Registry-provided base
+    URLs still take precedence and are looked up per request.
+    """
+
+    lighton_ocr_base_url: str
+    lighton_ocr_timeout_sec: float
+    lighton_ocr_cache_ttl_sec: float
+    lighton_ocr_max_bytes: int
+    lighton_ocr_image_cache_bytes: int
+    skyreels_base_url: str
+    skyreels_generate_path: str
+    skyreels_timeout_sec: float
+    fyc_base_url: str
+    fyc_generate_path: str
+    fyc_timeout_sec: float
+    personaplex_base_url: str
+    personaplex_ui_url: str
+    personaplex_timeout_sec: float
+    tts_timeout_sec: float
+    music_backend_class: str
+    tts_backend_class: str
+    ocr_backend_class: str
+    video_backend_class: str
+    images_backend_class: str
+
+
+@functools.lru_cache(maxsize=1)
+def _ui_cfg() -> _UiCfg:
+    return _UiCfg(
+        lighton_ocr_base_url=(getattr(S, "LIGHTON_OCR_API_BASE_URL", "") or os.environ.get("LIGHTON_OCR_API_BASE_URL") or "").strip().rstrip("/"),
+        lighton_ocr_timeout_sec=_float_setting("LIGHTON_OCR_TIMEOUT_SEC", 120.0),
+        lighton_ocr_cache_ttl_sec=_float_setting("LIGHTON_OCR_TTL_SEC", 3600.0),
+        lighton_ocr_max_bytes=int(_float_setting("LIGHTON_OCR_MAX_BYTES", 20_000_000)),
+        lighton_ocr_image_cache_bytes=int(_float_setting("LIGHTON_OCR_IMAGE_CACHE_BYTES", 0)),
+        skyreels_base_url=(getattr(S, "SKYREELS_V2_BASE_URL", "") or getattr(S, "SKYREELS_BASE_URL", "") or os.environ.get("SKYREELS_V2_BASE_URL") or os.environ.get("SKYREELS_BASE_URL") or "").strip().rstrip("/"),
+        skyreels_generate_path=_path_setting("SKYREELS_GENERATE_PATH", "/v1/videos/generations"),
+        skyreels_timeout_sec=_float_setting("SKYREELS_TIMEOUT_SEC", 3600.0),
+        fyc_base_url=(getattr(S, "FOLLOWYOURCANVAS_BASE_URL", "") or getattr(S, "FYC_API_BASE_URL", "") or os.environ.get("FOLLOWYOURCANVAS_BASE_URL") or os.environ.get("FYC_API_BASE_URL") or "").strip().rstrip("/"),
+        fyc_generate_path=_path_setting("FYC_GENERATE_PATH", "/v1/videos/generations"),
+        fyc_timeout_sec=_float_setting("FYC_TIMEOUT_SEC", 1800.0),
+        personaplex_base_url=(getattr(S, "PERSONAPLEX_BASE_URL", "") or os.environ.get("PERSONAPLEX_BASE_URL") or "").strip().rstrip("/"),
+        personaplex_ui_url=(getattr(S, "PERSONAPLEX_UI_URL", "") or "").strip() or "https://localhost:8998",
+        personaplex_timeout_sec=_float_setting("PERSONAPLEX_TIMEOUT_SEC", 120.0),
+        tts_timeout_sec=_float_setting("TTS_TIMEOUT_SEC", 120.0),
+        music_backend_class=(getattr(S, "MUSIC_BACKEND_CLASS", "") or "").strip() or "heartmula_music",
+        tts_backend_class=(getattr(S, "TTS_BACKEND_CLASS", "") or "").strip() or "pocket_tts",
+        ocr_backend_class=(getattr(S, "OCR_BACKEND_CLASS", "") or "").strip() or "lighton_ocr",
+        video_backend_class=(getattr(S, "VIDEO_BACKEND_CLASS", "") or "").strip() or "skyreels_v2",
+        images_backend_class=(getattr(S, "IMAGES_BACKEND_CLASS", "") or "").strip() or "gpu_heavy",
     )
 
 
+def _lighton_ocr_base_url() -> str:
+    return _backend_base_url("lighton_ocr") or _ui_cfg().lighton_ocr_base_url
+
+
 def _skyreels_base_url() -> str:
-    return (
-        _backend_base_url("skyreels_v2")
-        or (getattr(S, "SKYREELS_V2_BASE_URL", "") or getattr(S, "SKYREELS_BASE_URL", "") or os.environ.get("SKYREELS_V2_BASE_URL") or os.environ.get("SKYREELS_BASE_URL") or "").strip().rstrip("/")
-    )
+    return _backend_base_url("skyreels_v2") or _ui_cfg().skyreels_base_url
 
 
 def _followyourcanvas_base_url() -> str:
-    return (
-        _backend_base_url("followyourcanvas")
-        or (getattr(S, "FOLLOWYOURCANVAS_BASE_URL", "") or getattr(S, "FYC_API_BASE_URL", "") or os.environ.get("FOLLOWYOURCANVAS_BASE_URL") or os.environ.get("FYC_API_BASE_URL") or "").strip().rstrip("/")
-    )
+    return _backend_base_url("followyourcanvas") or _ui_cfg().fyc_base_url
 
 
 _VIDEO_UI_COMPATIBLE_BACKENDS = {"skyreels_v2"}
 
 
 def _personaplex_base_url() -> str:
-    return (
-        _backend_base_url("personaplex")
-        or (getattr(S, "PERSONAPLEX_BASE_URL", "") or os.environ.get("PERSONAPLEX_BASE_URL") or "").strip().rstrip("/")
-    )
+    return _backend_base_url("personaplex") or _ui_cfg().personaplex_base_url
 
 
 @router.get("/favicon.ico", include_in_schema=False)
@@ -155,7 +227,18 @@ async def ui_apple_touch(req: Request):
         raise HTTPException(status_code=500, detail="failed to serve apple touch icon")
 
 
-_SAFE_FILE_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+_SAFE_NAME_LEAD = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789")
+_SAFE_NAME_CHARS = _SAFE_NAME_LEAD | frozenset("._-")
+
+
+def _is_safe_name(name: str) -> bool:
+    """Same rule as ^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$ without going through the regex engine."""
+    return (
+        bool(name)
+        and len(name) <= 128
+        and name[0] in _SAFE_NAME_LEAD
+        and _SAFE_NAME_CHARS.issuperset(name)
+    )
 
 
 def _peer_ip(req: Request) -> str:
@@ -279,30 +362,42 @@ def _ui_deny_detail(req: Request, message: str) -> Any:
     }
 
 
-def _require_ui_access(req: Request) -> None:
+def _check_ui_access(req: Request) -> Optional[HTTPException]:
     raw = (getattr(S, "UI_IP_ALLOWLIST", "") or "").strip()
     if not raw:
-        raise HTTPException(status_code=403, detail=_ui_deny_detail(req, "UI disabled (set UI_IP_ALLOWLIST to trusted IPs/CIDRs)"))
+        return HTTPException(status_code=403, detail=_ui_deny_detail(req, "UI disabled (set UI_IP_ALLOWLIST to trusted IPs/CIDRs)"))
 
     ip_s = _client_ip(req)
     try:
         ip = ipaddress.ip_address(ip_s)
     except Exception:
-        raise HTTPException(status_code=403, detail=_ui_deny_detail(req, "UI denied (unknown client IP)"))
+        return HTTPException(status_code=403, detail=_ui_deny_detail(req, "UI denied (unknown client IP)"))
 
     allow = _parse_ip_allowlist(raw)
     for item in allow:
         try:
             if isinstance(item, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
                 if ip == item:
-                    return
+                    return None
             else:
                 if ip in item:
-                    return
+                    return None
         except Exception:
             continue
 
-    raise HTTPException(status_code=403, detail=_ui_deny_detail(req, "UI denied (client IP not allowlisted)"))
+    return HTTPException(status_code=403, detail=_ui_deny_detail(req, "UI denied (client IP not allowlisted)"))
+
+
+def _require_ui_access(req: Request) -> None:
+    # ui_auth_middleware evaluates the allowlist once per request; fall back to
+    # checking here for requests that did not pass through it.
+    state = req.state
+    if getattr(state, "ui_access_checked", False):
+        denied = getattr(state, "ui_access_denied", None)
+    else:
+        denied = _check_ui_access(req)
+    if denied is not None:
+        raise denied
 
 
 def _ui_models_probe_timeout_sec() -> float:
@@ -332,6 +427,21 @@ def _clone_ui_models_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def _ui_models_cache_hit(cache_ttl_sec: float) -> Optional[Dict[str, Any]]:
+    now_monotonic = time.time()
+    if cache_ttl_sec <= 0 or _UI_MODELS_CACHE_VALUE is None or now_monotonic >= _UI_MODELS_CACHE_EXPIRES_AT:
+        return None
+    cached = _clone_ui_models_payload(_UI_MODELS_CACHE_VALUE)
+    diagnostics = cached.get("diagnostics") if isinstance(cached.get("diagnostics"), dict) else {}
+    diagnostics["cache"] = {
+        "hit": True,
+        "ttl_sec": cache_ttl_sec,
+        "expires_in_sec": max(0.0, round(_UI_MODELS_CACHE_EXPIRES_AT - now_monotonic, 3)),
+    }
+    cached["diagnostics"] = diagnostics
+    return cached
+
+
 async def _probe_models_for_backend(
     client: httpx.AsyncClient,
     registry: Any,
@@ -373,6 +483,7 @@ async def _probe_models_for_backend(
     return items, diag
 
 
+@functools.lru_cache(maxsize=1)
 def _session_cookie_name() -> str:
     return (getattr(S, "USER_SESSION_COOKIE", "") or "gateway_session").strip() or "gateway_session"
 
@@ -399,24 +510,92 @@ def _session_token_from_req(req: Request) -> str:
         return ""
 
 
-def _require_user(req: Request) -> Optional[user_store.User]:
-    if not getattr(S, "USER_AUTH_ENABLED", True):
+_SESSION_USER_CACHE_TTL_SEC = 30.0
+_SESSION_USER_CACHE_MAX_ENTRIES = 1024
+# token -> (monotonic deadline, user)
+_SESSION_USER_CACHE: Dict[str, Tuple[float, user_store.User]] = {}
+
+
+def _invalidate_session_user_cache(token: Optional[str] = None) -> None:
+    if token is None:
+        _SESSION_USER_CACHE.clear()
+    else:
+        _SESSION_USER_CACHE.pop(token, None)
+
+
+def _lookup_user_for_token(token: str) -> Optional[user_store.User]:
+    """Resolve a session token or API key to a user, caching hits briefly."""
+    if not token:
         return None
-    token = _session_token_from_req(req)
-    user = user_store.get_user_by_session(S.USER_DB_PATH, token=token)
-    if user is None and token:
+    now = time.monotonic()
+    cached = _SESSION_USER_CACHE.get(token)
+    if cached is not None and now < cached[0]:
+        return cached[1]
+
+    ttl = _SESSION_USER_CACHE_TTL_SEC
+    user: Optional[user_store.User] = None
+    session = user_store.get_session_user(S.USER_DB_PATH, token=token)
+    if session is not None:
+        user, expires_ts = session
+        # Never serve a cached session past its own expiry.
+        ttl = min(ttl, max(0.0, expires_ts - time.time()))
+    if user is None:
         try:
             resolved = user_store.get_user_by_api_key(S.USER_DB_PATH, token=token, touch_last_used=True)
             if resolved:
-                user, _key_meta = resolved
+                user, key_meta = resolved
+                # Likewise for an API key with an expiry.
+                key_expires_ts = key_meta.get("expires_ts")
+                if key_expires_ts is not None:
+                    ttl = min(ttl, max(0.0, key_expires_ts - time.time()))
         except Exception:
             user = None
+    if user is None:
+        # Only hits are cached so unknown tokens cannot grow the cache.
+        _SESSION_USER_CACHE.pop(token, None)
+        return None
+    if len(_SESSION_USER_CACHE) >= _SESSION_USER_CACHE_MAX_ENTRIES:
+        _SESSION_USER_CACHE.clear()
+    _SESSION_USER_CACHE[token] = (now + ttl, user)
+    return user
+
+
+def _resolve_ui_user(req: Request) -> Optional[user_store.User]:
+    state = req.state
+    if getattr(state, "ui_user_resolved", False):
+        return getattr(state, "user", None)
+    user = _lookup_user_for_token(_session_token_from_req(req))
+    state.ui_user_resolved = True
+    state.user = user
+    return user
+
+
+async def ui_auth_middleware(req: Request, call_next):
+    """Resolve UI access once per /ui request.
+
+    The result is stored on `req.state`; `_require_ui_access` reads it instead
+    of re-parsing headers. The session user is not looked up here:
+    `_require_user` resolves it on first use and caches it on `req.state`, so
+    public UI pages such as the login form never touch the user DB.
+    Enforcement (403/401) stays in the handlers.
+    """
+    path = req.url.path
+    if path == "/ui" or path.startswith("/ui/"):
+        try:
+            req.state.ui_access_denied = _check_ui_access(req)
+            req.state.ui_access_checked = True
+        except Exception:
+            # Leave state unset; handlers fall back to their own checks.
+            pass
+    return await call_next(req)
+
+
+def _require_user(req: Request) -> Optional[user_store.User]:
+    if not getattr(S, "USER_AUTH_ENABLED", True):
+        return None
+    user = _resolve_ui_user(req)
     if user is None:
         raise HTTPException(status_code=401, detail="authentication required")
-    try:
-        req.state.user = user
-    except Exception:
-        pass
     return user
 
 
@@ -466,7 +645,7 @@ def _resolve_tts_backend_class(req: Request, body: Optional[Dict[str, Any]] = No
                 backend_class = ""
 
     if not backend_class:
-        backend_class = (getattr(S, "TTS_BACKEND_CLASS", "") or "").strip() or "pocket_tts"
+        backend_class = _ui_cfg().tts_backend_class
 
     reg = get_registry()
     cfg = reg.get_backend(backend_class)
@@ -588,22 +767,13 @@ def _resolve_ui_backend_class(*, requested_backend_class: str, default_backend_c
 
 
 def _video_backend_request_settings(backend_class: str) -> Tuple[str, str, float]:
+    cfg = _ui_cfg()
     normalized = (backend_class or "").strip().lower()
     if normalized == "followyourcanvas":
         base = _followyourcanvas_base_url()
-        path = (getattr(S, "FYC_GENERATE_PATH", "") or "/v1/videos/generations").strip()
-        timeout = getattr(S, "FYC_TIMEOUT_SEC", 1800.0) or 1800.0
-    else:
-        base = _backend_base_url(backend_class) or _skyreels_base_url()
-        path = (getattr(S, "SKYREELS_GENERATE_PATH", "") or "/v1/videos/generations").strip()
-        timeout = getattr(S, "SKYREELS_TIMEOUT_SEC", 3600.0) or 3600.0
-    if not path.startswith("/"):
-        path = "/" + path
-    try:
-        timeout_f = float(timeout)
-    except Exception:
-        timeout_f = 3600.0
-    return base.rstrip("/"), path, timeout_f
+        return base.rstrip("/"), cfg.fyc_generate_path, cfg.fyc_timeout_sec
+    base = _backend_base_url(backend_class) or _skyreels_base_url()
+    return base.rstrip("/"), cfg.skyreels_generate_path, cfg.skyreels_timeout_sec
 
 
 def _image_backend_option_profile(backend_class: str) -> Dict[str, Any]:
@@ -824,10 +994,12 @@ async def _fetch_image_backend_catalog_entry(client: httpx.AsyncClient, *, backe
     return entry
 
 
+@functools.lru_cache(maxsize=1)
 def _ui_image_dir() -> str:
     return (getattr(S, "UI_IMAGE_DIR", "") or "/var/lib/gateway/data/ui_images").strip() or "/var/lib/gateway/data/ui_images"
 
 
+@functools.lru_cache(maxsize=1)
 def _ui_image_ttl_sec() -> int:
     try:
         return int(getattr(S, "UI_IMAGE_TTL_SEC", 900) or 900)
@@ -846,27 +1018,6 @@ def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def _cleanup_ui_images(path: str, *, ttl_sec: int) -> None:
-    # Best-effort cleanup; never fail the request for cleanup errors.
-    if ttl_sec <= 0:
-        return
-    now = time.time()
-    cutoff = now - float(ttl_sec)
-    try:
-        for name in os.listdir(path):
-            full = os.path.join(path, name)
-            try:
-                st = os.stat(full)
-                if st.st_mtime < cutoff:
-                    os.remove(full)
-            except FileNotFoundError:
-                continue
-            except Exception:
-                continue
-    except Exception:
-        return
-
-
 def _mime_to_ext(mime: str) -> str:
     m = (mime or "").lower().strip()
     if m == "image/png":
@@ -880,26 +1031,6 @@ def _mime_to_ext(mime: str) -> str:
     return "bin"
 
 
-def _cleanup_ui_files(path: str, *, ttl_sec: int) -> None:
-    if ttl_sec <= 0:
-        return
-    now = time.time()
-    cutoff = now - float(ttl_sec)
-    try:
-        for name in os.listdir(path):
-            full = os.path.join(path, name)
-            try:
-                st = os.stat(full)
-                if st.st_mtime < cutoff:
-                    os.remove(full)
-            except FileNotFoundError:
-                continue
-            except Exception:
-                continue
-    except Exception:
-        return
-
-
 def _sniff_mime(raw: bytes) -> str | None:
     # Best-effort sniff based on magic bytes.
     if not raw:
@@ -917,10 +1048,12 @@ def _sniff_mime(raw: bytes) -> str | None:
     return None
 
 
+@functools.lru_cache(maxsize=1)
 def _ui_audio_dir() -> str:
     return (getattr(S, "UI_AUDIO_DIR", "") or "/var/lib/gateway/data/ui_audio").strip() or "/var/lib/gateway/data/ui_audio"
 
 
+@functools.lru_cache(maxsize=1)
 def _ui_audio_ttl_sec() -> int:
     try:
         return int(getattr(S, "UI_AUDIO_TTL_SEC", 900) or 900)
@@ -928,10 +1061,25 @@ def _ui_audio_ttl_sec() -> int:
         return 900
 
 
+@functools.lru_cache(maxsize=1)
 def _ui_file_dir() -> str:
     return (getattr(S, "UI_FILE_DIR", "") or "/var/lib/gateway/data/ui_files").strip() or "/var/lib/gateway/data/ui_files"
 
 
+@functools.lru_cache(maxsize=4)
+def _real_dir(path: str) -> str:
+    return os.path.realpath(path)
+
+
+def _contained_path(dir_real: str, name: str) -> Optional[str]:
+    """Join a name already checked by _is_safe_name under a resolved dir; None if it would escape."""
+    full = os.path.join(dir_real, name)
+    if os.path.normpath(full) != full or not full.startswith(dir_real + os.sep):
+        return None
+    return full
+
+
+@functools.lru_cache(maxsize=1)
 def _ui_file_ttl_sec() -> int:
     try:
         return int(getattr(S, "UI_FILE_TTL_SEC", 0) or 0)
@@ -953,24 +1101,122 @@ def _ui_audio_max_bytes() -> int:
         return 100_000_000
 
 
-def _cleanup_ui_audio(path: str, *, ttl_sec: int) -> None:
+def _sweep_expired(path: str, *, ttl_sec: int) -> int:
+    # Best-effort; one scandir pass (stat comes from the dir entry), then unlink in a batch.
+    if ttl_sec <= 0:
+        return 0
+    cutoff = time.time() - float(ttl_sec)
+    expired: list[str] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                        expired.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        return 0
+    removed = 0
+    for full in expired:
+        try:
+            os.unlink(full)
+            removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+# Cached results pointing at swept files are only handed out while the file has
+# at least this long (capped at a quarter of the TTL) left before it is removed.
+_SWEEP_REUSE_MARGIN_SEC = 60.0
+
+
+def _sweep_reuse_cutoff(ttl_sec: int) -> Optional[float]:
+    """Oldest mtime a swept file may have and still be reused; None when the TTL is off."""
     if ttl_sec <= 0:
+        return None
+    return time.time() - ttl_sec + min(_SWEEP_REUSE_MARGIN_SEC, ttl_sec / 4.0)
+
+
+def _sweep_ui_dirs() -> None:
+    _sweep_expired(_ui_image_dir(), ttl_sec=_ui_image_ttl_sec())
+    _sweep_expired(_ui_file_dir(), ttl_sec=_ui_file_ttl_sec())
+    _sweep_expired(_ui_audio_dir(), ttl_sec=_ui_audio_ttl_sec())
+    _compact_tts_result_manifest()
+
+
+def _ui_sweep_interval_sec() -> float:
+    ttls = [t for t in (_ui_image_ttl_sec(), _ui_file_ttl_sec(), _ui_audio_ttl_sec()) if t > 0]
+    if not ttls:
+        return 0.0
+    return max(min(ttls) / 4.0, 1.0)
+
+
+_ui_sweep_task: Optional[asyncio.Task] = None
+
+
+async def _ui_sweep_loop(interval: float) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(_sweep_ui_dirs)
+        except Exception as e:
+            logger.debug("ui ttl sweep failed (%s: %s)", type(e).__name__, e)
+        await asyncio.sleep(interval)
+
+
+async def start_ui_ttl_sweeper() -> None:
+    global _ui_sweep_task
+    interval = _ui_sweep_interval_sec()
+    if interval <= 0:
+        return
+    if _ui_sweep_task is not None and not _ui_sweep_task.done():
         return
-    now = time.time()
-    cutoff = now - float(ttl_sec)
+    _ui_sweep_task = asyncio.create_task(_ui_sweep_loop(interval))
+
+
+async def stop_ui_ttl_sweeper() -> None:
+    global _ui_sweep_task
+    if _ui_sweep_task is None:
+        return
+    _ui_sweep_task.cancel()
     try:
-        for name in os.listdir(path):
-            full = os.path.join(path, name)
-            try:
-                st = os.stat(full)
-                if st.st_mtime < cutoff:
-                    os.remove(full)
-            except FileNotFoundError:
-                continue
-            except Exception:
-                continue
-    except Exception:
+        await _ui_sweep_task
+    except asyncio.CancelledError:
+        pass
+    _ui_sweep_task = None
+
+
+_SESSION_GC_INTERVAL_SEC = 60.0
+_session_gc_task: Optional[asyncio.Task] = None
+
+
+async def _session_gc_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(user_store.purge_expired_sessions, S.USER_DB_PATH)
+        except Exception as e:
+            logger.debug("session gc failed (%s: %s)", type(e).__name__, e)
+
+
+async def start_session_gc() -> None:
+    global _session_gc_task
+    if _session_gc_task is not None and not _session_gc_task.done():
+        return
+    _session_gc_task = asyncio.create_task(_session_gc_loop(_SESSION_GC_INTERVAL_SEC))
+
+
+async def stop_session_gc() -> None:
+    global _session_gc_task
+    if _session_gc_task is None:
         return
+    _session_gc_task.cancel()
+    try:
+        await _session_gc_task
+    except asyncio.CancelledError:
+        pass
+    _session_gc_task = None
 
 
 def _audio_mime_to_ext(mime: str) -> str:
@@ -1035,34 +1281,231 @@ def _normalize_voice_audio_for_storage(*, audio_bytes: bytes, mime_hint: str) ->
         return normalized, "audio/wav"
 
 
-def _save_ui_audio(*, audio_bytes: bytes, mime_hint: str) -> tuple[str, str]:
-    audio_dir = _ui_audio_dir()
-    ttl_sec = _ui_audio_ttl_sec()
-    max_bytes = _ui_audio_max_bytes()
-    _ensure_dir(audio_dir)
-    _cleanup_ui_audio(audio_dir, ttl_sec=ttl_sec)
-
+def _reserve_ui_audio_name(*, audio_bytes: bytes, mime_hint: str) -> str:
+    """Validate audio for the UI cache and pick the filename it will be stored under."""
     if not isinstance(audio_bytes, (bytes, bytearray)):
         raise ValueError("audio_bytes must be bytes")
+    max_bytes = _ui_audio_max_bytes()
     if len(audio_bytes) > max_bytes:
         raise ValueError(f"audio too large to cache ({len(audio_bytes)} bytes > {max_bytes})")
 
-    sha256 = hashlib.sha256(bytes(audio_bytes)).hexdigest()
     mime = (mime_hint or "audio/wav").strip()
     ext = _audio_mime_to_ext(mime)
     name = f"{secrets.token_urlsafe(18)}.{ext}"
     name = name.replace("-", "_")
-    if not _SAFE_FILE_RE.match(name):
+    if not _is_safe_name(name):
         raise ValueError("failed to generate safe filename")
+    return name
+
+
+def _write_ui_audio(name: str, audio_bytes: bytes) -> None:
+    audio_dir = _ui_audio_dir()
+    _ensure_dir(audio_dir)
 
     tmp = os.path.join(audio_dir, f".{name}.tmp")
     dst = os.path.join(audio_dir, name)
     with open(tmp, "wb") as f:
         f.write(audio_bytes)
     os.replace(tmp, dst)
+
+
+def _save_ui_audio(*, audio_bytes: bytes, mime_hint: str) -> tuple[str, str]:
+    name = _reserve_ui_audio_name(audio_bytes=audio_bytes, mime_hint=mime_hint)
+    sha256 = hashlib.sha256(audio_bytes).hexdigest()
+    _write_ui_audio(name, audio_bytes)
     return f"/ui/audio/{name}", sha256
 
 
+# Background UI audio writes still in flight, by file name; /ui/audio/<name>
+# waits on these so a URL handed out early never 404s.
+_PENDING_AUDIO_WRITES: "Dict[str, asyncio.Future[None]]" = {}
+
+
+def _ui_audio_write_done(name: str, fut: "asyncio.Future[None]") -> None:
+    _PENDING_AUDIO_WRITES.pop(name, None)
+    if fut.cancelled():
+        return
+    exc = fut.exception()
+    if exc is not None:
+        logger.warning("background UI audio cache write failed: %s: %s", type(exc).__name__, exc)
+
+
+def _save_ui_audio_in_background(*, audio_bytes: bytes, mime_hint: str) -> str:
+    """Return the UI URL for `audio_bytes` and write the file off the event loop.
+
+    The response can be sent while the write is still in flight; a request for
+    the URL in the meantime waits for the write (see ui_get_audio).
+    """
+    name = _reserve_ui_audio_name(audio_bytes=audio_bytes, mime_hint=mime_hint)
+    fut = asyncio.get_running_loop().run_in_executor(None, _write_ui_audio, name, audio_bytes)
+    _PENDING_AUDIO_WRITES[name] = fut
+    fut.add_done_callback(functools.partial(_ui_audio_write_done, name))
+    return f"/ui/audio/{name}"
+
+
+# Content-addressed cache of synthesized speech for the /speech chat command:
+# sha256(backend, voice, text) -> (UI audio URL, content type), bounded LRU.
+# Entries are mirrored to a JSON-lines manifest in the audio dir so they survive
+# restarts; an entry is only served while its audio file is still on disk, and
+# the TTL sweeper compacts the manifest down to the live entries. Lookups and
+# the sweeper both run in worker threads: the guard covers only dict operations,
+# and manifest writes are serialized separately so no disk I/O happens under it.
+_TTS_RESULT_CACHE: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+_TTS_RESULT_CACHE_MAX = 1024
+_TTS_RESULT_CACHE_LOADED = False
+_TTS_RESULT_CACHE_GUARD = threading.Lock()
+_TTS_RESULT_MANIFEST_LOCK = threading.Lock()
+_TTS_RESULT_MANIFEST = ".tts_cache.jsonl"
+_TTS_RESULT_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _keyed_lock(locks: "weakref.WeakValueDictionary[str, asyncio.Lock]", key: str) -> asyncio.Lock:
+    # One lock per in-flight key; dropped automatically once no caller holds it.
+    lock = locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        locks[key] = lock
+    return lock
+
+
+def _memo_key(raw: str) -> str:
+    """Key for an in-memory result cache: short inputs as-is, long ones as a sha256 digest.
+
+    Hashing every key only pays off when the input is big (long prompts,
+    data: URLs); the dict hashes a short string just as well by itself.
+    """
+    return raw if len(raw) <= 256 else hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _tts_result_key(backend_class: str, voice: Optional[str], text: str) -> str:
+    return hashlib.sha256(f"{backend_class}\x1f{voice or ''}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def _tts_result_audio_alive(url: str) -> bool:
+    # On disk and not about to be removed by the TTL sweeper.
+    name = url.rpartition("/")[2]
+    if not _is_safe_name(name):
+        return False
+    try:
+        st = os.stat(os.path.join(_ui_audio_dir(), name))
+    except OSError:
+        return False
+    cutoff = _sweep_reuse_cutoff(_ui_audio_ttl_sec())
+    return cutoff is None or st.st_mtime >= cutoff
+
+
+def _trim_tts_result_cache() -> None:
+    while len(_TTS_RESULT_CACHE) > _TTS_RESULT_CACHE_MAX:
+        _TTS_RESULT_CACHE.popitem(last=False)
+
+
+def _ensure_tts_result_manifest_loaded() -> None:
+    # Read the manifest once, outside the guard. Later lines win, so replaying
+    # the file in order reproduces the LRU order it was written in; entries put
+    # while the file was being read are newer and stay ahead of it.
+    global _TTS_RESULT_CACHE_LOADED
+    if _TTS_RESULT_CACHE_LOADED:
+        return
+    with _TTS_RESULT_MANIFEST_LOCK:
+        if _TTS_RESULT_CACHE_LOADED:
+            return
+        loaded: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        try:
+            with open(os.path.join(_ui_audio_dir(), _TTS_RESULT_MANIFEST), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = _json_loads(line)
+                        key = str(rec["key"])
+                        loaded[key] = (str(rec["url"]), str(rec.get("content_type") or ""))
+                        loaded.move_to_end(key)
+                    except Exception:
+                        continue
+        except OSError:
+            pass
+        with _TTS_RESULT_CACHE_GUARD:
+            for key, entry in _TTS_RESULT_CACHE.items():
+                loaded[key] = entry
+                loaded.move_to_end(key)
+            _TTS_RESULT_CACHE.clear()
+            _TTS_RESULT_CACHE.update(loaded)
+            _trim_tts_result_cache()
+            _TTS_RESULT_CACHE_LOADED = True
+
+
+def _tts_result_cache_get(key: str) -> Optional[Tuple[str, str]]:
+    # Blocking (manifest load, stat); call via asyncio.to_thread.
+    _ensure_tts_result_manifest_loaded()
+    with _TTS_RESULT_CACHE_GUARD:
+        hit = _TTS_RESULT_CACHE.get(key)
+    if hit is None:
+        return None
+    alive = _tts_result_audio_alive(hit[0])
+    with _TTS_RESULT_CACHE_GUARD:
+        if _TTS_RESULT_CACHE.get(key) != hit:
+            return hit if alive else None
+        if not alive:
+            # Swept (or about to be), or never written; forget it.
+            del _TTS_RESULT_CACHE[key]
+            return None
+        _TTS_RESULT_CACHE.move_to_end(key)
+    return hit
+
+
+def _tts_result_manifest_line(key: str, url: str, content_type: str) -> str:
+    return dumps_str({"key": key, "url": url, "content_type": content_type}) + "\n"
+
+
+def _tts_result_cache_put(key: str, url: str, content_type: str) -> None:
+    # Blocking (manifest append); call via asyncio.to_thread.
+    with _TTS_RESULT_CACHE_GUARD:
+        _TTS_RESULT_CACHE[key] = (url, content_type)
+        _TTS_RESULT_CACHE.move_to_end(key)
+        _trim_tts_result_cache()
+    # A compaction in progress finishes first, so this line lands in the new file.
+    with _TTS_RESULT_MANIFEST_LOCK:
+        try:
+            with open(os.path.join(_ui_audio_dir(), _TTS_RESULT_MANIFEST), "a", encoding="utf-8") as f:
+                f.write(_tts_result_manifest_line(key, url, content_type))
+        except Exception:
+            pass
+
+
+def _compact_tts_result_manifest() -> None:
+    """Drop cache entries whose audio file is gone and rewrite the manifest to match.
+
+    Without this the append-only manifest (and the dict replayed from it at
+    startup) would keep every phrase ever synthesized, long after the TTL
+    sweeper removed the audio.
+    """
+    _ensure_tts_result_manifest_loaded()
+    with _TTS_RESULT_CACHE_GUARD:
+        snapshot = list(_TTS_RESULT_CACHE.items())
+    dead = [(key, entry) for key, entry in snapshot if not _tts_result_audio_alive(entry[0])]
+    audio_dir = _ui_audio_dir()
+    # Puts append under the manifest lock, so none can slip in between the
+    # snapshot below and the rename; the dict guard is only held for the copy.
+    with _TTS_RESULT_MANIFEST_LOCK:
+        with _TTS_RESULT_CACHE_GUARD:
+            for key, entry in dead:
+                if _TTS_RESULT_CACHE.get(key) == entry:
+                    del _TTS_RESULT_CACHE[key]
+            live = list(_TTS_RESULT_CACHE.items())
+        lines = [_tts_result_manifest_line(key, url, ctype) for key, (url, ctype) in live]
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=f"{_TTS_RESULT_MANIFEST}.", suffix=".tmp", dir=audio_dir)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+            os.replace(tmp, os.path.join(audio_dir, _TTS_RESULT_MANIFEST))
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
 def _voice_library_dir() -> str:
     return (getattr(S, "VOICE_LIBRARY_DIR", "") or "/var/lib/gateway/data/voice_library").strip() or "/var/lib/gateway/data/voice_library"
 
@@ -1411,6 +1854,27 @@ def _rename_voice_sample(voice_id: str, new_name: str) -> Dict[str, Any] | None:
     return None
 
 
+_BODY_PREVIEW_BYTES = 4096
+
+
+def _body_preview(resp: httpx.Response) -> Dict[str, Any]:
+    """Bounded text view of an upstream body for error details (never the full payload)."""
+    body = resp.content
+    return {
+        "raw": body[:_BODY_PREVIEW_BYTES].decode("utf-8", errors="replace"),
+        "truncated": len(body) > _BODY_PREVIEW_BYTES,
+    }
+
+
+def _json_or_body_preview(resp: httpx.Response) -> Any:
+    if "json" in (resp.headers.get("content-type") or ""):
+        try:
+            return resp.json()
+        except Exception:
+            pass
+    return _body_preview(resp)
+
+
 def _gateway_headers(meta: Dict[str, Any]) -> Dict[str, str]:
     headers: Dict[str, str] = {}
     if not isinstance(meta, dict):
@@ -1457,10 +1921,8 @@ def _decode_image_b64(b64_or_data_url: str) -> tuple[bytes, str | None]:
 
 def _save_ui_image(*, b64: str, mime_hint: str) -> tuple[str, str, str]:
     img_dir = _ui_image_dir()
-    ttl_sec = _ui_image_ttl_sec()
     max_bytes = _ui_image_max_bytes()
     _ensure_dir(img_dir)
-    _cleanup_ui_images(img_dir, ttl_sec=ttl_sec)
 
     raw, mime_from_data = _decode_image_b64(b64)
     if len(raw) > max_bytes:
@@ -1473,7 +1935,7 @@ def _save_ui_image(*, b64: str, mime_hint: str) -> tuple[str, str, str]:
     name = f"{secrets.token_urlsafe(18)}.{ext}"
     # Make the filename deterministic-safe.
     name = name.replace("-", "_")
-    if not _SAFE_FILE_RE.match(name):
+    if not _is_safe_name(name):
         # Extremely unlikely, but fail closed.
         raise ValueError("failed to generate safe filename")
 
@@ -1501,27 +1963,16 @@ def _safe_ext_from_filename(filename: str, mime: str) -> str:
     return "bin"
 
 
-async def _save_ui_file(*, upload: UploadFile) -> Dict[str, Any]:
+def _write_ui_file(raw: bytes, *, filename: str, mime: str) -> Tuple[str, str]:
+    # Blocking half of _save_ui_file (hash + disk write); run via asyncio.to_thread.
     file_dir = _ui_file_dir()
-    ttl_sec = _ui_file_ttl_sec()
-    max_bytes = _ui_file_max_bytes()
     _ensure_dir(file_dir)
-    _cleanup_ui_files(file_dir, ttl_sec=ttl_sec)
-
-    raw = await upload.read()
-    if isinstance(raw, str):
-        raw = raw.encode("utf-8")
-    if not isinstance(raw, (bytes, bytearray)):
-        raw = b""
-    if max_bytes > 0 and len(raw) > max_bytes:
-        raise ValueError(f"file too large to cache ({len(raw)} bytes > {max_bytes})")
 
     sha256 = hashlib.sha256(raw).hexdigest()
-    mime = (upload.content_type or "application/octet-stream").strip() or "application/octet-stream"
-    ext = _safe_ext_from_filename(upload.filename or "", mime)
+    ext = _safe_ext_from_filename(filename, mime)
     name = f"{secrets.token_urlsafe(18)}.{ext}"
     name = name.replace("-", "_")
-    if not _SAFE_FILE_RE.match(name):
+    if not _is_safe_name(name):
         raise ValueError("failed to generate safe filename")
 
     tmp = os.path.join(file_dir, f".{name}.tmp")
@@ -1529,6 +1980,22 @@ async def _save_ui_file(*, upload: UploadFile) -> Dict[str, Any]:
     with open(tmp, "wb") as f:
         f.write(raw)
     os.replace(tmp, dst)
+    return name, sha256
+
+
+async def _save_ui_file(*, upload: UploadFile) -> Dict[str, Any]:
+    max_bytes = _ui_file_max_bytes()
+
+    raw = await upload.read()
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if not isinstance(raw, (bytes, bytearray)):
+        raw = b""
+    if max_bytes > 0 and len(raw) > max_bytes:
+        raise ValueError(f"file too large to cache ({len(raw)} bytes > {max_bytes})")
+
+    mime = (upload.content_type or "application/octet-stream").strip() or "application/octet-stream"
+    name, sha256 = await asyncio.to_thread(_write_ui_file, raw, filename=upload.filename or "", mime=mime)
 
     return {
         "filename": upload.filename or name,
@@ -1648,7 +2115,7 @@ async def ui_api_music(req: Request) -> Dict[str, Any]:
 
     backend_class = _resolve_ui_backend_class(
         requested_backend_class=requested_backend_class,
-        default_backend_class=(getattr(S, "MUSIC_BACKEND_CLASS", "") or "").strip() or "heartmula_music",
+        default_backend_class=_ui_cfg().music_backend_class,
         route_kind="music",
     )
     check_backend_ready(backend_class, route_kind="music")
@@ -1683,7 +2150,7 @@ async def ui_api_video(req: Request) -> Dict[str, Any]:
     requested_backend_class = str(body.get("backend_class") or body.get("backend") or "").strip()
     backend_class = _resolve_ui_backend_class(
         requested_backend_class=requested_backend_class,
-        default_backend_class=(getattr(S, "VIDEO_BACKEND_CLASS", "") or "").strip() or "skyreels_v2",
+        default_backend_class=_ui_cfg().video_backend_class,
         route_kind="video",
     )
     check_backend_ready(backend_class, route_kind="video")
@@ -1736,10 +2203,7 @@ async def ui_api_video(req: Request) -> Dict[str, Any]:
                     },
                 )
 
-            try:
-                data = resp.json()
-            except Exception:
-                data = {"raw": resp.text}
+            data = _json_or_body_preview(resp)
 
             if resp.status_code >= 400:
                 logger.warning(
@@ -1806,49 +2270,43 @@ def _normalize_skyreels_payload(body: Dict[str, Any]) -> Dict[str, Any]:
     return payload
 
 
-def _parse_resolution(resolution: Any) -> Optional[Tuple[int, int]]:
-    if not resolution:
-        return None
-    text = str(resolution).strip().lower()
-    if "x" in text:
-        parts = text.split("x", 1)
-        try:
-            return int(parts[0]), int(parts[1])
-        except Exception:
-            return None
-    presets = {
+_RESOLUTION_PRESETS = types.MappingProxyType(
+    {
         "480p": (854, 480),
         "720p": (1280, 720),
         "1080p": (1920, 1080),
     }
-    return presets.get(text)
+)
 
 
-@router.post("/ui/api/personaplex/chat", include_in_schema=False)
-async def ui_api_personaplex_chat(req: Request) -> Dict[str, Any]:
-    _require_ui_access(req)
-    _require_user(req)
+def _parse_resolution(resolution: Any) -> Optional[Tuple[int, int]]:
+    if not resolution:
+        return None
+    text = str(resolution).strip().lower()
+    head, sep, tail = text.partition("x")
+    if sep:
+        try:
+            return int(head), int(tail)
+        except ValueError:
+            return None
+    return _RESOLUTION_PRESETS.get(text)
+
+
+@router.post("/ui/api/personaplex/chat", include_in_schema=False)
+async def ui_api_personaplex_chat(req: Request) -> Dict[str, Any]:
+    _require_ui_access(req)
+    _require_user(req)
     body = await req.json()
     if not isinstance(body, dict):
         raise HTTPException(status_code=400, detail="body must be an object")
 
     base = _personaplex_base_url()
     if not base:
-        ui_url = (getattr(S, "PERSONAPLEX_UI_URL", "") or "").strip() or "https://localhost:8998"
-        raise HTTPException(status_code=501, detail={"error": "personaplex_rest_unavailable", "ui_url": ui_url})
+        raise HTTPException(status_code=501, detail={"error": "personaplex_rest_unavailable", "ui_url": _ui_cfg().personaplex_ui_url})
 
-    timeout = getattr(S, "PERSONAPLEX_TIMEOUT_SEC", 120.0) or 120.0
-    try:
-        timeout = float(timeout)
-    except Exception:
-        timeout = 120.0
-
-    async with httpx.AsyncClient(timeout=timeout) as client:
+    async with httpx.AsyncClient(timeout=_ui_cfg().personaplex_timeout_sec) as client:
         resp = await client.post(f"{base}/v1/chat/completions", json=body)
-        try:
-            data = resp.json()
-        except Exception:
-            data = {"raw": resp.text}
+        data = _json_or_body_preview(resp)
         if resp.status_code >= 400:
             raise HTTPException(status_code=resp.status_code, detail=data)
         return data
@@ -1858,9 +2316,8 @@ async def ui_api_personaplex_chat(req: Request) -> Dict[str, Any]:
 async def ui_api_personaplex_info(req: Request) -> Dict[str, Any]:
     _require_ui_access(req)
     _require_user(req)
-    ui_url = (getattr(S, "PERSONAPLEX_UI_URL", "") or "").strip() or "https://localhost:8998"
     base = _personaplex_base_url()
-    return {"ui_url": ui_url, "rest_enabled": bool(base)}
+    return {"ui_url": _ui_cfg().personaplex_ui_url, "rest_enabled": bool(base)}
 
 
 @router.get("/ui/api/tts/backends", include_in_schema=False)
@@ -1874,7 +2331,7 @@ async def ui_api_tts_backends(req: Request) -> Dict[str, Any]:
 async def ui_api_music_backends(req: Request) -> Dict[str, Any]:
     _require_ui_access(req)
     _require_user(req)
-    return _ui_backend_choices("music", (getattr(S, "MUSIC_BACKEND_CLASS", "") or "").strip() or "heartmula_music")
+    return _ui_backend_choices("music", _ui_cfg().music_backend_class)
 
 
 @router.get("/ui/api/video/backends", include_in_schema=False)
@@ -1883,7 +2340,7 @@ async def ui_api_video_backends(req: Request) -> Dict[str, Any]:
     _require_user(req)
     return _ui_backend_choices(
         "video",
-        (getattr(S, "VIDEO_BACKEND_CLASS", "") or "").strip() or "skyreels_v2",
+        _ui_cfg().video_backend_class,
         allowed_backend_classes=_VIDEO_UI_COMPATIBLE_BACKENDS,
     )
 
@@ -1892,7 +2349,7 @@ async def ui_api_video_backends(req: Request) -> Dict[str, Any]:
 async def ui_api_ocr_backends(req: Request) -> Dict[str, Any]:
     _require_ui_access(req)
     _require_user(req)
-    return _ui_backend_choices("ocr", (getattr(S, "OCR_BACKEND_CLASS", "") or "").strip() or "lighton_ocr")
+    return _ui_backend_choices("ocr", _ui_cfg().ocr_backend_class)
 
 
 @router.get("/ui/api/image/catalog", include_in_schema=False)
@@ -1917,7 +2374,7 @@ async def ui_api_image_catalog(req: Request) -> Dict[str, Any]:
             ]
         )
 
-    default_backend_class = (getattr(S, "IMAGES_BACKEND_CLASS", "") or "").strip() or "gpu_heavy"
+    default_backend_class = _ui_cfg().images_backend_class
     if not any(entry.get("backend_class") == default_backend_class for entry in entries) and entries:
         default_backend_class = str(entries[0].get("backend_class") or "")
 
@@ -1927,6 +2384,31 @@ async def ui_api_image_catalog(req: Request) -> Dict[str, Any]:
     }
 
 
+_USER_TTS_VOICE_TTL_SEC = 30.0
+_USER_TTS_VOICE_CACHE: Dict[int, Tuple[float, Optional[str]]] = {}
+
+
+def _user_tts_voice(user_id: int) -> Optional[str]:
+    """Return the user's saved TTS voice, cached briefly to skip a DB read per synthesis."""
+    now = time.monotonic()
+    cached = _USER_TTS_VOICE_CACHE.get(user_id)
+    if cached is not None and now - cached[0] < _USER_TTS_VOICE_TTL_SEC:
+        return cached[1]
+
+    settings = user_store.get_settings(S.USER_DB_PATH, user_id=user_id) or {}
+    voice = None
+    try:
+        voice = (settings.get("tts") or {}).get("voice") if isinstance(settings, dict) else None
+    except Exception:
+        voice = None
+    if not voice:
+        voice = settings.get("tts_voice") or settings.get("ttsVoice")
+    if not isinstance(voice, str) or not voice:
+        voice = None
+    _USER_TTS_VOICE_CACHE[user_id] = (now, voice)
+    return voice
+
+
 @router.post("/ui/api/tts", include_in_schema=False)
 async def ui_api_tts(req: Request):
     _require_ui_access(req)
@@ -1935,15 +2417,8 @@ async def ui_api_tts(req: Request):
     # If authenticated and no explicit voice provided, prefer the user's saved voice.
     try:
         if user is not None and not body.get("voice"):
-            settings = user_store.get_settings(S.USER_DB_PATH, user_id=user.id) or {}
-            voice = None
-            try:
-                voice = (settings.get("tts") or {}).get("voice") if isinstance(settings, dict) else None
-            except Exception:
-                voice = None
-            if not voice:
-                voice = settings.get("tts_voice") or settings.get("ttsVoice")
-            if isinstance(voice, str) and voice:
+            voice = _user_tts_voice(user.id)
+            if voice:
                 body["voice"] = voice
     except Exception:
         # best-effort only; fall back to request-provided or backend default
@@ -1982,18 +2457,16 @@ async def ui_api_tts(req: Request):
 
     if result.audio is None:
         raise HTTPException(status_code=502, detail="tts backend returned no audio")
-    # `result.audio` is raw bytes. Iterating a `bytes` yields ints which
-    # Starlette's `stream_response` later tries to `.encode()` on strings and
-    # will fail for ints. Wrap the bytes in an iterator that yields a single
-    # bytes chunk so StreamingResponse sees a bytes-like chunk.
+    # `result.audio` is already fully buffered, so send it as a plain Response
+    # (single send, with Content-Length) rather than a StreamingResponse.
     # Also expose a temporary UI URL for chat consumers by caching the bytes
     try:
-        url, _ = _save_ui_audio(audio_bytes=result.audio, mime_hint=result.content_type)
+        url = _save_ui_audio_in_background(audio_bytes=result.audio, mime_hint=result.content_type)
         # If successful, include a short helper link in headers for clients.
         headers.setdefault("X-Gateway-TTS-URL", url)
     except Exception:
         pass
-    return StreamingResponse(iter([result.audio]), media_type=result.content_type, headers=headers)
+    return Response(content=result.audio, media_type=result.content_type, headers=headers)
 
 
 @router.get("/ui/api/tts/voices", include_in_schema=False)
@@ -2164,33 +2637,24 @@ async def ui_api_tts_clone(
 
     path = _effective_tts_clone_path(backend)
 
+    # Optional clone form fields forwarded verbatim (as strings) when set.
+    optional_fields: Dict[str, Optional[str]] = {
+        "language": language,
+        "ref_text": ref_text,
+        "ref_audio": ref_audio,
+        "voice_clone_prompt": voice_clone_prompt,
+        "x_vector_only_mode": x_vector_only_mode,
+        "max_new_tokens": max_new_tokens,
+        "top_p": top_p,
+        "rms": rms,
+        "duration": duration,
+        "num_steps": num_steps,
+        "t_shift": t_shift,
+        "speed": speed,
+        "return_smooth": return_smooth,
+    }
     data: Dict[str, Any] = {"text": str(text)}
-    if language:
-        data["language"] = str(language)
-    if ref_text:
-        data["ref_text"] = str(ref_text)
-    if ref_audio:
-        data["ref_audio"] = str(ref_audio)
-    if voice_clone_prompt:
-        data["voice_clone_prompt"] = str(voice_clone_prompt)
-    if x_vector_only_mode:
-        data["x_vector_only_mode"] = str(x_vector_only_mode)
-    if max_new_tokens:
-        data["max_new_tokens"] = str(max_new_tokens)
-    if top_p:
-        data["top_p"] = str(top_p)
-    if rms:
-        data["rms"] = str(rms)
-    if duration:
-        data["duration"] = str(duration)
-    if num_steps:
-        data["num_steps"] = str(num_steps)
-    if t_shift:
-        data["t_shift"] = str(t_shift)
-    if speed:
-        data["speed"] = str(speed)
-    if return_smooth:
-        data["return_smooth"] = str(return_smooth)
+    data.update({k: str(v) for k, v in optional_fields.items() if v})
 
     file_bytes = b""
     file_mime = ""
@@ -2237,31 +2701,22 @@ async def ui_api_tts_clone(
             )
         }
 
-    timeout = getattr(S, "TTS_TIMEOUT_SEC", 120.0) or 120.0
-    try:
-        timeout = float(timeout)
-    except Exception:
-        timeout = 120.0
-
-    async with httpx.AsyncClient(timeout=timeout) as client:
+    async with httpx.AsyncClient(timeout=_ui_cfg().tts_timeout_sec) as client:
         resp = await client.post(f"{base}{path}", data=data, files=files)
 
     content_type = resp.headers.get("content-type", "application/octet-stream")
     if "application/json" in (content_type or ""):
-        try:
-            payload = resp.json()
-        except Exception:
-            payload = {"raw": resp.text}
+        payload = _json_or_body_preview(resp)
         if resp.status_code >= 400:
             raise HTTPException(status_code=resp.status_code, detail=payload)
         return JSONResponse(payload)
 
     if resp.status_code >= 400:
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
+        raise HTTPException(status_code=resp.status_code, detail=_body_preview(resp)["raw"])
 
     # Cache and return audio response
     try:
-        url, _ = _save_ui_audio(audio_bytes=resp.content, mime_hint=content_type)
+        url = _save_ui_audio_in_background(audio_bytes=resp.content, mime_hint=content_type)
         headers = {"X-Gateway-TTS-URL": url}
         if file_bytes:
             try:
@@ -2269,9 +2724,9 @@ async def ui_api_tts_clone(
                 headers["X-Gateway-Voice-Id"] = saved.get("id") or ""
             except Exception:
                 pass
-        return StreamingResponse(iter([resp.content]), media_type=content_type, headers=headers)
+        return Response(content=resp.content, media_type=content_type, headers=headers)
     except Exception:
-        return StreamingResponse(iter([resp.content]), media_type=content_type)
+        return Response(content=resp.content, media_type=content_type)
 
 
 @router.get("/ui/api/tts/voice-library", include_in_schema=False)
@@ -2337,14 +2792,33 @@ async def ui_api_voice_library_delete(req: Request, voice_id: str):
 async def ui_get_audio(req: Request, name: str):
     _require_ui_access(req)
     # Serve cached UI audio files written by _save_ui_audio.
-    if not _SAFE_FILE_RE.match(name):
+    if not _is_safe_name(name):
         raise HTTPException(status_code=404, detail="audio not found")
+    pending = _PENDING_AUDIO_WRITES.get(name)
+    if pending is not None:
+        # Handed out by _save_ui_audio_in_background before the write finished.
+        await asyncio.wait([pending])
     audio_dir = _ui_audio_dir()
     path = os.path.join(audio_dir, name)
-    if not os.path.exists(path):
+    try:
+        st = os.stat(path)
+    except OSError:
         raise HTTPException(status_code=404, detail="audio not found")
+    # Cached audio is never rewritten under the same (random) name, but it is
+    # per-user and the TTL sweeper deletes it: keep it out of shared caches and
+    # let the browser hold it no longer than the file will exist.
+    etag = f'"{st.st_size}-{int(st.st_mtime)}"'
+    ttl = _ui_audio_ttl_sec()
+    if ttl > 0:
+        max_age = max(0, int(st.st_mtime + ttl - time.time()))
+        cache_control = f"private, max-age={max_age}"
+    else:
+        cache_control = "private, no-cache"
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if req.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     # Let FileResponse infer content-type from extension; fallback to octet-stream
-    return FileResponse(path)
+    return FileResponse(path, headers=headers, stat_result=st)
 
 
 @router.post("/ui/api/auth/login", include_in_schema=False)
@@ -2357,7 +2831,7 @@ async def ui_auth_login(req: Request):
     password = str(body.get("password") or "").strip()
     if not username or not password:
         raise HTTPException(status_code=400, detail="username and password required")
-    user = user_store.authenticate(S.USER_DB_PATH, username=username, password=password)
+    user = await user_store.authenticate_async(S.USER_DB_PATH, username=username, password=password)
     if user is None:
         raise HTTPException(status_code=403, detail="invalid credentials")
     ttl = int(getattr(S, "USER_SESSION_TTL_SEC", 0) or 0)
@@ -2382,6 +2856,7 @@ async def ui_auth_logout(req: Request):
     token = _session_token_from_req(req)
     if token:
         user_store.delete_session(S.USER_DB_PATH, token=token)
+        _invalidate_session_user_cache(token)
     resp = JSONResponse({"ok": True})
     resp.delete_cookie(_session_cookie_name())
     return resp
@@ -2438,7 +2913,9 @@ async def ui_api_create_user(req: Request):
         raise HTTPException(status_code=400, detail="password required")
 
     try:
-        user = user_store.create_user_with_admin(S.USER_DB_PATH, username=username, password=password, admin=admin_flag)
+        user = await user_store.create_user_with_admin_async(
+            S.USER_DB_PATH, username=username, password=password, admin=admin_flag
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return JSONResponse({"ok": True, "user": {"id": user.id, "username": user.username, "admin": getattr(user, "admin", False)}})
@@ -2482,7 +2959,7 @@ async def ui_api_bulk_users(req: Request):
             elif action == "reset-password":
                 if not isinstance(password, str) or not password:
                     raise ValueError("password required")
-                user_store.set_password(S.USER_DB_PATH, username=username, password=password)
+                await user_store.set_password_async(S.USER_DB_PATH, username=username, password=password)
             else:
                 raise ValueError("unknown action")
             results.append({"username": username, "ok": True})
@@ -2491,6 +2968,10 @@ async def ui_api_bulk_users(req: Request):
             logger.warning("Bulk user operation failed for username '%s': %s", username, str(e))
             # Do not expose internal exception messages to the client.
             results.append({"username": username, "ok": False, "error": "invalid request"})
+        finally:
+            # Disabled/deleted users and admin flag changes must not linger in the session
+            # cache, not even while the rest of the batch runs (or if it fails midway).
+            _invalidate_session_user_cache()
     return JSONResponse({"ok": True, "action": action, "results": results})
 
 
@@ -2528,6 +3009,8 @@ async def ui_user_settings_put(req: Request) -> Dict[str, Any]:
     current = user_store.get_settings(S.USER_DB_PATH, user_id=user.id) or {}
     merged = _merge_user_settings(current if isinstance(current, dict) else {}, settings)
     user_store.set_settings(S.USER_DB_PATH, user_id=user.id, settings=merged)
+    _USER_TTS_VOICE_CACHE.pop(user.id, None)
+    _USER_PROFILE_MSG_CACHE.pop(user.id, None)
     return {"ok": True, "settings": merged}
 
 
@@ -2590,6 +3073,10 @@ async def ui_user_api_keys_revoke(req: Request, key_id: str) -> Dict[str, Any]:
     if user is None:
         raise HTTPException(status_code=401, detail="authentication required")
     ok = user_store.revoke_api_key(S.USER_DB_PATH, user_id=user.id, key_id=key_id)
+    if ok:
+        # The cache is keyed by raw token, which isn't stored; drop everything so the
+        # revoked key stops authenticating now rather than at TTL expiry.
+        _invalidate_session_user_cache()
     return {"ok": ok, "key_id": key_id}
 
 
@@ -2610,14 +3097,16 @@ async def ui_user_change_password(req: Request) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail="new password required")
 
     # Verify current password
-    auth = user_store.authenticate(S.USER_DB_PATH, username=user.username, password=current)
+    auth = await user_store.authenticate_async(S.USER_DB_PATH, username=user.username, password=current)
     if auth is None:
         raise HTTPException(status_code=401, detail="current password invalid")
 
     try:
-        user_store.set_password(S.USER_DB_PATH, username=user.username, password=new)
+        await user_store.set_password_async(S.USER_DB_PATH, username=user.username, password=new)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        _invalidate_session_user_cache()
     return {"ok": True}
 
 
@@ -2646,20 +3135,14 @@ async def ui_conversation_get(req: Request, conversation_id: str) -> Dict[str, A
     _require_ui_access(req)
     user = _require_user(req)
     if user is None:
-        convo = ui_conversations.load(conversation_id)
-        if convo is None:
-            # If the client provided a syntactically safe conversation id (e.g. from
-            # localStorage) but the server has no record (e.g. after a cleanup or
-            # deploy), create a new empty conversation using the same id so the
-            # UI can continue using its stored id rather than receiving a 404.
-            if not ui_conversations._is_safe_id(conversation_id):
-                raise HTTPException(status_code=404, detail="not found")
-            now = int(time.time())
-            try:
-                convo = ui_conversations.Conversation(id=conversation_id, created=now, updated=now, summary="", messages=[])
-                ui_conversations.save(convo)
-            except Exception:
-                raise HTTPException(status_code=500, detail="failed to create conversation")
+        # Unknown but safe ids (e.g. from localStorage after a cleanup or
+        # deploy) are recreated empty so the UI can keep its stored id.
+        try:
+            convo = ui_conversations.load_or_create(conversation_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="not found")
+        except Exception:
+            raise HTTPException(status_code=500, detail="failed to create conversation")
         return convo.to_dict()
     convo = user_store.get_conversation(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id)
     if convo is None:
@@ -2703,49 +3186,65 @@ async def ui_conversation_files_upload(
         raise HTTPException(status_code=400, detail="files required")
 
     if user is None:
-        convo = ui_conversations.load(conversation_id)
-        if convo is None:
-            if not ui_conversations._is_safe_id(conversation_id):
-                raise HTTPException(status_code=404, detail="conversation not found")
-            now = int(time.time())
-            try:
-                convo = ui_conversations.Conversation(id=conversation_id, created=now, updated=now, summary="", messages=[])
-                ui_conversations.save(convo)
-            except Exception:
-                raise HTTPException(status_code=500, detail="conversation not found")
+        try:
+            convo = ui_conversations.load_or_create(conversation_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="conversation not found")
+        except Exception:
+            raise HTTPException(status_code=500, detail="conversation not found")
     else:
         convo = user_store.get_conversation(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id)
         if convo is None:
             raise HTTPException(status_code=404, detail="conversation not found")
 
+    results = await asyncio.gather(*[_save_ui_file(upload=upload) for upload in files], return_exceptions=True)
     saved: list[Dict[str, Any]] = []
-    for upload in files:
-        try:
-            saved.append(await _save_ui_file(upload=upload))
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"failed to save file: {type(e).__name__}: {e}")
+    for result in results:
+        if isinstance(result, ValueError):
+            raise HTTPException(status_code=400, detail=str(result))
+        if isinstance(result, BaseException):
+            raise HTTPException(status_code=500, detail=f"failed to save file: {type(result).__name__}: {result}")
+        saved.append(result)
 
     return {"files": saved}
 
 
+_UI_IMAGE_MEDIA_TYPES = types.MappingProxyType(
+    {
+        "png": "image/png",
+        "jpg": "image/jpeg",
+        "jpeg": "image/jpeg",
+        "webp": "image/webp",
+        "svg": "image/svg+xml",
+    }
+)
+
+# Load the platform MIME tables at import rather than on the first file request.
+mimetypes.init()
+
+
+@functools.lru_cache(maxsize=256)
+def _guess_media_type_by_ext(ext: str) -> str:
+    if not ext:
+        return "application/octet-stream"
+    guessed, _ = mimetypes.guess_type("f." + ext)
+    return guessed or "application/octet-stream"
+
+
 @router.get("/ui/images/{name}", include_in_schema=False)
 async def ui_image_file(req: Request, name: str):
     _require_ui_access(req)
     user = _require_user(req)
 
-    if not _SAFE_FILE_RE.match(name or ""):
+    if not name or not _is_safe_name(name):
         raise HTTPException(status_code=404, detail="not found")
 
     img_dir = _ui_image_dir()
     ttl_sec = _ui_image_ttl_sec()
     _ensure_dir(img_dir)
-    _cleanup_ui_images(img_dir, ttl_sec=ttl_sec)
 
-    img_dir_real = os.path.realpath(img_dir)
-    full = os.path.realpath(os.path.join(img_dir_real, name))
-    if os.path.commonpath([img_dir_real, full]) != img_dir_real:
+    full = _contained_path(_real_dir(img_dir), name)
+    if full is None:
         raise HTTPException(status_code=404, detail="not found")
     try:
         st = os.stat(full)
@@ -2763,17 +3262,11 @@ async def ui_image_file(req: Request, name: str):
     except Exception:
         raise HTTPException(status_code=404, detail="not found")
 
-    ext = (name.rsplit(".", 1)[-1] if "." in name else "").lower()
-    media_type = {
-        "png": "image/png",
-        "jpg": "image/jpeg",
-        "jpeg": "image/jpeg",
-        "webp": "image/webp",
-        "svg": "image/svg+xml",
-    }.get(ext, "application/octet-stream")
+    _, dot, ext = name.rpartition(".")
+    media_type = _UI_IMAGE_MEDIA_TYPES.get(ext.lower() if dot else "", "application/octet-stream")
 
     headers = {"cache-control": "private, max-age=60"}
-    return FileResponse(full, media_type=media_type, headers=headers)
+    return FileResponse(full, media_type=media_type, headers=headers, stat_result=st)
 
 
 @router.get("/ui/files/{name}", include_in_schema=False)
@@ -2781,17 +3274,15 @@ async def ui_uploaded_file(req: Request, name: str):
     _require_ui_access(req)
     _require_user(req)
 
-    if not _SAFE_FILE_RE.match(name or ""):
+    if not name or not _is_safe_name(name):
         raise HTTPException(status_code=404, detail="not found")
 
     file_dir = _ui_file_dir()
     ttl_sec = _ui_file_ttl_sec()
     _ensure_dir(file_dir)
-    _cleanup_ui_files(file_dir, ttl_sec=ttl_sec)
 
-    file_dir_real = os.path.realpath(file_dir)
-    full = os.path.realpath(os.path.join(file_dir_real, name))
-    if os.path.commonpath([file_dir_real, full]) != file_dir_real:
+    full = _contained_path(_real_dir(file_dir), name)
+    if full is None:
         raise HTTPException(status_code=404, detail="not found")
     try:
         st = os.stat(full)
@@ -2808,10 +3299,10 @@ async def ui_uploaded_file(req: Request, name: str):
     except Exception:
         raise HTTPException(status_code=404, detail="not found")
 
-    guessed, _ = mimetypes.guess_type(full)
-    media_type = guessed or "application/octet-stream"
+    _, dot, ext = name.rpartition(".")
+    media_type = _guess_media_type_by_ext(ext if dot else "")
     headers = {"cache-control": "private, max-age=60"}
-    return FileResponse(full, media_type=media_type, headers=headers)
+    return FileResponse(full, media_type=media_type, headers=headers, stat_result=st)
 
 
 @router.get("/ui/api/models", include_in_schema=False)
@@ -2825,43 +3316,40 @@ async def ui_models(req: Request) -> Dict[str, Any]:
     data: Dict[str, Any] = {"object": "list", "data": []}
     cache_ttl_sec = _ui_models_cache_ttl_sec()
     probe_timeout_sec = _ui_models_probe_timeout_sec()
-    now_monotonic = time.time()
 
-    if cache_ttl_sec > 0 and _UI_MODELS_CACHE_VALUE is not None and now_monotonic < _UI_MODELS_CACHE_EXPIRES_AT:
-        cached = _clone_ui_models_payload(_UI_MODELS_CACHE_VALUE)
-        diagnostics = cached.get("diagnostics") if isinstance(cached.get("diagnostics"), dict) else {}
-        diagnostics["cache"] = {
-            "hit": True,
-            "ttl_sec": cache_ttl_sec,
-            "expires_in_sec": max(0.0, round(_UI_MODELS_CACHE_EXPIRES_AT - now_monotonic, 3)),
-        }
-        cached["diagnostics"] = diagnostics
+    cached = _ui_models_cache_hit(cache_ttl_sec)
+    if cached is not None:
         return cached
 
     async with _UI_MODELS_CACHE_LOCK:
-        now_monotonic = time.time()
-        if cache_ttl_sec > 0 and _UI_MODELS_CACHE_VALUE is not None and now_monotonic < _UI_MODELS_CACHE_EXPIRES_AT:
-            cached = _clone_ui_models_payload(_UI_MODELS_CACHE_VALUE)
-            diagnostics = cached.get("diagnostics") if isinstance(cached.get("diagnostics"), dict) else {}
-            diagnostics["cache"] = {
-                "hit": True,
-                "ttl_sec": cache_ttl_sec,
-                "expires_in_sec": max(0.0, round(_UI_MODELS_CACHE_EXPIRES_AT - now_monotonic, 3)),
-            }
-            cached["diagnostics"] = diagnostics
+        # Single-flight: whoever waited on the lock reuses the refresh that just finished.
+        cached = _ui_models_cache_hit(cache_ttl_sec)
+        if cached is not None:
             return cached
 
         registry = get_registry()
+        probe_defs = llm_backends()
         async with _httpx_client(timeout=probe_timeout_sec) as client:
-            probe_defs = [(backend_name, cfg) for backend_name, cfg in llm_backends()]
+            # httpx timeouts apply per phase (connect/read/...); wait_for caps each
+            # upstream end to end so one slow backend cannot stretch the gather.
             probe_results = await asyncio.gather(
-                *[_probe_models_for_backend(client, registry, backend_name, cfg.base_url, now) for backend_name, cfg in probe_defs],
+                *[
+                    asyncio.wait_for(
+                        _probe_models_for_backend(client, registry, backend_name, cfg.base_url, now),
+                        timeout=probe_timeout_sec,
+                    )
+                    for backend_name, cfg in probe_defs
+                ],
                 return_exceptions=True,
             )
         source_diags: Dict[str, Any] = {}
         for (backend_name, _cfg), result in zip(probe_defs, probe_results):
             if isinstance(result, Exception):
-                source_diags[backend_name] = {"backend": backend_name, "ok": False, "error": str(result)}
+                source_diags[backend_name] = {
+                    "backend": backend_name,
+                    "ok": False,
+                    "error": str(result) or type(result).__name__,
+                }
                 continue
             items, diag = result
             data["data"].extend(items)
@@ -2878,7 +3366,7 @@ async def ui_models(req: Request) -> Dict[str, Any]:
                     _backend_location_details(registry, provider_backend.backend_class, base_url=provider_backend.base_url),
                 )
             )
-    for backend_name, cfg in llm_backends():
+    for backend_name, cfg in probe_defs:
         item = {"id": backend_name, "object": "model", "created": now, "owned_by": "gateway"}
         data["data"].append(_apply_model_location(item, _backend_location_details(registry, backend_name, base_url=cfg.base_url)))
 
@@ -2921,7 +3409,7 @@ async def ui_models(req: Request) -> Dict[str, Any]:
     try:
         checker = get_health_checker()
         health_diags: Dict[str, Any] = {}
-        for backend_name, _cfg in llm_backends():
+        for backend_name, _cfg in probe_defs:
             status = checker.get_status(backend_name)
             if status is None:
                 continue
@@ -2973,8 +3461,8 @@ async def ui_chat(req: Request) -> Dict[str, Any]:
     route = decide_route(
         cfg=router_cfg(),
         request_model=cc.model,
-        headers={k.lower(): v for k, v in req.headers.items()},
-        messages=[m.model_dump(exclude_none=True) for m in cc.messages],
+        headers=req.headers,  # case-insensitive; decide_route only does .get("x-...")
+        messages=_router_messages(cc.messages),
         has_tools=False,
         enable_policy=S.ROUTER_ENABLE_POLICY,
         enable_request_type=getattr(S, "ROUTER_ENABLE_REQUEST_TYPE", False),
@@ -3025,11 +3513,34 @@ def _coerce_messages(body: dict[str, Any]) -> list[ChatMessage]:
     return []
 
 
+def _router_messages(messages: List[ChatMessage]) -> list[Dict[str, Any]]:
+    # decide_route only reads role/content; skip a full pydantic model_dump per message.
+    return [{"role": m.role, "content": m.content} for m in messages]
+
+
+_USER_PROFILE_MSG_TTL_SEC = 30.0
+_USER_PROFILE_MSG_CACHE: Dict[int, Tuple[float, Optional[ChatMessage]]] = {}
+
+
 def _build_profile_system_message(user: Optional[user_store.User]) -> ChatMessage | None:
+    """Per-user profile prompt, cached briefly (hits and misses) to skip a DB read per chat turn."""
     if user is None:
         return None
+    now = time.monotonic()
+    cached = _USER_PROFILE_MSG_CACHE.get(user.id)
+    if cached is not None and now - cached[0] < _USER_PROFILE_MSG_TTL_SEC:
+        return cached[1]
     try:
         settings = user_store.get_settings(S.USER_DB_PATH, user_id=user.id) or {}
+    except Exception:
+        return None
+    msg = _profile_system_message_from_settings(settings)
+    _USER_PROFILE_MSG_CACHE[user.id] = (now, msg)
+    return msg
+
+
+def _profile_system_message_from_settings(settings: Any) -> ChatMessage | None:
+    try:
         profile = settings.get("profile") if isinstance(settings, dict) else None
         if not isinstance(profile, dict):
             return None
@@ -3055,46 +3566,54 @@ def _build_profile_system_message(user: Optional[user_store.User]) -> ChatMessag
         return None
 
 
+def _clean_str(value: Any) -> str:
+    if type(value) is str:
+        return value.strip()
+    return str(value).strip() if value else ""
+
+
 def _coerce_attachments(raw: Any) -> list[Dict[str, Any]]:
-    if not isinstance(raw, list):
+    if not isinstance(raw, list) or not raw:
         return []
     out: list[Dict[str, Any]] = []
+    append = out.append
     for item in raw:
-        if not isinstance(item, dict):
+        if type(item) is not dict:
             continue
-        filename = str(item.get("filename") or "").strip()
-        url = str(item.get("url") or "").strip()
-        if not filename or not url:
+        get = item.get
+        filename = _clean_str(get("filename"))
+        if not filename:
             continue
-        entry = {
-            "filename": filename,
-            "url": url,
-            "mime": str(item.get("mime") or "").strip(),
-            "bytes": item.get("bytes"),
-            "sha256": str(item.get("sha256") or "").strip(),
-        }
-        out.append(entry)
+        url = _clean_str(get("url"))
+        if not url:
+            continue
+        append(
+            {
+                "filename": filename,
+                "url": url,
+                "mime": _clean_str(get("mime")),
+                "bytes": get("bytes"),
+                "sha256": _clean_str(get("sha256")),
+            }
+        )
     return out
 
 
 def _attachments_to_lines(attachments: list[Dict[str, Any]]) -> list[str]:
+    # Expects _coerce_attachments output: filename/url/mime are already stripped, non-empty strings.
     lines: list[str] = []
     for item in attachments:
-        if not isinstance(item, dict):
-            continue
-        filename = str(item.get("filename") or "").strip()
-        url = str(item.get("url") or "").strip()
-        if not filename or not url:
-            continue
-        mime = str(item.get("mime") or "").strip()
-        size = item.get("bytes")
-        bits = []
-        if mime:
-            bits.append(mime)
-        if isinstance(size, int) and size > 0:
-            bits.append(f"{size} bytes")
-        meta = f" ({', '.join(bits)})" if bits else ""
-        lines.append(f"- {filename}{meta}: {url}")
+        mime = item["mime"]
+        size = item["bytes"]
+        if mime and isinstance(size, int) and size > 0:
+            meta = f" ({mime}, {size} bytes)"
+        elif mime:
+            meta = f" ({mime})"
+        elif isinstance(size, int) and size > 0:
+            meta = f" ({size} bytes)"
+        else:
+            meta = ""
+        lines.append(f"- {item['filename']}{meta}: {item['url']}")
     return lines
 
 
@@ -3105,88 +3624,160 @@ def _normalize_chat_role(raw_role: Any) -> str:
     return "user"
 
 
-def _conversation_to_chat_messages(convo: ui_conversations.Conversation) -> list[ChatMessage]:
+def _history_item(item: Any) -> Optional[Tuple[str, str, list[Dict[str, Any]]]]:
+    if not isinstance(item, dict):
+        return None
+    if str(item.get("type") or "") == "image":
+        return None
+    content = item.get("content")
+    content = content.strip() if isinstance(content, str) else ""
+    attachments = _coerce_attachments(item.get("attachments"))
+    if not content and not attachments:
+        return None
+    return _normalize_chat_role(item.get("role")), content, attachments
+
+
+def _history_to_chat_messages(summary: str, raw_messages: Any) -> list[ChatMessage]:
     msgs: list[ChatMessage] = []
     include_prior_context = bool(getattr(S, "UI_CHAT_INCLUDE_PRIOR_CONTEXT", False))
-    if include_prior_context and convo.summary:
-        msgs.append(ChatMessage(role="system", content=f"Conversation summary:\n{convo.summary.strip()}"))
-
-    # Collect textual messages (skip images) and preserve only the last user
-    # message as the actual user prompt. All earlier messages are folded into a
-    # single system-side "context" message so the model can use them for
-    # reference but will not attempt to reply to each one separately.
-    items: list[Dict[str, Any]] = []
-    for item in convo.messages:
-        if not isinstance(item, dict):
+    if include_prior_context and summary:
+        msgs.append(ChatMessage(role="system", content=f"Conversation summary:\n{summary}"))
+    if not isinstance(raw_messages, list):
+        return msgs
+
+    try:
+        keep_n = _summary_keep_last_messages()
+    except Exception:
+        keep_n = 12
+
+    # Single reverse scan: the last user message becomes the sole user prompt;
+    # everything else is folded into a bounded system-side "context" message so
+    # the model can reference it but will not reply to each one separately.
+    # Scanning stops once the prompt is found and the context window is full.
+    last_user: Optional[Tuple[str, str, list[Dict[str, Any]]]] = None
+    last_item: Optional[Tuple[str, str, list[Dict[str, Any]]]] = None
+    context_lines: deque[str] = deque()
+    for raw in reversed(raw_messages):
+        item = _history_item(raw)
+        if item is None:
             continue
-        if str(item.get("type") or "") == "image":
+        if last_item is None:
+            last_item = item
+        role, content, attachments = item
+        if last_user is None and role == "user":
+            last_user = item
+            if not include_prior_context:
+                # Nothing else is read without prior context; the prompt is all we need.
+                break
             continue
-        role = _normalize_chat_role(item.get("role"))
-        content = item.get("content")
-        if not isinstance(content, str) or not content.strip():
-            content = ""
-        attachments = item.get("attachments")
-        attachment_list = _coerce_attachments(attachments)
-        if not content.strip() and not attachment_list:
+        if not include_prior_context:
             continue
-        items.append({"role": role, "content": content.strip(), "attachments": attachment_list})
+        if len(context_lines) >= keep_n:
+            if last_user is not None:
+                break
+            continue
+        attachment_lines = _attachments_to_lines(attachments)
+        if attachment_lines:
+            context_lines.appendleft(f"{role} attached files:\n" + "\n".join(attachment_lines))
+        if content:
+            context_lines.appendleft(f"{role}: {content}")
 
-    # Find the last user message index
-    last_user_idx = -1
-    for i in range(len(items) - 1, -1, -1):
-        if items[i]["role"] == "user":
-            last_user_idx = i
-            break
+    while len(context_lines) > keep_n:
+        context_lines.popleft()
+    if context_lines:
+        ctx = "Previous messages (for context only). Do NOT answer these directly:\n" + "\n".join(context_lines)
+        msgs.append(ChatMessage(role="system", content=ctx))
 
-    if include_prior_context:
-        # Build context lines from all messages except the chosen last user prompt.
-        context_lines: list[str] = []
-        for i, item in enumerate(items):
-            if i == last_user_idx:
-                continue
-            role = item["role"]
-            content = item["content"]
-            if content:
-                context_lines.append(f"{role}: {content}")
-            attachment_lines = _attachments_to_lines(item.get("attachments") or [])
-            if attachment_lines:
-                context_lines.append(f"{role} attached files:\n" + "\n".join(attachment_lines))
-
-        # Truncate context lines to configured keep size to bound upstream tokens.
-        try:
-            keep_n = _summary_keep_last_messages()
-        except Exception:
-            keep_n = 12
-        if len(context_lines) > keep_n:
-            context_lines = context_lines[-keep_n:]
-
-        if context_lines:
-            ctx = "Previous messages (for context only). Do NOT answer these directly:\n" + "\n".join(context_lines)
-            msgs.append(ChatMessage(role="system", content=ctx))
-
-    # Append the most recent user message as the sole user prompt the model
-    # should answer to. If no user message exists, fall back to the last
-    # available message.
-    if last_user_idx != -1:
-        last_item = items[last_user_idx]
-        content = last_item["content"] or ""
-        attachment_lines = _attachments_to_lines(last_item.get("attachments") or [])
+    # Append the most recent user message as the prompt; if no user message
+    # exists, fall back to the last available message.
+    prompt = last_user or last_item
+    if prompt is not None:
+        role, content, attachments = prompt
+        attachment_lines = _attachments_to_lines(attachments)
         if attachment_lines:
             attachment_block = "Attached files:\n" + "\n".join(attachment_lines)
             content = f"{content}\n\n{attachment_block}".strip()
-        msgs.append(ChatMessage(role="user", content=content))
-    elif items:
-        last_item = items[-1]
-        content = last_item["content"] or ""
-        attachment_lines = _attachments_to_lines(last_item.get("attachments") or [])
-        if attachment_lines:
-            attachment_block = "Attached files:\n" + "\n".join(attachment_lines)
-            content = f"{content}\n\n{attachment_block}".strip()
-        msgs.append(ChatMessage(role=last_item["role"], content=content))
+        msgs.append(ChatMessage(role=role, content=content))
 
     return msgs
 
 
+def _conversation_to_chat_messages(convo: ui_conversations.Conversation) -> list[ChatMessage]:
+    return _history_to_chat_messages((convo.summary or "").strip(), convo.messages)
+
+
+_PENDING_PERSISTS: set[asyncio.Task] = set()
+
+
+def _persist_assistant_messages(conversation_id: str, user: Any, msgs: List[Dict[str, Any]]) -> None:
+    # Runs in a worker thread; ui_conversations locks per conversation and SQLite
+    # serializes its own writers, so no extra lock is needed here.
+    try:
+        if user is None:
+            ui_conversations.append_messages(conversation_id, msgs)
+        else:
+            user_store.append_messages(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id, msgs=msgs)
+    except Exception as e:
+        # Best-effort persistence; never fail the stream on storage errors.
+        logger.warning("ui chat: failed to persist assistant message (%s: %s)", type(e).__name__, e)
+
+
+# Background writes that land within this window of each other for the same
+# conversation (e.g. a command result and the reply after it) share one commit.
+_PERSIST_COALESCE_SEC = 0.02
+_PERSIST_BATCHES: Dict[Tuple[Optional[int], str], List[Dict[str, Any]]] = {}
+# Last scheduled flush per conversation (registered before its coalescing
+# sleep); the next flush, and the next user message, wait for it so writes land
+# in order.
+_PERSIST_TAILS: Dict[Tuple[Optional[int], str], asyncio.Task] = {}
+
+
+async def _flush_persist_batch(
+    key: Tuple[Optional[int], str], conversation_id: str, user: Any, prev: Optional[asyncio.Task]
+) -> None:
+    await asyncio.sleep(_PERSIST_COALESCE_SEC)
+    msgs = _PERSIST_BATCHES.pop(key, [])
+    if prev is not None and not prev.done():
+        await asyncio.wait([prev])
+    await asyncio.to_thread(_persist_assistant_messages, conversation_id, user, msgs)
+
+
+def _persist_assistant_message_in_background(conversation_id: str, user: Any, msg: Dict[str, Any]) -> None:
+    key = (getattr(user, "id", None), conversation_id)
+    batch = _PERSIST_BATCHES.get(key)
+    if batch is not None:
+        batch.append(msg)
+        return
+    _PERSIST_BATCHES[key] = [msg]
+    task = asyncio.create_task(_flush_persist_batch(key, conversation_id, user, _PERSIST_TAILS.get(key)))
+    _PERSIST_TAILS[key] = task
+
+    def _done(t: asyncio.Task) -> None:
+        _PENDING_PERSISTS.discard(t)
+        if _PERSIST_TAILS.get(key) is t:
+            del _PERSIST_TAILS[key]
+
+    _PENDING_PERSISTS.add(task)
+    task.add_done_callback(_done)
+
+
+async def _wait_for_pending_persist(conversation_id: str, user: Any) -> None:
+    """Wait until queued background writes for this conversation have landed.
+
+    A user message is appended synchronously; without this a fast follow-up
+    could be stored (and the history read) before the reply it answers.
+    """
+    tail = _PERSIST_TAILS.get((getattr(user, "id", None), conversation_id))
+    if tail is not None and not tail.done():
+        await asyncio.wait([tail])
+
+
+async def drain_pending_persists() -> None:
+    """Wait for in-flight assistant-message writes (called on shutdown)."""
+    if _PENDING_PERSISTS:
+        await asyncio.gather(*list(_PENDING_PERSISTS), return_exceptions=True)
+
+
 async def _stream_ui_chat(
     upstream_gen: Any,
     backend: str,
@@ -3196,179 +3787,112 @@ async def _stream_ui_chat(
     user: Any,
     backend_class: str,
     admission: Any,
-    pre_events: list | None = None,
+    command_events: Any = None,
 ):
+    # Without a command the caller already holds the chat slot.
+    slot_held = command_events is None
     try:
-        # Emit any pre-collected events from server-side command handling.
-        if pre_events:
-            for ev in pre_events:
+        # Stream server-side command events as they are produced.
+        if command_events is not None:
+            async for ev in command_events:
                 try:
                     yield sse(ev)
                 except Exception:
-                    # best-effort: skip malformed pre-events
+                    # best-effort: skip malformed command events
                     continue
+            # Commands can run for minutes; only take the chat slot once the
+            # command is done and the upstream chat request is about to start.
+            try:
+                await admission.acquire(backend_class, "chat")
+            except HTTPException as e:
+                yield sse({"type": "error", "error": e.detail})
+                yield sse({"type": "done"})
+                yield sse_done()
+                return
+            slot_held = True
 
         # Announce routing info first
         yield sse({"type": "route", "backend": backend, "model": upstream_model, "reason": route.reason})
 
-        full_text = ""
+        text_parts: list[str] = []
 
-        async for chunk in upstream_gen:
-            for line in chunk.splitlines():
-                if not line.startswith(b"data:"):
-                    continue
-                data = line[len(b"data:") :].strip()
-                if data == b"[DONE]":
-                    yield sse({"type": "done"})
-                    yield sse_done()
-                    return
+        async for line in iter_lines_bytes(upstream_gen):
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
 
-                try:
-                    j = json.loads(data)
-                except Exception:
-                    continue
+            try:
+                j = _json_loads(data)
+            except Exception:
+                continue
 
-                if isinstance(j, dict) and isinstance(j.get("error"), dict):
-                    yield sse({"type": "error", "error": j.get("error")})
-                    continue
+            if isinstance(j, dict) and isinstance(j.get("error"), dict):
+                yield sse({"type": "error", "error": j.get("error")})
+                continue
 
-                try:
-                    delta = (((j or {}).get("choices") or [{}])[0].get("delta") or {})
-                    text = delta.get("content")
-                    thinking = delta.get("thinking")
-                    thinking_reset = bool(delta.get("thinking_reset"))
-                except Exception:
-                    text = None
-                    thinking = None
-                    thinking_reset = False
+            try:
+                delta = (((j or {}).get("choices") or [{}])[0].get("delta") or {})
+                text = delta.get("content")
+                thinking = delta.get("thinking")
+                thinking_reset = bool(delta.get("thinking_reset"))
+            except Exception:
+                text = None
+                thinking = None
+                thinking_reset = False
 
-                if thinking_reset:
-                    yield sse({"type": "thinking_reset"})
+            if thinking_reset:
+                yield sse({"type": "thinking_reset"})
 
-                if isinstance(thinking, str) and thinking:
-                    yield sse({"type": "thinking", "thinking": thinking})
+            if isinstance(thinking, str) and thinking:
+                yield sse({"type": "thinking", "thinking": thinking})
 
-                if isinstance(text, str) and text:
-                    full_text += text
-                    yield sse({"type": "delta", "delta": text})
+            if isinstance(text, str) and text:
+                text_parts.append(text)
+                yield sse({"type": "delta", "delta": text})
 
-        # After streaming completes, persist assistant message (if any)
+        # After streaming completes, persist assistant message (if any) off the
+        # event loop so the done event is not held behind the storage write.
         if conversation_id:
-            try:
-                if user is None:
-                    ui_conversations.append_message(
-                        conversation_id,
-                        {
-                            "role": "assistant",
-                            "content": full_text,
-                            "backend": backend,
-                            "model": upstream_model,
-                            "reason": route.reason,
-                        },
-                    )
-                else:
-                    user_store.append_message(
-                        S.USER_DB_PATH,
-                        user_id=user.id,
-                        conversation_id=conversation_id,
-                        msg={
-                            "role": "assistant",
-                            "content": full_text,
-                            "backend": backend,
-                            "model": upstream_model,
-                            "reason": route.reason,
-                        },
-                    )
-            except Exception:
-                # Best-effort persistence; do not fail the stream on storage errors.
-                pass
+            _persist_assistant_message_in_background(
+                conversation_id,
+                user,
+                {
+                    "role": "assistant",
+                    "content": "".join(text_parts),
+                    "backend": backend,
+                    "model": upstream_model,
+                    "reason": route.reason,
+                },
+            )
 
         # Signal completion to the UI
         yield sse({"type": "done"})
         yield sse_done()
     finally:
-        admission.release(backend_class, "chat")
+        if slot_held:
+            admission.release(backend_class, "chat")
 
 
 def _conversation_payload_to_chat_messages(convo: Dict[str, Any]) -> list[ChatMessage]:
-    msgs: list[ChatMessage] = []
-    include_prior_context = bool(getattr(S, "UI_CHAT_INCLUDE_PRIOR_CONTEXT", False))
-    summary = str(convo.get("summary") or "").strip()
-    if include_prior_context and summary:
-        msgs.append(ChatMessage(role="system", content=f"Conversation summary:\n{summary}"))
+    return _history_to_chat_messages(str(convo.get("summary") or "").strip(), convo.get("messages"))
 
-    raw_messages = convo.get("messages")
-    if not isinstance(raw_messages, list):
-        return msgs
-
-    # Fold prior messages into a single system context message and present
-    # only the last user message as the user prompt to ensure the model directs
-    # its reply to the most recent input while still having prior context.
-    raw_messages = convo.get("messages")
-    items: list[Dict[str, Any]] = []
-    for item in raw_messages:
-        if not isinstance(item, dict):
-            continue
-        if str(item.get("type") or "") == "image":
-            continue
-        role = _normalize_chat_role(item.get("role"))
-        content = item.get("content")
-        if not isinstance(content, str):
-            content = ""
-        attachments = _coerce_attachments(item.get("attachments"))
-        if not content.strip() and not attachments:
-            continue
-        items.append({"role": role, "content": content.strip(), "attachments": attachments})
-
-    last_user_idx = -1
-    for i in range(len(items) - 1, -1, -1):
-        if items[i]["role"] == "user":
-            last_user_idx = i
-            break
-
-    context_lines: list[str] = []
-    for i, item in enumerate(items):
-        if i == last_user_idx:
-            continue
-        role = item["role"]
-        content = item["content"]
-        if content:
-            context_lines.append(f"{role}: {content}")
-        attachment_lines = _attachments_to_lines(item.get("attachments") or [])
-        if attachment_lines:
-            context_lines.append(f"{role} attached files:\n" + "\n".join(attachment_lines))
 
+def _json_size(payload: Any) -> int:
+    """UTF-8 byte length of payload as JSON; 0 if it cannot be serialized."""
     try:
-        keep_n = _summary_keep_last_messages()
+        return len(dumps_bytes(payload))
     except Exception:
-        keep_n = 12
-    if len(context_lines) > keep_n:
-        context_lines = context_lines[-keep_n:]
-
-    if include_prior_context and context_lines:
-        ctx = "Previous messages (for context only). Do NOT answer these directly:\n" + "\n".join(context_lines)
-        msgs.append(ChatMessage(role="system", content=ctx))
+        return 0
 
-    if last_user_idx != -1:
-        last_item = items[last_user_idx]
-        content = last_item["content"] or ""
-        attachment_lines = _attachments_to_lines(last_item.get("attachments") or [])
-        if attachment_lines:
-            attachment_block = "Attached files:\n" + "\n".join(attachment_lines)
-            content = f"{content}\n\n{attachment_block}".strip()
-        msgs.append(ChatMessage(role="user", content=content))
-    elif items:
-        last_item = items[-1]
-        content = last_item["content"] or ""
-        attachment_lines = _attachments_to_lines(last_item.get("attachments") or [])
-        if attachment_lines:
-            attachment_block = "Attached files:\n" + "\n".join(attachment_lines)
-            content = f"{content}\n\n{attachment_block}".strip()
-        msgs.append(ChatMessage(role=last_item["role"], content=content))
 
-    return msgs
+def _json_text(payload: Any) -> str:
+    """payload as compact, non-ASCII-escaped JSON text."""
+    return dumps_str(payload)
 
 
+@functools.lru_cache(maxsize=1)
 def _summary_trigger_bytes() -> int:
     try:
         return int(getattr(S, "UI_CHAT_SUMMARY_TRIGGER_BYTES", 0) or 0)
@@ -3376,6 +3900,7 @@ def _summary_trigger_bytes() -> int:
         return 0
 
 
+@functools.lru_cache(maxsize=1)
 def _summary_keep_last_messages() -> int:
     try:
         return int(getattr(S, "UI_CHAT_SUMMARY_KEEP_LAST_MESSAGES", 12) or 12)
@@ -3389,15 +3914,11 @@ async def _summarize_if_needed(convo: ui_conversations.Conversation) -> ui_conve
         return convo
 
     # Estimate size based on current stored JSON-ish payload.
-    try:
-        approx = len(json.dumps(convo.to_dict(), ensure_ascii=False).encode("utf-8"))
-    except Exception:
-        approx = 0
+    approx = _json_size(convo.to_dict())
     if approx <= trigger:
         return convo
 
     keep_n = max(4, _summary_keep_last_messages())
-    tail = convo.messages[-keep_n:]
     head = convo.messages[:-keep_n]
     if not head:
         return convo
@@ -3417,10 +3938,7 @@ async def _summarize_if_needed(convo: ui_conversations.Conversation) -> ui_conve
             head_text_parts.append(f"{role} attached files:\n" + "\n".join(attachment_lines))
 
     if not head_text_parts:
-        convo.messages = tail
-        convo.updated = int(time.time())
-        ui_conversations.save(convo)
-        return convo
+        return await _apply_summary(convo, head, convo.summary)
 
     summarizer_model = "long"  # prefer long-context alias if present
     summary_prompt = (
@@ -3440,7 +3958,7 @@ async def _summarize_if_needed(convo: ui_conversations.Conversation) -> ui_conve
         cfg=router_cfg(),
         request_model=cc_sum.model,
         headers={},
-        messages=[m.model_dump(exclude_none=True) for m in cc_sum.messages],
+        messages=_router_messages(cc_sum.messages),
         has_tools=False,
         enable_policy=S.ROUTER_ENABLE_POLICY,
         enable_request_type=getattr(S, "ROUTER_ENABLE_REQUEST_TYPE", False),
@@ -3465,13 +3983,300 @@ async def _summarize_if_needed(convo: ui_conversations.Conversation) -> ui_conve
 
     prior = (convo.summary or "").strip()
     merged = (prior + "\n" + text.strip()).strip() if prior and text.strip() else (text.strip() or prior)
-    convo.summary = merged
-    convo.messages = tail
-    convo.updated = int(time.time())
-    ui_conversations.save(convo)
+    return await _apply_summary(convo, head, merged)
+
+
+async def _apply_summary(
+    convo: ui_conversations.Conversation, head: List[Dict[str, Any]], summary: str
+) -> ui_conversations.Conversation:
+    """Replace `head` with `summary` in the stored conversation.
+
+    The summary call can take a while; messages appended meanwhile must survive, so
+    the change is applied to a fresh copy under the conversation lock.
+    """
+    now = int(time.time())
+
+    def _apply(current: ui_conversations.Conversation) -> None:
+        # Only trim if nobody else (e.g. a concurrent summary) already changed the head.
+        if current.messages[: len(head)] == head:
+            current.messages = current.messages[len(head) :]
+            current.summary = summary
+        current.updated = now
+
+    try:
+        return await asyncio.to_thread(ui_conversations.update, convo.id, _apply)
+    except FileNotFoundError:
+        # Cleaned up mid-summary; nothing stored to trim.
+        convo.messages = convo.messages[len(head) :]
+        convo.summary = summary
+        convo.updated = now
+        return convo
+
+
+def _open_chat_conversation(user: Optional[user_store.User], conversation_id: str, msg: Optional[Dict[str, Any]]) -> Any:
+    """Load (guest: create) the conversation and append `msg` if given; blocking, run via asyncio.to_thread.
+
+    Returns a ui_conversations.Conversation for guests and the user_store dict otherwise.
+    """
+    if user is None:
+        try:
+            convo = ui_conversations.load_or_create(conversation_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="conversation not found")
+        except Exception:
+            raise HTTPException(status_code=500, detail="conversation not found")
+        if msg is not None:
+            try:
+                convo = ui_conversations.append_message(conversation_id, msg)
+            except Exception:
+                pass
+        return convo
+
+    convo = user_store.get_conversation(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id)
+    if convo is None:
+        raise HTTPException(status_code=404, detail="conversation not found")
+    if msg is not None:
+        try:
+            convo = user_store.append_message(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id, msg=msg)
+        except Exception:
+            pass
     return convo
 
 
+def _append_command_message(conversation_id: str, user: Optional[user_store.User], msg: Dict[str, Any]) -> None:
+    """Best-effort: record a slash-command result in the conversation, if any, off the event loop."""
+    if conversation_id:
+        _persist_assistant_message_in_background(conversation_id, user, msg)
+
+
+async def _extract_image_url(resp: Any) -> Optional[str]:
+    """URL of the first generated image; inline base64 is saved to the UI image cache."""
+    try:
+        first = resp["data"][0]
+        if url := (first.get("url") or "").strip():
+            return url
+        b64 = (first.get("b64_json") or "").strip()
+        mime = (resp.get("_gateway") or {}).get("mime", "image/png")
+    except (AttributeError, TypeError, KeyError, IndexError):
+        return None
+    if not b64:
+        return None
+    try:
+        return (await asyncio.to_thread(_save_ui_image, b64=b64, mime_hint=mime))[0]
+    except Exception:
+        return None
+
+
+def _extract_ocr_text(data: Any) -> Optional[str]:
+    """Best-effort text from common OCR response shapes; None if nothing usable."""
+    try:
+        text = data.get("text")
+        items = data.get("data") or ()
+    except (AttributeError, TypeError):
+        return None
+    if isinstance(text, str) and (text := text.strip()):
+        return text
+    parts: list[str] = []
+    for item in items:
+        try:
+            t = item.get("text") or item.get("raw_text") or item.get("transcript")
+            if isinstance(t, str) and (t := t.strip()):
+                parts.append(t)
+                continue
+            for ln in item.get("lines") or ():
+                if isinstance(t := ln.get("text"), str):
+                    parts.append(t)
+        except (AttributeError, TypeError):
+            continue
+    return "\n".join(parts) or None
+
+
+async def _command_image(prompt: str, *, user: Optional[user_store.User], conversation_id: str):
+    try:
+        # Announce backend work to the UI
+        yield {"type": "thinking", "thinking": "Generating image…"}
+        backend_class = resolve_images_backend_class(prompt=prompt or "", requested_model=None)
+        cache_key = _image_result_key("cmd", backend_class, prompt or "", "1024x1024", 1, None, None)
+        async with _keyed_lock(_IMAGE_RESULT_LOCKS, cache_key):
+            cached = _image_result_cache_get(cache_key)
+            if cached is not None:
+                url = cached["data"][0]["url"]
+            else:
+                check_backend_ready(backend_class, route_kind="images")
+                await check_capability(backend_class, "images")
+                admission = get_admission_controller()
+                await admission.acquire(backend_class, "images")
+                try:
+                    resp = await generate_images(
+                        prompt=prompt or "",
+                        size="1024x1024",
+                        n=1,
+                        model=None,
+                        options=None,
+                        response_format="url",
+                        backend_class=backend_class,
+                    )
+                finally:
+                    admission.release(backend_class, "images")
+                url = await _extract_image_url(resp)
+                if url:
+                    _image_result_cache_put(cache_key, {"data": [{"url": url}]}, seeded=False)
+        if url:
+            yield {"type": "delta", "delta": f"[Image] {url}"}
+            # persist to conversation if present
+            _append_command_message(conversation_id, user, {"role": "assistant", "type": "image", "url": url})
+        else:
+            yield {"type": "delta", "delta": "[Image] generation returned no usable URL"}
+    except Exception as e:
+        yield {"type": "delta", "delta": f"[Image] generation failed: {type(e).__name__}: {e}"}
+
+
+async def _command_music(prompt: str, *, user: Optional[user_store.User], conversation_id: str):
+    try:
+        yield {"type": "thinking", "thinking": "Generating music…"}
+        from app.music_backend import generate_music
+
+        out = await generate_music(backend_class=_ui_cfg().music_backend_class, body={"prompt": prompt})
+        url = out.get("audio_url") if isinstance(out, dict) else None
+        if url:
+            yield {"type": "delta", "delta": f"[Music] {url}"}
+            _append_command_message(conversation_id, user, {"role": "assistant", "type": "music", "url": url})
+        else:
+            yield {"type": "delta", "delta": "[Music] generation returned no audio URL"}
+    except Exception as e:
+        yield {"type": "delta", "delta": f"[Music] generation failed: {type(e).__name__}: {e}"}
+
+
+async def _command_speech(prompt: str, *, user: Optional[user_store.User], conversation_id: str):
+    try:
+        yield {"type": "thinking", "thinking": "Synthesizing speech…"}
+        backend_class = _ui_cfg().tts_backend_class
+
+        # Include authenticated user's preferred TTS voice if available
+        voice = None
+        try:
+            if user is not None:
+                voice = _user_tts_voice(user.id)
+        except Exception:
+            # ignore settings lookup failures and fallback to default
+            voice = None
+
+        # Identical prompts (retries, repeated commands) reuse the cached
+        # audio; concurrent identical misses wait for one synthesis.
+        cache_key = _tts_result_key(backend_class, voice, prompt)
+        audio_url = None
+        ctype_local = None
+        async with _keyed_lock(_TTS_RESULT_LOCKS, cache_key):
+            cached = await asyncio.to_thread(_tts_result_cache_get, cache_key)
+            if cached is not None:
+                audio_url, ctype_local = cached
+            else:
+                check_backend_ready(backend_class, route_kind="tts")
+                await check_capability(backend_class, "tts")
+                admission = get_admission_controller()
+                await admission.acquire(backend_class, "tts")
+                try:
+                    tts_body = {"text": prompt}
+                    if voice:
+                        tts_body["voice"] = voice
+                    res = await generate_tts(backend_class=backend_class, body=tts_body)
+                finally:
+                    admission.release(backend_class, "tts")
+
+                # If backend returned a dict containing an audio_url, use it.
+                if isinstance(res, dict):
+                    audio_url = res.get("audio_url")
+                else:
+                    # TtsResult: if raw bytes present, try to cache and expose a UI URL.
+                    try:
+                        raw = getattr(res, "audio", None)
+                        ctype = getattr(res, "content_type", "audio/wav")
+                        if raw:
+                            audio_url, _ = await asyncio.to_thread(_save_ui_audio, audio_bytes=raw, mime_hint=ctype)
+                            ctype_local = ctype
+                            await asyncio.to_thread(_tts_result_cache_put, cache_key, audio_url, ctype)
+                    except Exception:
+                        audio_url = None
+
+        if audio_url:
+            # Emit structured audio event for the UI to play.
+            yield {
+                "type": "audio",
+                "url": audio_url,
+                "content_type": ctype_local or None,
+                "filename": (audio_url.rpartition("/")[2] or None) if isinstance(audio_url, str) else None,
+                "meta": {"backend": backend_class},
+            }
+            _append_command_message(conversation_id, user, {"role": "assistant", "type": "audio", "url": audio_url})
+        else:
+            yield {"type": "delta", "delta": "[Speech] synthesized audio available in TTS UI or returned inline."}
+    except Exception as e:
+        yield {"type": "delta", "delta": f"[Speech] synthesis failed: {type(e).__name__}: {e}"}
+
+
+async def _command_scan(image_url: str, *, user: Optional[user_store.User], conversation_id: str):
+    """OCR an image URL via the LightOnOCR shim."""
+    if not image_url:
+        yield {"type": "delta", "delta": "[Scan] usage: /scan <image_url>"}
+    else:
+        try:
+            yield {"type": "thinking", "thinking": "Scanning image…"}
+            base = _lighton_ocr_base_url()
+            if not base:
+                yield {"type": "delta", "delta": "[Scan] LightOnOCR is not configured (set LIGHTON_OCR_API_BASE_URL in the gateway env)."}
+            else:
+                cache_key = _ocr_cache_key(base, image_url)
+                data = _ocr_cache_get(cache_key)
+                status = 200
+                if data is None:
+                    too_large = await _ocr_image_too_large(image_url)
+                    if too_large is not None:
+                        yield {"type": "delta", "delta": f"[Scan] image too large ({too_large} bytes; limit {_ui_cfg().lighton_ocr_max_bytes})"}
+                        return
+                    status, raw = await _post_ocr(base, image_url)
+                    if status < 400:
+                        try:
+                            data = await _ocr_json(raw)
+                            _ocr_cache_put(cache_key, data)
+                        except Exception:
+                            data = {"raw": raw.decode("utf-8", "replace")}
+                if status >= 400:
+                    yield {"type": "delta", "delta": f"[Scan] failed: HTTP {status}: {raw.decode('utf-8', 'replace')}"}
+                else:
+                    text = _extract_ocr_text(data)
+                    if not text:
+                        text = _json_text(data)[:2000]
+
+                    yield {"type": "delta", "delta": f"[Scan] {text}"}
+                    _append_command_message(conversation_id, user, {"role": "assistant", "type": "scan", "text": text, "image_url": image_url})
+        except Exception as e:
+            yield {"type": "delta", "delta": f"[Scan] failed: {type(e).__name__}: {e}"}
+
+
+# Chat slash-commands: leading token (lowercased) -> async event generator.
+_COMMANDS = {
+    "/image": _command_image,
+    "/music": _command_music,
+    "/speech": _command_speech,
+    "/tts": _command_speech,
+    "/scan": _command_scan,
+}
+
+
+async def _chat_command_events(events: AsyncIterator[Dict[str, Any]]):
+    """Relay a slash-command's UI events, swallowing handler failures.
+
+    Consumed inside the chat SSE stream, so the "thinking" announcement reaches
+    the browser before the backend call starts rather than after it finishes.
+    """
+    try:
+        async for ev in events:
+            yield ev
+    except Exception:
+        # best-effort only; do not fail the chat stream on command-handling errors
+        pass
+
+
 @router.post("/ui/api/chat_stream", include_in_schema=False)
 async def ui_chat_stream(req: Request):
     """Tokenless SSE stream for the browser UI.
@@ -3494,32 +4299,15 @@ async def ui_chat_stream(req: Request):
 
     # Prefer server-side conversation history if a conversation_id is provided.
     if conversation_id:
-        if user is None:
-            convo = ui_conversations.load(conversation_id)
-            if convo is None:
-                # If the client sent a safe but unknown conversation id (for
-                # example left in localStorage from before a cleanup), create
-                # an empty conversation using the same id so the UI can keep
-                # using its stored id instead of getting a 404.
-                if not ui_conversations._is_safe_id(conversation_id):
-                    raise HTTPException(status_code=404, detail="conversation not found")
-                now = int(time.time())
-                try:
-                    convo = ui_conversations.Conversation(id=conversation_id, created=now, updated=now, summary="", messages=[])
-                    ui_conversations.save(convo)
-                except Exception:
-                    raise HTTPException(status_code=500, detail="conversation not found")
-
-            if (isinstance(message_text, str) and message_text.strip()) or attachments:
-                try:
-                    payload: Dict[str, Any] = {"role": "user", "content": (message_text or "").strip()}
-                    if attachments:
-                        payload["attachments"] = attachments
-                    ui_conversations.append_message(conversation_id, payload)
-                    convo = ui_conversations.load(conversation_id) or convo
-                except Exception:
-                    pass
+        user_msg: Optional[Dict[str, Any]] = None
+        if (isinstance(message_text, str) and message_text.strip()) or attachments:
+            user_msg = {"role": "user", "content": (message_text or "").strip()}
+            if attachments:
+                user_msg["attachments"] = attachments
+        await _wait_for_pending_persist(conversation_id, user)
+        convo = await asyncio.to_thread(_open_chat_conversation, user, conversation_id, user_msg)
 
+        if user is None:
             # Best-effort summarization/pruning.
             try:
                 convo = await _summarize_if_needed(convo)
@@ -3528,20 +4316,6 @@ async def ui_chat_stream(req: Request):
 
             messages = _conversation_to_chat_messages(convo)
         else:
-            convo = user_store.get_conversation(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id)
-            if convo is None:
-                raise HTTPException(status_code=404, detail="conversation not found")
-            if (isinstance(message_text, str) and message_text.strip()) or attachments:
-                try:
-                    user_store.append_message(
-                        S.USER_DB_PATH,
-                        user_id=user.id,
-                        conversation_id=conversation_id,
-                        msg={"role": "user", "content": (message_text or "").strip(), "attachments": attachments or None},
-                    )
-                    convo = user_store.get_conversation(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id) or convo
-                except Exception:
-                    pass
             messages = _conversation_payload_to_chat_messages(convo)
     else:
         messages = _coerce_messages(body)
@@ -3557,232 +4331,19 @@ async def ui_chat_stream(req: Request):
     except Exception:
         pass
 
-    # Collect pre-stream events produced by server-side command handling.
-    pre_events: list[dict] = []
-
     # Server-side command handling: if the user sent a single leading slash-command
     # like `/image`, `/music`, or `/speech`, invoke the appropriate backend and
     # emit a short SSE update with the backend result before continuing to the
     # normal chat model routing. This ensures slash-commands always surface the
-    # backend output even if the chat model responds differently.
-    try:
-        if isinstance(message_text, str) and message_text and len(messages) == 1 and (messages[0].role or "") == "user":
-            cmd = message_text.strip()
-            low = cmd.lower()
-            # /image
-            if low == "/image" or low.startswith("/image "):
-                prompt = cmd.replace("/image", "", 1).strip()
-                try:
-                    # Announce backend work to the UI
-                    pre_events.append({"type": "thinking", "thinking": "Generating image…"})
-                    backend_class = resolve_images_backend_class(prompt=prompt or "", requested_model=None)
-                    check_backend_ready(backend_class, route_kind="images")
-                    await check_capability(backend_class, "images")
-                    admission = get_admission_controller()
-                    await admission.acquire(backend_class, "images")
-                    try:
-                        resp = await generate_images(
-                            prompt=prompt or "",
-                            size="1024x1024",
-                            n=1,
-                            model=None,
-                            options=None,
-                            response_format="url",
-                            backend_class=backend_class,
-                        )
-                    finally:
-                        admission.release(backend_class, "images")
-                    url = None
-                    if isinstance(resp, dict):
-                        if isinstance(resp.get("data"), list) and resp["data"]:
-                            first = resp["data"][0]
-                            if isinstance(first, dict) and isinstance(first.get("url"), str) and first.get("url").strip():
-                                url = first.get("url").strip()
-                            elif isinstance(first, dict) and isinstance(first.get("b64_json"), str) and first.get("b64_json").strip():
-                                # save base64 to UI image cache
-                                try:
-                                    url, _, _ = _save_ui_image(b64=first.get("b64_json"), mime_hint=resp.get("_gateway", {}).get("mime", "image/png"))
-                                except Exception:
-                                    url = None
-                    if url:
-                        pre_events.append({"type": "delta", "delta": f"[Image] {url}"})
-                        # persist to conversation if present
-                        try:
-                            if conversation_id:
-                                if user is None:
-                                    ui_conversations.append_message(conversation_id, {"role": "assistant", "type": "image", "url": url})
-                                else:
-                                    user_store.append_message(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id, msg={"role": "assistant", "type": "image", "url": url})
-                        except Exception:
-                            pass
-                    else:
-                        pre_events.append({"type": "delta", "delta": "[Image] generation returned no usable URL"})
-                except Exception as e:
-                    pre_events.append({"type": "delta", "delta": f"[Image] generation failed: {type(e).__name__}: {e}"})
-
-            # /music
-            elif low == "/music" or low.startswith("/music "):
-                prompt = cmd.replace("/music", "", 1).strip()
-                try:
-                    pre_events.append({"type": "thinking", "thinking": "Generating music…"})
-                    from app.music_backend import generate_music
-
-                    out = await generate_music(backend_class=getattr(S, "MUSIC_BACKEND_CLASS", "heartmula_music"), body={"prompt": prompt})
-                    url = out.get("audio_url") if isinstance(out, dict) else None
-                    if url:
-                        pre_events.append({"type": "delta", "delta": f"[Music] {url}"})
-                        try:
-                            if conversation_id:
-                                if user is None:
-                                    ui_conversations.append_message(conversation_id, {"role": "assistant", "type": "music", "url": url})
-                                else:
-                                    user_store.append_message(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id, msg={"role": "assistant", "type": "music", "url": url})
-                        except Exception:
-                            pass
-                    else:
-                        pre_events.append({"type": "delta", "delta": "[Music] generation returned no audio URL"})
-                except Exception as e:
-                    pre_events.append({"type": "delta", "delta": f"[Music] generation failed: {type(e).__name__}: {e}"})
-
-            # /speech or /tts
-            elif low == "/speech" or low.startswith("/speech ") or low.startswith("/tts"):
-                prompt = cmd.replace("/speech", "", 1).replace("/tts", "", 1).strip()
-                try:
-                    pre_events.append({"type": "thinking", "thinking": "Synthesizing speech…"})
-                    backend_class = (getattr(S, "TTS_BACKEND_CLASS", "") or "").strip() or "pocket_tts"
-                    check_backend_ready(backend_class, route_kind="tts")
-                    await check_capability(backend_class, "tts")
-                    admission = get_admission_controller()
-                    await admission.acquire(backend_class, "tts")
-                    try:
-                        from app.tts_backend import generate_tts
+    # backend output even if the chat model responds differently. The command
+    # itself runs inside the stream so its progress events are flushed live.
+    command_events = None
+    if isinstance(message_text, str) and message_text and len(messages) == 1 and (messages[0].role or "") == "user":
+        head, _, rest = message_text.strip().partition(" ")
+        handler = _COMMANDS.get(head.lower())
+        if handler is not None:
+            command_events = _chat_command_events(handler(rest.strip(), user=user, conversation_id=conversation_id))
 
-                        # Include authenticated user's preferred TTS voice if available
-                        tts_body = {"text": prompt}
-                        try:
-                            if user is not None:
-                                settings = user_store.get_settings(S.USER_DB_PATH, user_id=user.id) or {}
-                                voice = None
-                                try:
-                                    voice = (settings.get("tts") or {}).get("voice") if isinstance(settings, dict) else None
-                                except Exception:
-                                    voice = None
-                                if isinstance(voice, str) and voice:
-                                    tts_body["voice"] = voice
-                        except Exception:
-                            # ignore settings lookup failures and fallback to default
-                            pass
-
-                        res = await generate_tts(backend_class=backend_class, body=tts_body)
-                    finally:
-                        admission.release(backend_class, "tts")
-
-                    audio_url = None
-                    # If backend returned a dict containing an audio_url, use it.
-                    if isinstance(res, dict):
-                        audio_url = res.get("audio_url")
-                    else:
-                        # TtsResult: if raw bytes present, try to cache and expose a UI URL.
-                        try:
-                            raw = getattr(res, "audio", None)
-                            ctype = getattr(res, "content_type", "audio/wav")
-                            if raw:
-                                url, _ = _save_ui_audio(audio_bytes=raw, mime_hint=ctype)
-                                audio_url = url
-                        except Exception:
-                            audio_url = None
-
-                    if audio_url:
-                        # Emit structured audio event for the UI to play.
-                        ctype_local = None
-                        try:
-                            ctype_local = ctype  # defined when we cached raw bytes
-                        except Exception:
-                            ctype_local = None
-                        fname = os.path.basename(audio_url) if isinstance(audio_url, str) else None
-                        ev = {"type": "audio", "url": audio_url}
-                        if ctype_local:
-                            ev["content_type"] = ctype_local
-                        if fname:
-                            ev["filename"] = fname
-                        ev["meta"] = {"backend": backend_class}
-                        pre_events.append(ev)
-                        try:
-                            if conversation_id:
-                                if user is None:
-                                    ui_conversations.append_message(conversation_id, {"role": "assistant", "type": "audio", "url": audio_url})
-                                else:
-                                    user_store.append_message(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id, msg={"role": "assistant", "type": "audio", "url": audio_url})
-                        except Exception:
-                            pass
-                    else:
-                        pre_events.append({"type": "delta", "delta": "[Speech] synthesized audio available in TTS UI or returned inline."})
-                except Exception as e:
-                    pre_events.append({"type": "delta", "delta": f"[Speech] synthesis failed: {type(e).__name__}: {e}"})
-
-            # /scan — OCR an image URL via the LightOnOCR shim
-            elif low == "/scan" or low.startswith("/scan "):
-                image_url = cmd.replace("/scan", "", 1).strip()
-                if not image_url:
-                    pre_events.append({"type": "delta", "delta": "[Scan] usage: /scan <image_url>"})
-                else:
-                    try:
-                        pre_events.append({"type": "thinking", "thinking": "Scanning image…"})
-                        import httpx
-                        import json as _json
-
-                        base = _lighton_ocr_base_url()
-                        if not base:
-                            pre_events.append({"type": "delta", "delta": "[Scan] LightOnOCR is not configured (set LIGHTON_OCR_API_BASE_URL in the gateway env)."})
-                        else:
-                            timeout_sec = float(getattr(S, "LIGHTON_OCR_TIMEOUT_SEC", 120) or 120)
-                            timeout = httpx.Timeout(connect=10.0, read=timeout_sec, write=10.0, pool=10.0)
-                            async with httpx.AsyncClient(timeout=timeout) as client:
-                                resp = await client.post(f"{base}/v1/ocr", json={"image_url": image_url})
-                            if resp.status_code >= 400:
-                                pre_events.append({"type": "delta", "delta": f"[Scan] failed: HTTP {resp.status_code}: {resp.text}"})
-                            else:
-                                try:
-                                    data = resp.json()
-                                except Exception:
-                                    data = {"raw": resp.text}
-
-                                # Best-effort text extraction from common shapes
-                                text = None
-                                if isinstance(data, dict):
-                                    if isinstance(data.get("text"), str) and data.get("text").strip():
-                                        text = data.get("text").strip()
-                                    elif isinstance(data.get("data"), list):
-                                        parts = []
-                                        for item in data.get("data"):
-                                            if isinstance(item, dict):
-                                                t = item.get("text") or item.get("raw_text") or item.get("transcript")
-                                                if isinstance(t, str) and t.strip():
-                                                    parts.append(t.strip())
-                                                elif isinstance(item.get("lines"), list):
-                                                    for ln in item.get("lines"):
-                                                        if isinstance(ln, dict) and isinstance(ln.get("text"), str):
-                                                            parts.append(ln.get("text"))
-                                        if parts:
-                                            text = "\n".join(parts)
-
-                                if not text:
-                                    text = _json.dumps(data, ensure_ascii=False)[:2000]
-
-                                pre_events.append({"type": "delta", "delta": f"[Scan] {text}"})
-                                try:
-                                    if conversation_id:
-                                        if user is None:
-                                            ui_conversations.append_message(conversation_id, {"role": "assistant", "type": "scan", "text": text, "image_url": image_url})
-                                        else:
-                                            user_store.append_message(S.USER_DB_PATH, user_id=user.id, conversation_id=conversation_id, msg={"role": "assistant", "type": "scan", "text": text, "image_url": image_url})
-                                except Exception:
-                                    pass
-                    except Exception as e:
-                        pre_events.append({"type": "delta", "delta": f"[Scan] failed: {type(e).__name__}: {e}"})
-    except Exception:
-        # best-effort only; do not fail the chat stream on command-handling errors
-        pass
     cc = ChatCompletionRequest(
         model=model,
         messages=messages,
@@ -3792,8 +4353,8 @@ async def ui_chat_stream(req: Request):
     route = decide_route(
         cfg=router_cfg(),
         request_model=cc.model,
-        headers={k.lower(): v for k, v in req.headers.items()},
-        messages=[m.model_dump(exclude_none=True) for m in cc.messages],
+        headers=req.headers,
+        messages=_router_messages(cc.messages),
         has_tools=False,
         enable_policy=S.ROUTER_ENABLE_POLICY,
         enable_request_type=getattr(S, "ROUTER_ENABLE_REQUEST_TYPE", False),
@@ -3807,12 +4368,14 @@ async def ui_chat_stream(req: Request):
     check_backend_ready(backend_class, route_kind="chat")
     await check_capability(backend_class, "chat")
     admission = get_admission_controller()
-    await admission.acquire(backend_class, "chat")
+    if command_events is None:
+        await admission.acquire(backend_class, "chat")
 
     try:
         upstream_gen = stream_backend_chat_as_openai(cc, backend, upstream_model)
     except Exception:
-        admission.release(backend_class, "chat")
+        if command_events is None:
+            admission.release(backend_class, "chat")
         raise
 
     out = StreamingResponse(
@@ -3825,10 +4388,12 @@ async def ui_chat_stream(req: Request):
             user=user,
             backend_class=backend_class,
             admission=admission,
-            pre_events=pre_events,
+            command_events=command_events,
         ),
         media_type="text/event-stream",
     )
+    # Keep reverse proxies (nginx) from buffering the live command/progress events.
+    out.headers["X-Accel-Buffering"] = "no"
     out.headers["X-Backend-Used"] = backend
     out.headers["X-Model-Used"] = upstream_model
     out.headers["X-Router-Reason"] = route.reason
@@ -3936,6 +4501,81 @@ async def ui_api_backend_status(req: Request) -> Dict[str, Any]:
     }
 
 
+# Recent image-generation results: _memo_key(request) -> (ts, seeded, response).
+# Seeded requests are deterministic and reuse the result while its cached files
+# exist; unseeded ones only coalesce retries/double-submits within a short window
+# so "generate again" still produces a new image.
+_IMAGE_RESULT_CACHE: "OrderedDict[str, Tuple[float, bool, Dict[str, Any]]]" = OrderedDict()
+_IMAGE_RESULT_CACHE_MAX = 512
+_IMAGE_RESULT_UNSEEDED_TTL_SEC = 10.0
+_IMAGE_RESULT_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _image_result_key(kind: str, backend_class: str, prompt: str, size: str, n: int, model: Optional[str], options: Any) -> str:
+    return _memo_key(json.dumps([kind, backend_class, prompt, size, n, model, options], sort_keys=True, default=str))
+
+
+def _ui_image_urls_alive(resp: Dict[str, Any]) -> bool:
+    items = resp.get("data")
+    if not isinstance(items, list) or not items:
+        return False
+    img_dir = _ui_image_dir()
+    cutoff = _sweep_reuse_cutoff(_ui_image_ttl_sec())
+    for item in items:
+        url = item.get("url") if isinstance(item, dict) else None
+        if not isinstance(url, str) or not url.startswith("/ui/images/"):
+            return False
+        name = url[len("/ui/images/") :]
+        if not _is_safe_name(name):
+            return False
+        try:
+            st = os.stat(os.path.join(img_dir, name))
+        except OSError:
+            return False
+        if cutoff is not None and st.st_mtime < cutoff:
+            # Still on disk but about to be swept; don't hand out a URL that will 404.
+            return False
+    return True
+
+
+def _image_result_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    entry = _IMAGE_RESULT_CACHE.get(key)
+    if entry is None:
+        return None
+    ts, seeded, resp = entry
+    if (not seeded and time.monotonic() - ts > _IMAGE_RESULT_UNSEEDED_TTL_SEC) or not _ui_image_urls_alive(resp):
+        _IMAGE_RESULT_CACHE.pop(key, None)
+        return None
+    _IMAGE_RESULT_CACHE.move_to_end(key)
+    return copy.deepcopy(resp)
+
+
+def _image_result_cache_put(key: str, resp: Any, *, seeded: bool) -> None:
+    # Only results served from the UI image cache are reusable; upstream URLs may not be.
+    if not isinstance(resp, dict) or not _ui_image_urls_alive(resp):
+        return
+    _IMAGE_RESULT_CACHE[key] = (time.monotonic(), seeded, copy.deepcopy(resp))
+    _IMAGE_RESULT_CACHE.move_to_end(key)
+    while len(_IMAGE_RESULT_CACHE) > _IMAGE_RESULT_CACHE_MAX:
+        _IMAGE_RESULT_CACHE.popitem(last=False)
+
+
+# Generation options passed through from the /ui/api/image body when present.
+_UI_IMAGE_OPTION_KEYS: Tuple[str, ...] = (
+    "seed",
+    "steps",
+    "num_inference_steps",
+    "guidance",
+    "guidance_scale",
+    "cfg_scale",
+    "negative_prompt",
+    "sampler",
+    "scheduler",
+    "style",
+    "quality",
+)
+
+
 @router.post("/ui/api/image", include_in_schema=False)
 async def ui_image(req: Request) -> Dict[str, Any]:
     _require_ui_access(req)
@@ -3953,84 +4593,365 @@ async def ui_image(req: Request) -> Dict[str, Any]:
     model = body.get("model")
     requested_backend_class = str(body.get("backend_class") or body.get("backend") or "").strip()
 
-    options = {}
-    for k in [
-        "seed",
-        "steps",
-        "num_inference_steps",
-        "guidance",
-        "guidance_scale",
-        "cfg_scale",
-        "negative_prompt",
-        "sampler",
-        "scheduler",
-        "style",
-        "quality",
-    ]:
-        if k in body:
-            options[k] = body.get(k)
-    if not options:
-        options = None
+    options = {k: body[k] for k in _UI_IMAGE_OPTION_KEYS if k in body} or None
 
     try:
         backend_class = requested_backend_class or resolve_images_backend_class(
             prompt=prompt,
             requested_model=str(model) if isinstance(model, str) and model.strip() else None,
         )
-        check_backend_ready(backend_class, route_kind="images")
-        await check_capability(backend_class, "images")
-        admission = get_admission_controller()
-        await admission.acquire(backend_class, "images")
-        try:
-            resp = await generate_images(
-                prompt=prompt,
-                size=size,
-                n=n,
-                model=str(model) if isinstance(model, str) and model.strip() else None,
-                options=options,
-                backend_class=backend_class,
-            )
-        finally:
-            admission.release(backend_class, "images")
-
-        # Prefer short-lived URLs for the browser (avoids huge data: URIs and broken rendering).
-        if isinstance(resp, dict) and isinstance(resp.get("data"), list):
-            gw = resp.get("_gateway") if isinstance(resp.get("_gateway"), dict) else {}
-            mime = (gw.get("mime") or "image/png") if isinstance(gw, dict) else "image/png"
-            ttl_sec = _ui_image_ttl_sec()
-
-            out_items: list[dict[str, Any]] = []
-            first_sha256: str | None = None
-            first_mime: str | None = None
-            for item in resp.get("data")[:n]:
-                if not isinstance(item, dict):
-                    continue
-                b64 = item.get("b64_json")
-                if isinstance(b64, str) and b64.strip():
-                    url, mime_used, sha256 = _save_ui_image(b64=b64, mime_hint=str(mime))
-                    out_items.append({"url": url})
-                    mime = mime_used
-                    if first_sha256 is None:
-                        first_sha256 = sha256
-                        first_mime = mime_used
-
-            if out_items:
-                resp["data"] = out_items
-                resp.setdefault("_gateway", {})
-                if isinstance(resp.get("_gateway"), dict):
-                    resp["_gateway"].update({"mime": mime, "ui_cache": True, "ttl_sec": ttl_sec})
-                    if first_sha256:
-                        resp["_gateway"].update({"ui_image_sha256": first_sha256})
-                    if first_mime:
-                        resp["_gateway"].update({"ui_image_mime": first_mime})
-
-        return resp
+        model_name = str(model) if isinstance(model, str) and model.strip() else None
+        cache_key = _image_result_key("api", backend_class, prompt, size, n, model_name, options)
+        seeded = bool(options) and options.get("seed") is not None
+        async with _keyed_lock(_IMAGE_RESULT_LOCKS, cache_key):
+            cached = _image_result_cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            check_backend_ready(backend_class, route_kind="images")
+            await check_capability(backend_class, "images")
+            admission = get_admission_controller()
+            await admission.acquire(backend_class, "images")
+            try:
+                resp = await generate_images(
+                    prompt=prompt,
+                    size=size,
+                    n=n,
+                    model=model_name,
+                    options=options,
+                    backend_class=backend_class,
+                )
+            finally:
+                admission.release(backend_class, "images")
+
+            # Prefer short-lived URLs for the browser (avoids huge data: URIs and broken rendering).
+            if isinstance(resp, dict) and isinstance(resp.get("data"), list):
+                gw = resp.get("_gateway") if isinstance(resp.get("_gateway"), dict) else {}
+                mime = (gw.get("mime") or "image/png") if isinstance(gw, dict) else "image/png"
+                ttl_sec = _ui_image_ttl_sec()
+
+                out_items: list[dict[str, Any]] = []
+                first_sha256: str | None = None
+                first_mime: str | None = None
+                for item in resp.get("data")[:n]:
+                    if not isinstance(item, dict):
+                        continue
+                    b64 = item.get("b64_json")
+                    if isinstance(b64, str) and b64.strip():
+                        url, mime_used, sha256 = await asyncio.to_thread(_save_ui_image, b64=b64, mime_hint=str(mime))
+                        out_items.append({"url": url})
+                        mime = mime_used
+                        if first_sha256 is None:
+                            first_sha256 = sha256
+                            first_mime = mime_used
+
+                if out_items:
+                    resp["data"] = out_items
+                    resp.setdefault("_gateway", {})
+                    if isinstance(resp.get("_gateway"), dict):
+                        resp["_gateway"].update({"mime": mime, "ui_cache": True, "ttl_sec": ttl_sec})
+                        if first_sha256:
+                            resp["_gateway"].update({"ui_image_sha256": first_sha256})
+                        if first_mime:
+                            resp["_gateway"].update({"ui_image_mime": first_mime})
+
+            _image_result_cache_put(cache_key, resp, seeded=seeded)
+            return resp
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"image backend error: {type(e).__name__}: {e}")
 
 
+# OCR bodies above this size are decoded in a worker thread; a full-page scan
+# can be hundreds of KB of JSON.
+_OCR_INLINE_PARSE_BYTES = 32 * 1024
+
+
+_PUBLIC_FETCH_MAX_REDIRECTS = 5
+
+
+async def _is_public_http_url(url: httpx.URL) -> bool:
+    """True if url is http(s) and its host resolves only to globally routable addresses."""
+    if url.scheme not in ("http", "https") or not url.host:
+        return False
+    host = url.host.split("%", 1)[0]
+    try:
+        addrs = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, url.port or (443 if url.scheme == "https" else 80), type=socket.SOCK_STREAM
+            )
+        except OSError:
+            return False
+        addrs = [ipaddress.ip_address(str(info[4][0]).split("%", 1)[0]) for info in infos]
+    for addr in addrs:
+        if isinstance(addr, ipaddress.IPv6Address) and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        if not addr.is_global or addr.is_multicast:
+            return False
+    return bool(addrs)
+
+
+@asynccontextmanager
+async def _open_public_url(
+    method: str, url: str, *, headers: Optional[Dict[str, str]] = None, timeout: float
+) -> AsyncIterator[httpx.Response]:
+    """Stream a user-supplied URL, refusing loopback/private/link-local targets.
+
+    Redirects are followed here rather than by httpx so every hop is checked
+    before the gateway connects to it. Raises ValueError for refused targets.
+    """
+    client = public_httpx_client()
+    request = client.build_request(method, url, headers=headers, timeout=timeout)
+    for _ in range(_PUBLIC_FETCH_MAX_REDIRECTS + 1):
+        if not await _is_public_http_url(request.url):
+            raise ValueError(f"refusing to fetch non-public URL: {request.url}")
+        resp = await client.send(request, stream=True)
+        if resp.next_request is not None:
+            request = resp.next_request
+            await resp.aclose()
+            continue
+        try:
+            yield resp
+        finally:
+            await resp.aclose()
+        return
+    raise ValueError("too many redirects")
+
+
+async def _ocr_image_too_large(image_url: str) -> Optional[int]:
+    """Content-Length of image_url if a HEAD preflight shows it over LIGHTON_OCR_MAX_BYTES.
+
+    Best-effort: non-HTTP or non-public URLs, failed HEADs and responses without
+    a Content-Length are let through to the OCR backend.
+    """
+    max_bytes = _ui_cfg().lighton_ocr_max_bytes
+    if max_bytes <= 0 or not image_url.lower().startswith(("http://", "https://")):
+        return None
+    try:
+        async with _open_public_url("HEAD", image_url, timeout=3.0) as head:
+            size = int(head.headers.get("content-length") or 0)
+    except Exception:
+        return None
+    return size if size > max_bytes else None
+
+
+# Source images for /scan, downloaded once and sent to the OCR shim as base64
+# instead of a URL it must fetch again: sha256(url) -> (size, etag), in LRU
+# order. Files live under <UI_IMAGE_DIR>/ocr_src (out of the TTL sweeper's
+# reach) and are evicted past LIGHTON_OCR_IMAGE_CACHE_BYTES.
+_OCR_IMAGE_CACHE: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+_OCR_IMAGE_CACHE_LOADED = False
+_OCR_IMAGE_CACHE_TOTAL = 0
+
+
+def _ocr_image_dir() -> str:
+    return os.path.join(_ui_image_dir(), "ocr_src")
+
+
+def _load_ocr_image_cache() -> None:
+    global _OCR_IMAGE_CACHE_LOADED, _OCR_IMAGE_CACHE_TOTAL
+    _OCR_IMAGE_CACHE_LOADED = True
+    found: list[Tuple[float, str, int]] = []
+    try:
+        with os.scandir(_ocr_image_dir()) as it:
+            for entry in it:
+                digest, _, ext = entry.name.partition(".")
+                if ext == "bin":
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, digest, st.st_size))
+    except OSError:
+        return
+    for _, digest, size in sorted(found):
+        try:
+            with open(os.path.join(_ocr_image_dir(), digest + ".etag"), "r", encoding="utf-8") as f:
+                etag = f.read().strip()
+        except OSError:
+            etag = ""
+        _OCR_IMAGE_CACHE[digest] = (size, etag)
+        _OCR_IMAGE_CACHE_TOTAL += size
+
+
+def _replace_file(path: str, data: bytes) -> None:
+    # Readers (a concurrent 304 reusing the cached copy) see the old or the new
+    # file, never a partially written one.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _write_ocr_image(digest: str, raw: bytes, etag: str) -> None:
+    os.makedirs(_ocr_image_dir(), exist_ok=True)
+    path = os.path.join(_ocr_image_dir(), digest)
+    _replace_file(path + ".bin", raw)
+    # The etag goes last: it must never validate an image that isn't in place yet.
+    _replace_file(path + ".etag", etag.encode("utf-8"))
+
+
+def _remove_ocr_images(digests: list[str]) -> None:
+    for digest in digests:
+        for ext in (".bin", ".etag"):
+            try:
+                os.remove(os.path.join(_ocr_image_dir(), digest + ext))
+            except OSError:
+                pass
+
+
+def _ocr_image_cache_add(digest: str, size: int, etag: str) -> list[str]:
+    """Record a stored image; return the digests evicted to stay within budget."""
+    global _OCR_IMAGE_CACHE_TOTAL
+    _ocr_image_cache_drop(digest)
+    _OCR_IMAGE_CACHE[digest] = (size, etag)
+    _OCR_IMAGE_CACHE_TOTAL += size
+    evicted: list[str] = []
+    limit = _ui_cfg().lighton_ocr_image_cache_bytes
+    while _OCR_IMAGE_CACHE_TOTAL > limit and len(_OCR_IMAGE_CACHE) > 1:
+        victim, (victim_size, _) = _OCR_IMAGE_CACHE.popitem(last=False)
+        _OCR_IMAGE_CACHE_TOTAL -= victim_size
+        evicted.append(victim)
+    return evicted
+
+
+def _ocr_image_cache_drop(digest: str) -> None:
+    global _OCR_IMAGE_CACHE_TOTAL
+    old = _OCR_IMAGE_CACHE.pop(digest, None)
+    if old is not None:
+        _OCR_IMAGE_CACHE_TOTAL -= old[0]
+
+
+async def _ocr_image_payload(image_url: str) -> Dict[str, Any]:
+    """OCR request body for image_url: the image as base64 when the source-image cache is on.
+
+    A cached image is revalidated with If-None-Match and reused on 304, or when
+    the origin is unreachable; an error status from the origin evicts it. Anything unexpected (cache off, non-HTTP or
+    non-public URL, oversized or failed download) falls back to letting the
+    shim fetch the URL.
+    """
+    cfg = _ui_cfg()
+    if cfg.lighton_ocr_image_cache_bytes <= 0 or not image_url.lower().startswith(("http://", "https://")):
+        return {"image_url": image_url}
+    if not _OCR_IMAGE_CACHE_LOADED:
+        _load_ocr_image_cache()
+
+    digest = hashlib.sha256(image_url.encode("utf-8")).hexdigest()
+    path = os.path.join(_ocr_image_dir(), digest + ".bin")
+    cached = _OCR_IMAGE_CACHE.get(digest)
+    max_bytes = cfg.lighton_ocr_max_bytes if cfg.lighton_ocr_max_bytes > 0 else cfg.lighton_ocr_image_cache_bytes
+    raw: Optional[bytes] = None
+    try:
+        headers = {"If-None-Match": cached[1]} if cached is not None and cached[1] else {}
+        async with _open_public_url("GET", image_url, headers=headers, timeout=10.0) as resp:
+            if resp.status_code == 304 and cached is not None:
+                _OCR_IMAGE_CACHE.move_to_end(digest)
+            elif resp.status_code < 400:
+                buf = bytearray()
+                async for chunk in resp.aiter_bytes(65536):
+                    buf.extend(chunk)
+                    if len(buf) > max_bytes:
+                        return {"image_url": image_url}
+                raw = bytes(buf)
+                etag = resp.headers.get("etag") or ""
+                await asyncio.to_thread(_write_ocr_image, digest, raw, etag)
+                evicted = _ocr_image_cache_add(digest, len(raw), etag)
+                if evicted:
+                    await asyncio.to_thread(_remove_ocr_images, evicted)
+            else:
+                # The origin answered with an error (404/410 for a deleted image,
+                # 5xx, ...): the cached copy is no longer vouched for, so drop it.
+                if cached is not None:
+                    _ocr_image_cache_drop(digest)
+                    await asyncio.to_thread(_remove_ocr_images, [digest])
+                return {"image_url": image_url}
+    except ValueError:
+        # Refused target (non-public host or redirect loop): never serve it from cache.
+        return {"image_url": image_url}
+    except Exception:
+        if cached is None:
+            return {"image_url": image_url}
+    if raw is None:
+        try:
+            raw = await asyncio.to_thread(Path(path).read_bytes)
+        except OSError:
+            _ocr_image_cache_drop(digest)
+            return {"image_url": image_url}
+    return {"image": base64.b64encode(raw).decode("ascii")}
+
+
+async def _post_ocr(base: str, image_url: str) -> Tuple[int, bytearray]:
+    """POST an image URL to the OCR shim; return (status, body).
+
+    The body is streamed into a single bytearray rather than httpx's chunk
+    list plus joined copy, which matters for multi-MB document scans.
+    """
+    timeout_sec = _ui_cfg().lighton_ocr_timeout_sec
+    timeout = httpx.Timeout(connect=10.0, read=timeout_sec, write=10.0, pool=10.0)
+    payload = await _ocr_image_payload(image_url)
+    body = bytearray()
+    async with shared_httpx_client("ocr").stream("POST", f"{base}/v1/ocr", json=payload, timeout=timeout) as resp:
+        async for chunk in resp.aiter_bytes(65536):
+            body.extend(chunk)
+        return resp.status_code, body
+
+
+async def _ocr_json(content: bytes | bytearray) -> Any:
+    if len(content) > _OCR_INLINE_PARSE_BYTES:
+        return await asyncio.to_thread(_json_loads, content)
+    return _json_loads(content)
+
+
+# OCR results per (backend base URL, normalized image URL): key -> (stored_at, data),
+# bounded LRU on top of the TTL.
+_OCR_RESULT_CACHE: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+_OCR_RESULT_CACHE_MAX = 256
+
+
+def _ocr_cache_key(base: str, image_url: str) -> str:
+    try:
+        parts = urlsplit(image_url.strip())
+        normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, parts.fragment))
+    except ValueError:
+        normalized = image_url.strip()
+    return _memo_key(f"{base}\x1f{normalized}")
+
+
+def _ocr_cache_get(key: str) -> Any:
+    ttl = _ui_cfg().lighton_ocr_cache_ttl_sec
+    entry = _OCR_RESULT_CACHE.get(key)
+    if ttl <= 0 or entry is None:
+        return None
+    if time.monotonic() - entry[0] >= ttl:
+        _OCR_RESULT_CACHE.pop(key, None)
+        return None
+    _OCR_RESULT_CACHE.move_to_end(key)
+    return copy.deepcopy(entry[1])
+
+
+def _ocr_cache_put(key: str, data: Any) -> None:
+    ttl = _ui_cfg().lighton_ocr_cache_ttl_sec
+    if ttl <= 0:
+        return
+    now = time.monotonic()
+    for k in [k for k, (ts, _) in _OCR_RESULT_CACHE.items() if now - ts >= ttl]:
+        _OCR_RESULT_CACHE.pop(k, None)
+    _OCR_RESULT_CACHE[key] = (now, copy.deepcopy(data))
+    _OCR_RESULT_CACHE.move_to_end(key)
+    while len(_OCR_RESULT_CACHE) > _OCR_RESULT_CACHE_MAX:
+        _OCR_RESULT_CACHE.popitem(last=False)
+
+
 @router.post("/ui/api/scan", include_in_schema=False)
 async def ui_scan(req: Request) -> Dict[str, Any]:
     _require_ui_access(req)
@@ -4046,42 +4967,54 @@ async def ui_scan(req: Request) -> Dict[str, Any]:
     requested_backend_class = str(body.get("backend_class") or body.get("backend") or "").strip()
     backend_class = _resolve_ui_backend_class(
         requested_backend_class=requested_backend_class,
-        default_backend_class=(getattr(S, "OCR_BACKEND_CLASS", "") or "").strip() or "lighton_ocr",
+        default_backend_class=_ui_cfg().ocr_backend_class,
         route_kind="ocr",
     )
+    base = _backend_base_url(backend_class) or _lighton_ocr_base_url()
+    cache_key = _ocr_cache_key(base, image_url) if base else ""
+    cached = _ocr_cache_get(cache_key) if cache_key else None
+    if cached is not None:
+        if isinstance(cached, dict):
+            gateway_meta = cached.get("_gateway") if isinstance(cached.get("_gateway"), dict) else {}
+            gateway_meta.update({"backend_class": backend_class, "base_url": base, "cache_hit": True})
+            cached["_gateway"] = gateway_meta
+        return cached
+
+    too_large = await _ocr_image_too_large(image_url)
+    if too_large is not None:
+        raise HTTPException(
+            status_code=413,
+            detail={"error": "image_too_large", "content_length": too_large, "max_bytes": _ui_cfg().lighton_ocr_max_bytes},
+        )
+
     check_backend_ready(backend_class, route_kind="ocr")
     await check_capability(backend_class, "ocr")
     admission = get_admission_controller()
     await admission.acquire(backend_class, "ocr")
 
     try:
-        import httpx
-
-        base = _backend_base_url(backend_class) or _lighton_ocr_base_url()
         if not base:
             raise HTTPException(
                 status_code=503,
                 detail=f"{backend_class} is not configured. Set its base_url in gateway config or env.",
             )
-        timeout_sec = float(getattr(S, "LIGHTON_OCR_TIMEOUT_SEC", 120) or 120)
-        timeout = httpx.Timeout(connect=10.0, read=timeout_sec, write=10.0, pool=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.post(f"{base}/v1/ocr", json={"image_url": image_url})
-            if resp.status_code >= 400:
-                try:
-                    detail = resp.json()
-                except Exception:
-                    detail = resp.text
-                raise HTTPException(status_code=resp.status_code, detail=detail)
+        status, raw = await _post_ocr(base, image_url)
+        if status >= 400:
             try:
-                data = resp.json()
-                if isinstance(data, dict):
-                    gateway_meta = data.get("_gateway") if isinstance(data.get("_gateway"), dict) else {}
-                    gateway_meta.update({"backend_class": backend_class, "base_url": base})
-                    data["_gateway"] = gateway_meta
-                return data
+                detail = _json_loads(raw)
             except Exception:
-                raise HTTPException(status_code=502, detail=resp.text)
+                detail = raw.decode("utf-8", "replace")
+            raise HTTPException(status_code=status, detail=detail)
+        try:
+            data = await _ocr_json(raw)
+            _ocr_cache_put(cache_key, data)
+            if isinstance(data, dict):
+                gateway_meta = data.get("_gateway") if isinstance(data.get("_gateway"), dict) else {}
+                gateway_meta.update({"backend_class": backend_class, "base_url": base})
+                data["_gateway"] = gateway_meta
+            return data
+        except Exception:
+            raise HTTPException(status_code=502, detail=raw.decode("utf-8", "replace"))
     except HTTPException:
         raise
     except Exception as e:
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import array
 import asyncio
+import hashlib
 import json
+import threading
+from collections import OrderedDict
 from typing import Any, AsyncIterator, Dict, List
 
 import httpx
@@ -9,25 +13,31 @@ from fastapi import HTTPException
 
 from app.backends import backend_provider_name, get_registry
 from app.config import S
-from app.httpx_client import httpx_client as _httpx_client
+from app.httpx_client import pooled_httpx_client
 from app.model_aliases import get_alias
 from app.models import ChatCompletionRequest
 from app.openai_utils import sanitize_chat_choices, sse, sse_done
 from app.streaming import passthrough_sse
 
+# Request bodies are serialized with orjson rather than via httpx's json=, which uses stdlib json.
+from app.jsonutil import dumps_bytes as _json_body, loads as _json_loads
+
+
+_JSON_CONTENT_TYPE = {"content-type": "application/json"}
+
 
 def _normalize_messages_for_openai_backend(msgs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
-    last_role: str | None = None
+    # Text parts of out[-1] while it is still mergeable; joined once per run
+    # instead of re-concatenating the growing string for every message.
+    run: List[str] | None = None
     for m in msgs:
         role = (m.get("role") or "").strip()
 
         content = m.get("content")
         if content is None:
             normalized_content: Any = ""
-        elif isinstance(content, str):
-            normalized_content = content
-        elif isinstance(content, (list, dict)):
+        elif isinstance(content, (str, list, dict)):
             normalized_content = content
         else:
             try:
@@ -35,20 +45,27 @@ def _normalize_messages_for_openai_backend(msgs: List[Dict[str, Any]]) -> List[D
             except Exception:
                 normalized_content = str(content)
 
-        if last_role is not None and last_role == role and out:
-            prev = out[-1]
-            prev_content = prev.get("content") or ""
-            if isinstance(prev_content, str) and isinstance(normalized_content, str):
-                prev["content"] = prev_content + "\n" + normalized_content
-            else:
-                out.append({"role": role, "content": normalized_content})
-                last_role = role
+        if run is not None and out[-1]["role"] == role and isinstance(normalized_content, str):
+            run.append(normalized_content)
+            continue
+        if run is not None and len(run) > 1:
+            out[-1]["content"] = "\n".join(run)
+        out.append({"role": role, "content": normalized_content})
+        if isinstance(normalized_content, str):
+            run = [normalized_content]
         else:
-            out.append({"role": role, "content": normalized_content})
-            last_role = role
+            # An empty list/dict merges like "" with a following string.
+            run = None if normalized_content else [""]
+    if run is not None and len(run) > 1:
+        out[-1]["content"] = "\n".join(run)
     return out
 
 
+def _upstream_client(backend_name: str):
+    # One keep-alive pool per backend so a busy backend cannot starve the others' connections.
+    return pooled_httpx_client(f"upstream:{backend_name}")
+
+
 def _resolve_backend_target(backend_name: str) -> tuple[str, str, str]:
     registry = get_registry()
     resolved = registry.resolve_backend_class(backend_name)
@@ -114,33 +131,85 @@ def route_request_for_backend(req: ChatCompletionRequest, backend_name: str, mod
     )
 
 
+def _dump_chat_request(req: ChatCompletionRequest, messages_dumped: List[Dict[str, Any]] | None) -> Dict[str, Any]:
+    # Callers that already dumped req.messages (for routing) pass them in so they are not dumped twice.
+    if messages_dumped is None:
+        return req.model_dump(exclude_none=True)
+    payload = req.model_dump(exclude_none=True, exclude={"messages"})
+    payload["messages"] = messages_dumped
+    return payload
+
+
 async def call_openai_chat(
     req: ChatCompletionRequest,
     *,
     base_url: str | None = None,
     backend_name: str = "local_vllm",
+    messages_dumped: List[Dict[str, Any]] | None = None,
 ) -> Dict[str, Any]:
-    payload = req.model_dump(exclude_none=True)
+    payload = _dump_chat_request(req, messages_dumped)
     if "messages" in payload and isinstance(payload["messages"], list):
         payload["messages"] = _normalize_messages_for_openai_backend(payload["messages"])
 
     provider = backend_provider_name(backend_name)
     target = (base_url or _default_base_url_for_provider(provider)).rstrip("/")
 
-    async with _httpx_client(timeout=600) as client:
-        try:
-            r = await client.post(f"{target}/chat/completions", json=payload)
-            r.raise_for_status()
-            out = r.json()
-            if isinstance(out, dict):
-                sanitize_chat_choices(out)
-                out["model"] = backend_model_id(backend_name, req.model)
-            return out
-        except httpx.HTTPStatusError as e:
-            detail = {"upstream": backend_name, "status": e.response.status_code, "body": e.response.text[:5000]}
-            raise HTTPException(status_code=502, detail=detail)
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail={"upstream": backend_name, "error": str(e)})
+    try:
+        async with _upstream_client(backend_name) as client:
+            r = await client.post(
+                f"{target}/chat/completions",
+                content=_json_body(payload),
+                headers=_JSON_CONTENT_TYPE,
+                timeout=600,
+            )
+        r.raise_for_status()
+        out = _json_loads(r.content)
+        if isinstance(out, dict):
+            sanitize_chat_choices(out)
+            out["model"] = backend_model_id(backend_name, req.model)
+        return out
+    except httpx.HTTPStatusError as e:
+        detail = {"upstream": backend_name, "status": e.response.status_code, "body": e.response.text[:5000]}
+        raise HTTPException(status_code=502, detail=detail)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail={"upstream": backend_name, "error": str(e)})
+
+
+async def _post_embeddings(target: str, inp: Any, model: str, backend_name: str) -> List[Any]:
+    try:
+        async with _upstream_client(backend_name) as client:
+            r = await client.post(
+                f"{target}/embeddings",
+                content=_json_body({"model": model, "input": inp}),
+                headers=_JSON_CONTENT_TYPE,
+                timeout=600,
+            )
+        r.raise_for_status()
+        j = _json_loads(r.content)
+        data = j.get("data", [])
+        return data if isinstance(data, list) else []
+    except httpx.HTTPStatusError as e:
+        detail = {"upstream": backend_name, "status": e.response.status_code, "body": e.response.text[:5000]}
+        raise HTTPException(status_code=502, detail=detail)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail={"upstream": backend_name, "error": str(e)})
+
+
+async def _embed_openai_batch(target: str, texts: List[str], model: str, backend_name: str) -> List[List[float]]:
+    data = await _post_embeddings(target, texts if len(texts) > 1 else texts[0], model, backend_name)
+    out: List[List[float]] = []
+    for item in data:
+        emb = (item or {}).get("embedding")
+        if isinstance(emb, list):
+            out.append(emb)
+    if len(out) != len(texts):
+        raise HTTPException(status_code=502, detail={"upstream": backend_name, "error": "Unexpected embeddings shape"})
+    return out
+
+
+def _embeddings_target(base_url: str | None, backend_name: str) -> str:
+    provider = backend_provider_name(backend_name)
+    return (base_url or _default_base_url_for_provider(provider)).rstrip("/")
 
 
 async def embed_openai_backend(
@@ -150,30 +219,29 @@ async def embed_openai_backend(
     base_url: str | None = None,
     backend_name: str = "local_vllm_embeddings",
 ) -> List[List[float]]:
-    provider = backend_provider_name(backend_name)
-    target = (base_url or _default_base_url_for_provider(provider)).rstrip("/")
-    async with _httpx_client(timeout=600) as client:
-        try:
-            r = await client.post(
-                f"{target}/embeddings",
-                json={"model": model, "input": texts if len(texts) > 1 else texts[0]},
-            )
-            r.raise_for_status()
-            j = r.json()
-            data = j.get("data", [])
-            out: List[List[float]] = []
-            for item in data:
-                emb = (item or {}).get("embedding")
-                if isinstance(emb, list):
-                    out.append(emb)
-            if len(out) != len(texts):
-                raise HTTPException(status_code=502, detail={"upstream": backend_name, "error": "Unexpected embeddings shape"})
-            return out
-        except httpx.HTTPStatusError as e:
-            detail = {"upstream": backend_name, "status": e.response.status_code, "body": e.response.text[:5000]}
-            raise HTTPException(status_code=502, detail=detail)
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail={"upstream": backend_name, "error": str(e)})
+    target = _embeddings_target(base_url, backend_name)
+    batch_size = max(1, int(S.EMBEDDINGS_BATCH_SIZE or 64))
+    if len(texts) <= batch_size:
+        return await _embed_openai_batch(target, texts, model, backend_name)
+
+    # Large inputs: bounded-concurrency batches, reassembled in input order.
+    sem = asyncio.Semaphore(max(1, int(S.EMBEDDINGS_CONCURRENCY or 8)))
+
+    async def _one(batch: List[str]) -> List[List[float]]:
+        async with sem:
+            return await _embed_openai_batch(target, batch, model, backend_name)
+
+    tasks = [asyncio.ensure_future(_one(texts[i : i + batch_size])) for i in range(0, len(texts), batch_size)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # The first failure (e.g. a 502) fails the whole request; don't keep
+        # hitting the upstream with the batches still queued or in flight.
+        # (Not a TaskGroup: callers expect the HTTPException itself, not an ExceptionGroup.)
+        for task in tasks:
+            task.cancel()
+        raise
+    return [emb for batch in results for emb in batch]
 
 
 async def embed_backend(texts: List[str], backend_name: str, model: str) -> List[List[float]]:
@@ -181,10 +249,50 @@ async def embed_backend(texts: List[str], backend_name: str, model: str) -> List
     return await embed_openai_backend(texts, model, base_url=base_url, backend_name=resolved)
 
 
+async def embed_one_backend(text: str, backend_name: str, model: str) -> List[float]:
+    """Embed a single text: posts it as a bare input and returns the one vector, no batch packaging."""
+    resolved, _provider, base_url = _resolve_backend_target(backend_name)
+    data = await _post_embeddings(_embeddings_target(base_url, resolved), text, model, resolved)
+    emb = (data[0] or {}).get("embedding") if len(data) == 1 else None
+    if not isinstance(emb, list):
+        raise HTTPException(status_code=502, detail={"upstream": resolved, "error": "Unexpected embeddings shape"})
+    return emb
+
+
+# Recent memory embeddings: (backend, model, sha1(text with whitespace runs
+# collapsed)) -> vector, in LRU order. Texts that differ only in spacing or
+# surrounding newlines share the vector of whichever variant was embedded first.
+# float32 array('f'): an eighth of a list-of-floats' footprint, and the same precision
+# memory_v2 stores embeddings at (pack_emb), so nothing downstream sees a difference.
+_MEMORY_EMBED_CACHE: "OrderedDict[tuple[str, str, bytes], array.array]" = OrderedDict()
+# tools_bus also embeds from worker threads (each with its own event loop).
+_MEMORY_EMBED_LOCK = threading.Lock()
+
+
 async def embed_text_for_memory(text: str) -> list[float]:
     backend = (S.EMBEDDINGS_BACKEND or S.DEFAULT_BACKEND or "local_mlx").strip()
     model = default_embeddings_model_for_backend(backend)
-    return (await embed_backend([text], backend, model))[0]
+    max_entries = int(S.EMBEDDINGS_CACHE_SIZE or 0)
+    if max_entries <= 0:
+        return await embed_one_backend(text, backend, model)
+
+    key = (backend, model, hashlib.sha1(" ".join(text.split()).encode("utf-8")).digest())
+    with _MEMORY_EMBED_LOCK:
+        hit = _MEMORY_EMBED_CACHE.get(key)
+        if hit is not None:
+            _MEMORY_EMBED_CACHE.move_to_end(key)
+            return hit.tolist()
+    emb = await embed_one_backend(text, backend, model)
+    try:
+        vec = array.array("f", emb)
+    except (TypeError, OverflowError):
+        return emb
+    with _MEMORY_EMBED_LOCK:
+        _MEMORY_EMBED_CACHE[key] = vec
+        while len(_MEMORY_EMBED_CACHE) > max_entries:
+            _MEMORY_EMBED_CACHE.popitem(last=False)
+    # Return the rounded values on a miss too, so hits and misses agree exactly.
+    return vec.tolist()
 
 
 async def transcribe_openai_audio(
@@ -204,23 +312,24 @@ async def transcribe_openai_audio(
                 continue
             data[str(k)] = v
 
-    async with _httpx_client(timeout=timeout) as client:
-        try:
+    try:
+        async with _upstream_client(resolved) as client:
             r = await client.post(
                 f"{base_url}/audio/transcriptions",
                 data=data,
                 files={"file": (file_name, file_bytes, content_type or "application/octet-stream")},
+                timeout=timeout,
             )
-            r.raise_for_status()
-            response_type = (r.headers.get("content-type") or "").lower()
-            if "json" in response_type:
-                return "json", r.json(), response_type
-            return "text", r.text, response_type or "text/plain; charset=utf-8"
-        except httpx.HTTPStatusError as e:
-            detail = {"upstream": resolved, "status": e.response.status_code, "body": e.response.text[:5000]}
-            raise HTTPException(status_code=502, detail=detail)
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail={"upstream": resolved, "error": str(e)})
+        r.raise_for_status()
+        response_type = (r.headers.get("content-type") or "").lower()
+        if "json" in response_type:
+            return "json", _json_loads(r.content), response_type
+        return "text", r.text, response_type or "text/plain; charset=utf-8"
+    except httpx.HTTPStatusError as e:
+        detail = {"upstream": resolved, "status": e.response.status_code, "body": e.response.text[:5000]}
+        raise HTTPException(status_code=502, detail=detail)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail={"upstream": resolved, "error": str(e)})
 
 
 async def stream_openai_chat(
@@ -236,37 +345,49 @@ async def stream_openai_chat(
     provider = backend_provider_name(backend_name)
     target = (base_url or _default_base_url_for_provider(provider)).rstrip("/")
 
-    async with _httpx_client(timeout=None) as client:
-        try:
-            async with client.stream(
-                "POST",
-                f"{target}/chat/completions",
-                json=payload,
-                headers={"accept": "text/event-stream"},
-            ) as r:
-                r.raise_for_status()
-                async for chunk in passthrough_sse(r):
-                    yield chunk
-        except httpx.HTTPStatusError as e:
-            detail = {"upstream": backend_name, "status": e.response.status_code, "body": e.response.text[:5000]}
-            yield sse({"error": {"message": "Upstream error", "type": "upstream_error", "param": None, "code": None, "detail": detail}})
-            yield sse_done()
-        except httpx.RequestError as e:
-            detail = {"upstream": backend_name, "error": str(e)}
-            yield sse({"error": {"message": "Upstream error", "type": "upstream_error", "param": None, "code": None, "detail": detail}})
-            yield sse_done()
-
-
-async def call_backend_chat(req: ChatCompletionRequest, backend_name: str, model_name: str) -> Dict[str, Any]:
+    try:
+        async with _upstream_client(backend_name) as client, client.stream(
+            "POST",
+            f"{target}/chat/completions",
+            content=_json_body(payload),
+            headers={"accept": "text/event-stream", **_JSON_CONTENT_TYPE},
+            timeout=None,
+        ) as r:
+            r.raise_for_status()
+            async for chunk in passthrough_sse(r):
+                yield chunk
+    except httpx.HTTPStatusError as e:
+        detail = {"upstream": backend_name, "status": e.response.status_code, "body": e.response.text[:5000]}
+        yield sse({"error": {"message": "Upstream error", "type": "upstream_error", "param": None, "code": None, "detail": detail}})
+        yield sse_done()
+    except httpx.RequestError as e:
+        detail = {"upstream": backend_name, "error": str(e)}
+        yield sse({"error": {"message": "Upstream error", "type": "upstream_error", "param": None, "code": None, "detail": detail}})
+        yield sse_done()
+
+
+async def call_backend_chat(
+    req: ChatCompletionRequest,
+    backend_name: str,
+    model_name: str,
+    *,
+    messages_dumped: List[Dict[str, Any]] | None = None,
+) -> Dict[str, Any]:
     resolved, _provider, base_url = _resolve_backend_target(backend_name)
     routed_req = route_request_for_backend(req, resolved, model_name)
-    return await call_openai_chat(routed_req, base_url=base_url, backend_name=resolved)
+    return await call_openai_chat(routed_req, base_url=base_url, backend_name=resolved, messages_dumped=messages_dumped)
 
 
-def stream_backend_chat_as_openai(req: ChatCompletionRequest, backend_name: str, model_name: str) -> AsyncIterator[bytes]:
+def stream_backend_chat_as_openai(
+    req: ChatCompletionRequest,
+    backend_name: str,
+    model_name: str,
+    *,
+    messages_dumped: List[Dict[str, Any]] | None = None,
+) -> AsyncIterator[bytes]:
     resolved, _provider, base_url = _resolve_backend_target(backend_name)
     routed_req = route_request_for_backend(req, resolved, model_name)
-    payload = routed_req.model_dump(exclude_none=True)
+    payload = _dump_chat_request(routed_req, messages_dumped)
     payload["model"] = model_name
     payload["stream"] = True
     return stream_openai_chat(payload, base_url=base_url, backend_name=resolved)
@@ -1,27 +1,45 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import functools
 import os
 import secrets
 import sqlite3
+import threading
 import time
 import hashlib
 import hmac
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.jsonutil import dumps_str as _json_dumps, loads as _json_loads
 
 
 def _now() -> int:
     return int(time.time())
 
 
+_tls = threading.local()
+
+
 def _db(db_path: str) -> sqlite3.Connection:
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path, timeout=5)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    conn.execute("PRAGMA foreign_keys=ON;")
-    conn.execute("PRAGMA busy_timeout=5000;")
+    # One connection per (thread, path): setup and PRAGMAs cost more than most of these queries.
+    conns: Dict[str, sqlite3.Connection] = getattr(_tls, "conns", None) or {}
+    _tls.conns = conns
+    conn = conns.get(db_path)
+    if conn is None:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        conns[db_path] = conn
+    elif conn.in_transaction:
+        # Writers commit or roll back in their own `with conn:` blocks; this only guards
+        # against a caller that escaped one (e.g. KeyboardInterrupt mid-statement).
+        conn.rollback()
     return conn
 
 
@@ -75,6 +93,20 @@ def init_db(db_path: str) -> None:
         )
         """
     )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_messages (
+          conversation_id TEXT NOT NULL,
+          seq INTEGER NOT NULL,
+          ts INTEGER NOT NULL,
+          role TEXT NOT NULL,
+          content TEXT NOT NULL,
+          extras_json TEXT,
+          PRIMARY KEY (conversation_id, seq),
+          FOREIGN KEY (conversation_id) REFERENCES user_conversations(id) ON DELETE CASCADE
+        )
+        """
+    )
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS user_api_keys (
@@ -98,7 +130,6 @@ def init_db(db_path: str) -> None:
     conn.execute("CREATE INDEX IF NOT EXISTS idx_user_api_keys_user ON user_api_keys(user_id, created_ts);")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_user_api_keys_hash ON user_api_keys(token_hash);")
     conn.commit()
-    conn.close()
     # Ensure legacy DBs have the 'admin' column
     try:
         conn = _db(db_path)
@@ -106,13 +137,16 @@ def init_db(db_path: str) -> None:
         if "admin" not in cols:
             conn.execute("ALTER TABLE users ADD COLUMN admin INTEGER NOT NULL DEFAULT 0")
             conn.commit()
-        conn.close()
     except Exception:
         # Best-effort: if PRAGMA/ALTER fails (old sqlite?), ignore and continue.
-        try:
-            conn.close()
-        except Exception:
-            pass
+        pass
+    # Move any pre-user_messages history into rows once, here, so reads never write.
+    legacy_rows = conn.execute(
+        "SELECT id, messages_json FROM user_conversations WHERE messages_json != '[]'"
+    ).fetchall()
+    for cid, messages_json in legacy_rows:
+        if messages_json:
+            _migrate_messages_json(conn, str(cid), messages_json)
 
 
 def _hash_api_key(token: str) -> str:
@@ -150,11 +184,11 @@ def create_api_key(
     policy_obj = policy if isinstance(policy, dict) else {}
 
     conn = _db(db_path)
-    try:
-        exists = conn.execute("SELECT id FROM users WHERE id=?", (int(user_id),)).fetchone()
-        if not exists:
-            raise ValueError("user not found")
+    exists = conn.execute("SELECT id FROM users WHERE id=?", (int(user_id),)).fetchone()
+    if not exists:
+        raise ValueError("user not found")
 
+    with conn:
         conn.execute(
             """
             INSERT INTO user_api_keys(id,user_id,name,token_hash,token_hint,created_ts,updated_ts,last_used_ts,revoked_ts,expires_ts,policy_json)
@@ -171,12 +205,9 @@ def create_api_key(
                 None,
                 None,
                 int(expires_ts) if expires_ts is not None else None,
-                json.dumps(policy_obj, ensure_ascii=False),
+                _json_dumps(policy_obj),
             ),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
     return {
         "id": key_id,
@@ -201,13 +232,12 @@ def list_api_keys(db_path: str, *, user_id: int) -> List[Dict[str, Any]]:
         """,
         (int(user_id),),
     ).fetchall()
-    conn.close()
 
     out: List[Dict[str, Any]] = []
     for r in rows:
         policy: Dict[str, Any] = {}
         try:
-            parsed = json.loads(r[8] or "{}")
+            parsed = _json_loads(r[8] or "{}")
             if isinstance(parsed, dict):
                 policy = parsed
         except Exception:
@@ -232,19 +262,21 @@ def list_api_keys(db_path: str, *, user_id: int) -> List[Dict[str, Any]]:
 def revoke_api_key(db_path: str, *, user_id: int, key_id: str) -> bool:
     now = _now()
     conn = _db(db_path)
-    cur = conn.execute(
-        """
-        UPDATE user_api_keys
-        SET revoked_ts=?, updated_ts=?
-        WHERE id=? AND user_id=? AND revoked_ts IS NULL
-        """,
-        (now, now, str(key_id), int(user_id)),
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.execute(
+            """
+            UPDATE user_api_keys
+            SET revoked_ts=?, updated_ts=?
+            WHERE id=? AND user_id=? AND revoked_ts IS NULL
+            """,
+            (now, now, str(key_id), int(user_id)),
+        )
     return cur.rowcount > 0
 
 
+_API_KEY_TOUCH_INTERVAL_SEC = 60
+
+
 def get_user_by_api_key(db_path: str, *, token: str, touch_last_used: bool = True) -> Optional[tuple[User, Dict[str, Any]]]:
     raw = (token or "").strip()
     if not raw:
@@ -266,7 +298,6 @@ def get_user_by_api_key(db_path: str, *, token: str, touch_last_used: bool = Tru
     ).fetchone()
 
     if not row:
-        conn.close()
         return None
 
     (
@@ -287,26 +318,23 @@ def get_user_by_api_key(db_path: str, *, token: str, touch_last_used: bool = Tru
     ) = row
 
     if not hmac.compare_digest(str(stored_hash or ""), token_hash):
-        conn.close()
         return None
     if bool(disabled):
-        conn.close()
         return None
     if revoked_ts is not None:
-        conn.close()
         return None
     if expires_ts is not None and int(expires_ts) < now:
-        conn.close()
         return None
 
-    if touch_last_used:
-        conn.execute("UPDATE user_api_keys SET last_used_ts=?, updated_ts=? WHERE id=?", (now, now, str(key_id)))
-        conn.commit()
-    conn.close()
+    # last_used_ts only needs minute resolution; skipping fresher touches keeps most
+    # bearer-authenticated requests read-only instead of a write transaction each.
+    if touch_last_used and (last_used_ts is None or now - int(last_used_ts) >= _API_KEY_TOUCH_INTERVAL_SEC):
+        with conn:
+            conn.execute("UPDATE user_api_keys SET last_used_ts=?, updated_ts=? WHERE id=?", (now, now, str(key_id)))
 
     policy: Dict[str, Any] = {}
     try:
-        parsed = json.loads(policy_json or "{}")
+        parsed = _json_loads(policy_json or "{}")
         if isinstance(parsed, dict):
             policy = parsed
     except Exception:
@@ -327,11 +355,45 @@ def get_user_by_api_key(db_path: str, *, token: str, touch_last_used: bool = Tru
     return user, key_meta
 
 
-def _hash_password(password: str, salt: bytes) -> str:
-    import hashlib
+_PBKDF2_ITERATIONS = 120_000
+
+
+def _pbkdf2_hashlib(password: bytes, salt: bytes) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password, salt, _PBKDF2_ITERATIONS)
+
+
+def _pbkdf2_cryptography(password: bytes, salt: bytes) -> bytes:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=_PBKDF2_ITERATIONS)
+    return kdf.derive(password)
+
+
+_pbkdf2 = _pbkdf2_hashlib
+
 
-    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 120_000)
-    return digest.hex()
+def configure_password_kdf(backend: str) -> str:
+    """Select the PBKDF2 implementation; returns the one actually in use.
+
+    Both produce identical hashes (SHA-256, 120k iterations, 32 bytes), so switching
+    never invalidates stored passwords. "cryptography" falls back to hashlib when the
+    package is not installed.
+    """
+    global _pbkdf2
+    _pbkdf2 = _pbkdf2_hashlib
+    if (backend or "").strip().lower() != "cryptography":
+        return "hashlib"
+    try:
+        import cryptography.hazmat.primitives.kdf.pbkdf2  # noqa: F401
+    except Exception:
+        return "hashlib"
+    _pbkdf2 = _pbkdf2_cryptography
+    return "cryptography"
+
+
+def _hash_password(password: str, salt: bytes) -> str:
+    return _pbkdf2(password.encode("utf-8"), salt).hex()
 
 
 def _new_salt() -> bytes:
@@ -370,6 +432,10 @@ def _default_settings() -> Dict[str, Any]:
     }
 
 
+# Serialized once for new users' settings rows.
+_DEFAULT_SETTINGS_JSON = _json_dumps(_default_settings())
+
+
 def create_user(db_path: str, *, username: str, password: str) -> User:
     uname = (username or "").strip().lower()
     if not uname:
@@ -382,20 +448,18 @@ def create_user(db_path: str, *, username: str, password: str) -> User:
     now = _now()
     conn = _db(db_path)
     try:
-        cur = conn.execute(
-            "INSERT INTO users(username,password_hash,password_salt,created_ts,updated_ts,disabled,admin) VALUES(?,?,?,?,?,?,0,0)",
-            (uname, phash, salt.hex(), now, now),
-        )
-        user_id = int(cur.lastrowid)
-        conn.execute(
-            "INSERT OR IGNORE INTO user_settings(user_id,settings_json,updated_ts) VALUES(?,?,?)",
-            (user_id, json.dumps(_default_settings(), ensure_ascii=False), now),
-        )
-        conn.commit()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO users(username,password_hash,password_salt,created_ts,updated_ts,disabled,admin) VALUES(?,?,?,?,?,?,0,0)",
+                (uname, phash, salt.hex(), now, now),
+            )
+            user_id = int(cur.lastrowid)
+            conn.execute(
+                "INSERT OR IGNORE INTO user_settings(user_id,settings_json,updated_ts) VALUES(?,?,?)",
+                (user_id, _DEFAULT_SETTINGS_JSON, now),
+            )
     except sqlite3.IntegrityError as e:
         raise ValueError("username already exists") from e
-    finally:
-        conn.close()
     return User(id=user_id, username=uname, disabled=False)
 
 
@@ -412,20 +476,18 @@ def create_user_with_admin(db_path: str, *, username: str, password: str, admin:
     now = _now()
     conn = _db(db_path)
     try:
-        cur = conn.execute(
-            "INSERT INTO users(username,password_hash,password_salt,created_ts,updated_ts,disabled,admin) VALUES(?,?,?,?,?,?,?)",
-            (uname, phash, salt.hex(), now, now, 0, 1 if admin else 0),
-        )
-        user_id = int(cur.lastrowid)
-        conn.execute(
-            "INSERT OR IGNORE INTO user_settings(user_id,settings_json,updated_ts) VALUES(?,?,?)",
-            (user_id, json.dumps(_default_settings(), ensure_ascii=False), now),
-        )
-        conn.commit()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO users(username,password_hash,password_salt,created_ts,updated_ts,disabled,admin) VALUES(?,?,?,?,?,?,?)",
+                (uname, phash, salt.hex(), now, now, 0, 1 if admin else 0),
+            )
+            user_id = int(cur.lastrowid)
+            conn.execute(
+                "INSERT OR IGNORE INTO user_settings(user_id,settings_json,updated_ts) VALUES(?,?,?)",
+                (user_id, _DEFAULT_SETTINGS_JSON, now),
+            )
     except sqlite3.IntegrityError as e:
         raise ValueError("username already exists") from e
-    finally:
-        conn.close()
     return User(id=user_id, username=uname, disabled=False, admin=bool(admin))
 
 
@@ -440,9 +502,8 @@ def set_password(db_path: str, *, username: str, password: str) -> None:
     phash = _hash_password(password, salt)
     now = _now()
     conn = _db(db_path)
-    cur = conn.execute("UPDATE users SET password_hash=?, password_salt=?, updated_ts=? WHERE username=?", (phash, salt.hex(), now, uname))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.execute("UPDATE users SET password_hash=?, password_salt=?, updated_ts=? WHERE username=?", (phash, salt.hex(), now, uname))
     if cur.rowcount == 0:
         raise ValueError("user not found")
 
@@ -450,9 +511,8 @@ def set_password(db_path: str, *, username: str, password: str) -> None:
 def set_admin(db_path: str, *, username: str, admin: bool = True) -> None:
     uname = (username or "").strip().lower()
     conn = _db(db_path)
-    cur = conn.execute("UPDATE users SET admin=?, updated_ts=? WHERE username=?", (1 if admin else 0, _now(), uname))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.execute("UPDATE users SET admin=?, updated_ts=? WHERE username=?", (1 if admin else 0, _now(), uname))
     if cur.rowcount == 0:
         raise ValueError("user not found")
 
@@ -460,9 +520,8 @@ def set_admin(db_path: str, *, username: str, admin: bool = True) -> None:
 def disable_user(db_path: str, *, username: str, disabled: bool = True) -> None:
     uname = (username or "").strip().lower()
     conn = _db(db_path)
-    cur = conn.execute("UPDATE users SET disabled=?, updated_ts=? WHERE username=?", (1 if disabled else 0, _now(), uname))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.execute("UPDATE users SET disabled=?, updated_ts=? WHERE username=?", (1 if disabled else 0, _now(), uname))
     if cur.rowcount == 0:
         raise ValueError("user not found")
 
@@ -470,9 +529,8 @@ def disable_user(db_path: str, *, username: str, disabled: bool = True) -> None:
 def delete_user(db_path: str, *, username: str) -> None:
     uname = (username or "").strip().lower()
     conn = _db(db_path)
-    cur = conn.execute("DELETE FROM users WHERE username=?", (uname,))
-    conn.commit()
-    conn.close()
+    with conn:
+        cur = conn.execute("DELETE FROM users WHERE username=?", (uname,))
     if cur.rowcount == 0:
         raise ValueError("user not found")
 
@@ -480,7 +538,6 @@ def delete_user(db_path: str, *, username: str) -> None:
 def list_users(db_path: str) -> List[User]:
     conn = _db(db_path)
     rows = conn.execute("SELECT id, username, disabled, admin FROM users ORDER BY username ASC").fetchall()
-    conn.close()
     return [User(id=int(r[0]), username=str(r[1]), disabled=bool(r[2]), admin=bool(r[3])) for r in rows]
 
 
@@ -493,7 +550,6 @@ def authenticate(db_path: str, *, username: str, password: str) -> Optional[User
         "SELECT id, username, password_hash, password_salt, disabled, admin FROM users WHERE username=?",
         (uname,),
     ).fetchone()
-    conn.close()
     if not row:
         return None
     user_id, uname, phash, psalt, disabled, admin = row
@@ -508,65 +564,90 @@ def authenticate(db_path: str, *, username: str, password: str) -> Optional[User
     return User(id=int(user_id), username=str(uname), disabled=False, admin=bool(admin))
 
 
+# PBKDF2 gets its own pool: a burst of logins must not occupy the default executor
+# that asyncio.to_thread (and every other blocking helper) shares.
+_PASSWORD_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="user-store-pbkdf2")
+
+
+async def _in_password_pool(fn: Any, *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_PASSWORD_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def authenticate_async(db_path: str, *, username: str, password: str) -> Optional[User]:
+    return await _in_password_pool(authenticate, db_path, username=username, password=password)
+
+
+async def create_user_with_admin_async(db_path: str, *, username: str, password: str, admin: bool = False) -> User:
+    return await _in_password_pool(create_user_with_admin, db_path, username=username, password=password, admin=admin)
+
+
+async def set_password_async(db_path: str, *, username: str, password: str) -> None:
+    await _in_password_pool(set_password, db_path, username=username, password=password)
+
+
 def create_session(db_path: str, *, user_id: int, ttl_sec: int) -> Session:
     token = secrets.token_urlsafe(32)
     now = _now()
     expires = now + max(60, int(ttl_sec))
     conn = _db(db_path)
-    conn.execute(
-        "INSERT INTO user_sessions(token,user_id,created_ts,expires_ts) VALUES(?,?,?,?)",
-        (token, int(user_id), now, expires),
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "INSERT INTO user_sessions(token,user_id,created_ts,expires_ts) VALUES(?,?,?,?)",
+            (token, int(user_id), now, expires),
+        )
     return Session(token=token, user_id=int(user_id), expires_ts=expires)
 
 
-def _purge_expired_sessions(conn: sqlite3.Connection) -> None:
-    conn.execute("DELETE FROM user_sessions WHERE expires_ts < ?", (_now(),))
+def purge_expired_sessions(db_path: str) -> int:
+    conn = _db(db_path)
+    with conn:
+        cur = conn.execute("DELETE FROM user_sessions WHERE expires_ts < ?", (_now(),))
+    return int(cur.rowcount or 0)
 
 
-def get_user_by_session(db_path: str, *, token: str) -> Optional[User]:
+def get_session_user(db_path: str, *, token: str) -> Optional[Tuple[User, int]]:
+    """Return the session's user and its expiry; read-only, expired rows are purged elsewhere."""
     if not token:
         return None
     conn = _db(db_path)
-    _purge_expired_sessions(conn)
     row = conn.execute(
         """
-        SELECT u.id, u.username, u.disabled, u.admin
+        SELECT u.id, u.username, u.disabled, u.admin, s.expires_ts
         FROM user_sessions s
         JOIN users u ON u.id = s.user_id
         WHERE s.token = ? AND s.expires_ts >= ?
         """,
         (token, _now()),
     ).fetchone()
-    conn.commit()
-    conn.close()
     if not row:
         return None
-    user_id, uname, disabled, admin = row
+    user_id, uname, disabled, admin, expires_ts = row
     if disabled:
         return None
-    return User(id=int(user_id), username=str(uname), disabled=False, admin=bool(admin))
+    return User(id=int(user_id), username=str(uname), disabled=False, admin=bool(admin)), int(expires_ts)
+
+
+def get_user_by_session(db_path: str, *, token: str) -> Optional[User]:
+    found = get_session_user(db_path, token=token)
+    return found[0] if found else None
 
 
 def delete_session(db_path: str, *, token: str) -> None:
     if not token:
         return
     conn = _db(db_path)
-    conn.execute("DELETE FROM user_sessions WHERE token=?", (token,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM user_sessions WHERE token=?", (token,))
 
 
 def get_settings(db_path: str, *, user_id: int) -> Dict[str, Any]:
     conn = _db(db_path)
     row = conn.execute("SELECT settings_json FROM user_settings WHERE user_id=?", (int(user_id),)).fetchone()
-    conn.close()
     if not row:
         return _default_settings()
     try:
-        payload = json.loads(row[0])
+        payload = _json_loads(row[0])
         if isinstance(payload, dict):
             return payload
     except Exception:
@@ -578,14 +659,13 @@ def set_settings(db_path: str, *, user_id: int, settings: Dict[str, Any]) -> Non
     if not isinstance(settings, dict):
         raise ValueError("settings must be object")
     now = _now()
-    payload = json.dumps(settings, ensure_ascii=False)
+    payload = _json_dumps(settings)
     conn = _db(db_path)
-    conn.execute(
-        "INSERT INTO user_settings(user_id,settings_json,updated_ts) VALUES(?,?,?) ON CONFLICT(user_id) DO UPDATE SET settings_json=excluded.settings_json, updated_ts=excluded.updated_ts",
-        (int(user_id), payload, now),
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "INSERT INTO user_settings(user_id,settings_json,updated_ts) VALUES(?,?,?) ON CONFLICT(user_id) DO UPDATE SET settings_json=excluded.settings_json, updated_ts=excluded.updated_ts",
+            (int(user_id), payload, now),
+        )
 
 
 def new_conversation_id() -> str:
@@ -593,21 +673,17 @@ def new_conversation_id() -> str:
 
 
 def list_conversations(db_path: str, *, user_id: int) -> List[Dict[str, Any]]:
-    conn = _db(db_path)
-    rows = conn.execute(
-        "SELECT id, created_ts, updated_ts, summary FROM user_conversations WHERE user_id=? ORDER BY updated_ts DESC",
+    cur = _db(db_path).cursor()
+    # Rows come back keyed by the response field names, so each one becomes a dict in a single C call.
+    cur.row_factory = sqlite3.Row
+    rows = cur.execute(
+        """
+        SELECT id, created_ts AS created, updated_ts AS updated, summary
+        FROM user_conversations WHERE user_id=? ORDER BY updated_ts DESC
+        """,
         (int(user_id),),
     ).fetchall()
-    conn.close()
-    return [
-        {
-            "id": str(r[0]),
-            "created": int(r[1]),
-            "updated": int(r[2]),
-            "summary": str(r[3]),
-        }
-        for r in rows
-    ]
+    return [dict(r) for r in rows]
 
 
 def create_conversation(db_path: str, *, user_id: int) -> Dict[str, Any]:
@@ -621,13 +697,59 @@ def create_conversation(db_path: str, *, user_id: int) -> Dict[str, Any]:
         "messages": [],
     }
     conn = _db(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO user_conversations(id,user_id,created_ts,updated_ts,summary,messages_json) VALUES(?,?,?,?,?,?)",
+            (cid, int(user_id), now, now, "", _json_dumps([])),
+        )
+    return payload
+
+
+_MESSAGE_EXTRA_KEYS = ("type", "url", "backend", "model", "reason", "mime", "sha256", "filename", "bytes", "attachments")
+
+
+def _insert_message(conn: sqlite3.Connection, conversation_id: str, entry: Dict[str, Any]) -> None:
+    extras = {k: v for k, v in entry.items() if k not in ("role", "content", "ts")}
     conn.execute(
-        "INSERT INTO user_conversations(id,user_id,created_ts,updated_ts,summary,messages_json) VALUES(?,?,?,?,?,?)",
-        (cid, int(user_id), now, now, "", json.dumps([], ensure_ascii=False)),
+        """
+        INSERT INTO user_messages(conversation_id,seq,ts,role,content,extras_json)
+        VALUES(?,(SELECT COALESCE(MAX(seq),0)+1 FROM user_messages WHERE conversation_id=?),?,?,?,?)
+        """,
+        (
+            conversation_id,
+            conversation_id,
+            int(entry.get("ts") or 0),
+            str(entry.get("role") or ""),
+            str(entry.get("content") or ""),
+            _json_dumps(extras) if extras else None,
+        ),
     )
-    conn.commit()
-    conn.close()
-    return payload
+
+
+def _legacy_messages(messages_json: str) -> List[Dict[str, Any]]:
+    try:
+        legacy = _json_loads(messages_json)
+    except Exception:
+        return []
+    if not isinstance(legacy, list):
+        return []
+    return [m for m in legacy if isinstance(m, dict)]
+
+
+def _migrate_messages_json(conn: sqlite3.Connection, conversation_id: str, messages_json: str) -> None:
+    # Conversations written before user_messages existed keep their history in messages_json;
+    # init_db moves it into rows, and writers repeat that for any it missed.
+    legacy = _legacy_messages(messages_json)
+    with conn:
+        # Claim the migration first: the conditional UPDATE takes the write lock, so of two
+        # concurrent first reads only the one that still sees the legacy payload inserts rows.
+        claimed = conn.execute(
+            "UPDATE user_conversations SET messages_json='[]' WHERE id=? AND messages_json=?",
+            (conversation_id, messages_json),
+        ).rowcount
+        if claimed == 1:
+            for m in legacy:
+                _insert_message(conn, conversation_id, m)
 
 
 def get_conversation(db_path: str, *, user_id: int, conversation_id: str) -> Optional[Dict[str, Any]]:
@@ -636,16 +758,27 @@ def get_conversation(db_path: str, *, user_id: int, conversation_id: str) -> Opt
         "SELECT id, created_ts, updated_ts, summary, messages_json FROM user_conversations WHERE id=? AND user_id=?",
         (conversation_id, int(user_id)),
     ).fetchone()
-    conn.close()
     if not row:
         return None
     cid, created, updated, summary, messages_json = row
-    try:
-        messages = json.loads(messages_json) if messages_json else []
-    except Exception:
-        messages = []
-    if not isinstance(messages, list):
-        messages = []
+    # Read-only: legacy history not yet migrated precedes any rows, as it will once migrated.
+    messages: List[Dict[str, Any]] = []
+    if messages_json and messages_json != "[]":
+        messages.extend(dict(m) for m in _legacy_messages(messages_json))
+    rows = conn.execute(
+        "SELECT ts, role, content, extras_json FROM user_messages WHERE conversation_id=? ORDER BY seq",
+        (str(cid),),
+    ).fetchall()
+    for ts, role, content, extras_json in rows:
+        entry: Dict[str, Any] = {"role": str(role), "content": str(content), "ts": int(ts)}
+        if extras_json:
+            try:
+                extras = _json_loads(extras_json)
+            except Exception:
+                extras = None
+            if isinstance(extras, dict):
+                entry.update(extras)
+        messages.append(entry)
     return {
         "id": str(cid),
         "created": int(created),
@@ -655,10 +788,7 @@ def get_conversation(db_path: str, *, user_id: int, conversation_id: str) -> Opt
     }
 
 
-def append_message(db_path: str, *, user_id: int, conversation_id: str, msg: Dict[str, Any]) -> Dict[str, Any]:
-    convo = get_conversation(db_path, user_id=user_id, conversation_id=conversation_id)
-    if convo is None:
-        raise FileNotFoundError("conversation not found")
+def _message_entry(msg: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(msg, dict):
         raise ValueError("message must be an object")
 
@@ -672,23 +802,52 @@ def append_message(db_path: str, *, user_id: int, conversation_id: str, msg: Dic
         "content": content or "",
         "ts": int(msg.get("ts") or _now()),
     }
-    for k in ["type", "url", "backend", "model", "reason", "mime", "sha256", "filename", "bytes", "attachments"]:
+    for k in _MESSAGE_EXTRA_KEYS:
         if k in msg and msg.get(k) is not None:
             entry[k] = msg.get(k)
+    return entry
 
-    messages = convo.get("messages")
-    if not isinstance(messages, list):
-        messages = []
-    messages.append(entry)
-    now = _now()
 
+def append_message(db_path: str, *, user_id: int, conversation_id: str, msg: Dict[str, Any]) -> Dict[str, Any]:
+    convo = get_conversation(db_path, user_id=user_id, conversation_id=conversation_id)
+    if convo is None:
+        raise FileNotFoundError("conversation not found")
+    entry = _message_entry(msg)
+
+    now = _now()
     conn = _db(db_path)
-    conn.execute(
-        "UPDATE user_conversations SET messages_json=?, updated_ts=? WHERE id=? AND user_id=?",
-        (json.dumps(messages, ensure_ascii=False), now, conversation_id, int(user_id)),
-    )
-    conn.commit()
-    conn.close()
-    convo["messages"] = messages
+    row = conn.execute("SELECT messages_json FROM user_conversations WHERE id=?", (conversation_id,)).fetchone()
+    if row and row[0] and row[0] != "[]":
+        _migrate_messages_json(conn, conversation_id, row[0])
+    # One row per message: appending no longer re-serializes the whole history.
+    with conn:
+        _insert_message(conn, conversation_id, entry)
+        conn.execute(
+            "UPDATE user_conversations SET updated_ts=? WHERE id=? AND user_id=?",
+            (now, conversation_id, int(user_id)),
+        )
+    convo["messages"].append(entry)
     convo["updated"] = now
     return convo
+
+
+def append_messages(db_path: str, *, user_id: int, conversation_id: str, msgs: List[Dict[str, Any]]) -> None:
+    """Append several messages in one transaction, without reading the conversation back."""
+    entries = [_message_entry(m) for m in msgs]
+    conn = _db(db_path)
+    row = conn.execute(
+        "SELECT messages_json FROM user_conversations WHERE id=? AND user_id=?",
+        (conversation_id, int(user_id)),
+    ).fetchone()
+    if not row:
+        raise FileNotFoundError("conversation not found")
+    if row[0] and row[0] != "[]":
+        _migrate_messages_json(conn, conversation_id, row[0])
+
+    with conn:
+        for entry in entries:
+            _insert_message(conn, conversation_id, entry)
+        conn.execute(
+            "UPDATE user_conversations SET updated_ts=? WHERE id=? AND user_id=?",
+            (_now(), conversation_id, int(user_id)),
+        )
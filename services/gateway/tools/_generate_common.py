@@ -0,0 +1,124 @@
+"""Shared stdin -> POST -> stdout relay for the *_generate.py tool wrappers.
+
+Each wrapper only supplies its service's env prefix, defaults and timeout; the
+env-file loading, JSON handling and error reporting live here once.
+"""
+
+import functools
+import json
+import os
+import re
+import sys
+from typing import Optional, Sequence
+import urllib.error
+import urllib.request
+
+from _jsonutil import dumps as _json_dumps, loads as _json_loads
+
+
+DEFAULT_GATEWAY_ENV_FILE = "/var/lib/gateway/app/.env"
+
+
+@functools.lru_cache(maxsize=None)
+def _env_line_re(prefix: Optional[str]) -> "re.Pattern[bytes]":
+    """KEY=value line matcher with the key prefix baked into the compiled pattern.
+
+    Built once per prefix; run_generate loads up to three files with the same one.
+    """
+    # Only lines whose key carries the prefix (or, without one, any non-comment
+    # KEY=value line) match.
+    key_re = re.escape(prefix.encode("utf-8")) + rb"[^=\n]*" if prefix else rb"[^#=\s][^=\n]*"
+    return re.compile(rb"(?m)^[ \t]*(" + key_re + rb")=([^\n]*)")
+
+
+def _load_env_file(path: str, *, prefix: Optional[str] = None) -> None:
+    # A missing file (the usual case when the service runs on another host) is
+    # just a failed open(); no separate exists() stat first.
+    try:
+        with open(path, "rb") as handle:
+            data = handle.read()
+    except OSError:
+        return
+    # One regex pass instead of per-line strip/split.
+    for m in _env_line_re(prefix).finditer(data):
+        key = m.group(1).decode("utf-8")
+        if key not in os.environ:
+            os.environ[key] = m.group(2).decode("utf-8").strip().strip('"')
+
+
+def _read_input() -> dict:
+    if sys.stdin.isatty():
+        return {}
+    raw = sys.stdin.buffer.read()
+    # isspace() scans without the copy strip() makes; both parsers skip the
+    # surrounding whitespace themselves.
+    if not raw or raw.isspace():
+        return {}
+    return _json_loads(raw)
+
+
+def run_generate(
+    service_prefix: str,
+    default_env_file: str,
+    default_host: str,
+    default_port: str,
+    default_path: str,
+    timeout_env: str,
+    timeout_default: int,
+    *,
+    service_name: str,
+    base_url_envs: Sequence[str] = (),
+    path_env: Optional[str] = None,
+) -> int:
+    """Relay the JSON payload on stdin to the service and its reply to stdout.
+
+    Settings are read from the process env first, then `<prefix>ENV_FILE`, the
+    gateway's .env and `default_env_file` (only `<prefix>*` keys are loaded).
+    The first non-empty `base_url_envs` entry wins over `<prefix>HOST`/`PORT`.
+    """
+    # Prefer explicit env vars (inherited from the gateway process). When the
+    # gateway runs on a different host than the service, the service's own env
+    # file typically won't exist here, so the gateway's .env is tried first.
+    env_file_override = os.environ.get(f"{service_prefix}ENV_FILE", "").strip()
+    if env_file_override:
+        _load_env_file(env_file_override, prefix=service_prefix)
+
+    _load_env_file(DEFAULT_GATEWAY_ENV_FILE, prefix=service_prefix)
+    _load_env_file(default_env_file, prefix=service_prefix)
+
+    payload = _read_input()
+
+    base_url = next((os.environ[name] for name in base_url_envs if os.environ.get(name)), None)
+    if not base_url:
+        host = os.environ.get(f"{service_prefix}HOST", default_host)
+        port = os.environ.get(f"{service_prefix}PORT", default_port)
+        base_url = f"http://{host}:{port}"
+    base_url = base_url.rstrip("/")
+
+    path = os.environ.get(path_env, default_path) if path_env else default_path
+    if not path.startswith("/"):
+        path = "/" + path
+    endpoint = f"{base_url}{path}"
+
+    req = urllib.request.Request(
+        endpoint,
+        data=_json_dumps(payload),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+
+    timeout_sec = int(os.environ.get(timeout_env, str(timeout_default)))
+    error = f"{service_name} request failed"
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
+            # Relay the upstream body as-is; no decode/re-encode round trip.
+            sys.stdout.buffer.write(resp.read() + b"\n")
+            return 0
+    except urllib.error.HTTPError as exc:
+        err_body = exc.read().decode("utf-8") if exc.fp else ""
+        print(json.dumps({"error": error, "status": exc.code, "detail": err_body}))
+        return 1
+    except Exception as exc:  # noqa: BLE001
+        print(json.dumps({"error": error, "detail": str(exc)}))
+        return 1
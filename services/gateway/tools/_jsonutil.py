@@ -0,0 +1,28 @@
+"""JSON helpers shared by the standalone tool scripts.
+
+The tools run under whatever python3 tools_registry.json points at and need
+only the stdlib, so orjson is used when it is installed and json otherwise.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # stdlib-only interpreter
+    orjson = None  # type: ignore
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def dumps(obj: Any, *, pretty: bool = False) -> bytes:
+    """JSON bytes; `pretty` means 2-space indent with sorted keys."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=(orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS) if pretty else 0)
+        except TypeError:
+            # orjson refuses non-str dict keys and ints beyond 64 bits.
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, sort_keys=True).encode("utf-8")
+    return json.dumps(obj).encode("utf-8")
@@ -15,23 +15,43 @@ script; missing fields are recorded as null/"unknown".
 from __future__ import annotations
 
 import argparse
+import base64
 import datetime as _dt
-import json
+import functools
+import http.client
 import os
 import platform
 import shutil
 import subprocess
 import sys
 import ssl
-from urllib.parse import urlparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urljoin, urlparse
 import time
+import urllib.request
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
 
+from _jsonutil import dumps as _json_dumps, loads as _json_loads
 
-_TLS_CONTEXT: ssl.SSLContext | None = None
+
+_TLS_INSECURE = False
+
+
+@functools.lru_cache(maxsize=None)
+def _tls_context(insecure: bool) -> ssl.SSLContext:
+    """Built on the first HTTPS connection; loading the CA bundle costs tens of ms
+    and all-HTTP appliance setups never need it."""
+    if insecure:
+        return ssl._create_unverified_context()
+    return ssl.create_default_context()
+
+
+def _dumps_manifest(manifest: Dict[str, Any]) -> bytes:
+    # Sorted keys and 2-space indent keep manifests deterministic and diffable.
+    return _json_dumps(manifest, pretty=True) + b"\n"
 
 
 def _read_text(path: str) -> Optional[str]:
@@ -52,54 +72,159 @@ def _run_cmd(argv: list[str], *, timeout_sec: float = 2.0) -> Tuple[int, str]:
         return 127, f"{type(e).__name__}: {e}"
 
 
-def _http_json(method: str, url: str, *, headers: Optional[dict[str, str]] = None, timeout_sec: float = 5.0) -> Tuple[Optional[int], Any, Optional[str]]:
-    req = Request(url=url, method=method, headers=headers or {})
-    try:
-        with urlopen(req, timeout=timeout_sec, context=_TLS_CONTEXT) as resp:
-            status = int(getattr(resp, "status", resp.getcode()))
-            raw = resp.read()
-        try:
-            return status, json.loads(raw.decode("utf-8")), None
-        except Exception:
-            return status, None, "invalid json"
-    except HTTPError as e:
-        try:
-            body = e.read()
-            detail = body[:400].decode("utf-8", errors="replace")
-        except Exception:
-            detail = ""
-        return int(e.code), None, f"HTTPError: {e.code} {detail}".strip()
-    except URLError as e:
-        return None, None, f"URLError: {e}"
-    except Exception as e:
-        return None, None, f"{type(e).__name__}: {e}"
+# Idle keep-alive connections per (scheme, host, port, proxy), shared by the probe
+# threads. A connection is checked out for exactly one request at a time (http.client
+# connections are not thread-safe) and returned once its response is fully read,
+# so a later probe to the same host skips the TCP/TLS handshake.
+_ConnKey = Tuple[str, str, Optional[int], Optional[str]]
+_HTTP_IDLE: Dict[_ConnKey, list[http.client.HTTPConnection]] = {}
+_HTTP_IDLE_LOCK = threading.Lock()
 
+# Same redirect statuses urlopen follows; only GET/HEAD probes are redirected.
+_HTTP_REDIRECTS = (301, 302, 303, 307, 308)
+_HTTP_MAX_REDIRECTS = 5
 
-def _http_post_json(url: str, payload: dict[str, Any], *, headers: Optional[dict[str, str]] = None, timeout_sec: float = 10.0) -> Tuple[Optional[int], Any, Optional[str]]:
-    body = json.dumps(payload).encode("utf-8")
-    hdrs = {"content-type": "application/json"}
-    if headers:
-        hdrs.update(headers)
-    req = Request(url=url, data=body, method="POST", headers=hdrs)
-    try:
-        with urlopen(req, timeout=timeout_sec, context=_TLS_CONTEXT) as resp:
-            status = int(getattr(resp, "status", resp.getcode()))
-            raw = resp.read()
-        try:
-            return status, json.loads(raw.decode("utf-8")), None
-        except Exception:
-            return status, None, "invalid json"
-    except HTTPError as e:
+
+@functools.lru_cache(maxsize=None)
+def _proxy_for(scheme: str, hostport: str) -> Optional[str]:
+    """The HTTP(S)_PROXY urlopen would use for this origin (honoring NO_PROXY), or None."""
+    if urllib.request.proxy_bypass(hostport):
+        return None
+    return urllib.request.getproxies().get(scheme) or None
+
+
+@functools.lru_cache(maxsize=None)
+def _proxy_auth_headers(proxy: str) -> Tuple[str, str, Dict[str, str]]:
+    """(host, port, Proxy-Authorization headers) for a proxy URL from the environment."""
+    p = urlparse(proxy if "://" in proxy else f"http://{proxy}")
+    headers: Dict[str, str] = {}
+    if p.username:
+        cred = f"{unquote(p.username)}:{unquote(p.password or '')}".encode("utf-8")
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(cred).decode("ascii")
+    return p.hostname or "", p.port or 80, headers
+
+
+def _checkout_http_conn(key: _ConnKey, timeout_sec: float) -> http.client.HTTPConnection:
+    with _HTTP_IDLE_LOCK:
+        idle = _HTTP_IDLE.get(key)
+        conn = idle.pop() if idle else None
+    if conn is None:
+        scheme, host, port, proxy = key
+        if proxy:
+            proxy_host, proxy_port, proxy_headers = _proxy_auth_headers(proxy)
+            if scheme == "https":
+                # CONNECT tunnel through the proxy, then TLS to the origin.
+                conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=timeout_sec, context=_tls_context(_TLS_INSECURE))
+                conn.set_tunnel(host, port, headers=proxy_headers)
+            else:
+                conn = http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout_sec)
+        elif scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout_sec, context=_tls_context(_TLS_INSECURE))
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout_sec)
+    else:
+        conn.timeout = timeout_sec
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout_sec)
+    return conn
+
+
+def _checkin_http_conn(key: _ConnKey, conn: http.client.HTTPConnection) -> None:
+    with _HTTP_IDLE_LOCK:
+        _HTTP_IDLE.setdefault(key, []).append(conn)
+
+
+def _close_http_conns() -> None:
+    with _HTTP_IDLE_LOCK:
+        conns = [c for idle in _HTTP_IDLE.values() for c in idle]
+        _HTTP_IDLE.clear()
+    for conn in conns:
+        conn.close()
+
+
+def _http_roundtrip(
+    method: str,
+    url: str,
+    *,
+    body: Optional[bytes],
+    headers: dict[str, str],
+    timeout_sec: float,
+) -> Tuple[Optional[int], Optional[str], bytes, Optional[str]]:
+    """One request on a pooled connection: (status, Location header, body, error)."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return None, None, b"", f"URLError: unsupported url {url!r}"
+    hostport = f"{parsed.hostname}:{parsed.port}" if parsed.port else parsed.hostname
+    proxy = _proxy_for(parsed.scheme, hostport)
+    key = (parsed.scheme, parsed.hostname, parsed.port, proxy)
+    path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+    if proxy and parsed.scheme == "http":
+        # A plain-HTTP proxy takes the absolute URL as the request target.
+        path = f"http://{parsed.netloc.rpartition('@')[2]}{path}"
+        headers = {**_proxy_auth_headers(proxy)[2], **headers}
+
+    for attempt in (0, 1):
+        conn = _checkout_http_conn(key, timeout_sec)
         try:
-            body2 = e.read()
-            detail = body2[:400].decode("utf-8", errors="replace")
-        except Exception:
-            detail = ""
-        return int(e.code), None, f"HTTPError: {e.code} {detail}".strip()
-    except URLError as e:
-        return None, None, f"URLError: {e}"
-    except Exception as e:
-        return None, None, f"{type(e).__name__}: {e}"
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            status = int(resp.status)
+            raw = resp.read()
+        except (http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError, ConnectionResetError) as e:
+            # The server closed an idle keep-alive connection; reconnect once.
+            conn.close()
+            if attempt:
+                return None, None, b"", f"URLError: {e}"
+            continue
+        except OSError as e:
+            conn.close()
+            return None, None, b"", f"URLError: {e}"
+        except Exception as e:
+            conn.close()
+            return None, None, b"", f"{type(e).__name__}: {e}"
+        if resp.will_close:
+            conn.close()
+        else:
+            _checkin_http_conn(key, conn)
+        return status, resp.getheader("Location"), raw, None
+    return None, None, b"", "URLError: connection closed"
+
+
+def _http_call(
+    method: str,
+    url: str,
+    *,
+    body: Optional[bytes] = None,
+    headers: Optional[dict[str, str]] = None,
+    timeout_sec: float,
+) -> Tuple[Optional[int], Any, Optional[str]]:
+    hdrs = dict(headers or {})
+    for _ in range(_HTTP_MAX_REDIRECTS + 1):
+        status, location, raw, err = _http_roundtrip(method, url, body=body, headers=hdrs, timeout_sec=timeout_sec)
+        if err is not None:
+            return status, None, err
+        if status in _HTTP_REDIRECTS and location and method in ("GET", "HEAD"):
+            target = urljoin(url, location)
+            if urlparse(target).netloc != urlparse(url).netloc:
+                # Don't hand the gateway token to another origin.
+                hdrs = {k: v for k, v in hdrs.items() if k.lower() != "authorization"}
+            url = target
+            continue
+        break
+    else:
+        return status, None, f"HTTPError: {status} too many redirects"
+
+    if status >= 400:
+        detail = raw[:400].decode("utf-8", errors="replace")
+        return status, None, f"HTTPError: {status} {detail}".strip()
+    try:
+        return status, _json_loads(raw), None
+    except Exception:
+        return status, None, "invalid json"
+
+
+def _http_json(method: str, url: str, *, headers: Optional[dict[str, str]] = None, timeout_sec: float = 5.0) -> Tuple[Optional[int], Any, Optional[str]]:
+    return _http_call(method, url, headers=headers, timeout_sec=timeout_sec)
 
 
 @dataclass
@@ -115,27 +240,34 @@ def _best_effort(fn, *args, **kwargs) -> BestEffortField:
         return BestEffortField(value=None, error=f"{type(e).__name__}: {e}")
 
 
-    def _derive_obs_url(base_url: str) -> str:
-        override = (os.getenv("GATEWAY_OBS_URL") or "").strip()
-        if override:
-            return override
+@functools.lru_cache(maxsize=None)
+def _env(name: str, default: str = "") -> str:
+    """os.getenv, stripped, with blank treated as unset; cached for the life of the run."""
+    return (os.getenv(name) or "").strip() or default
 
-        obs_port = (os.getenv("OBSERVABILITY_PORT") or "8801").strip()
-        try:
-            obs_port_int = int(obs_port)
-        except Exception:
-            obs_port_int = 8801
 
-        parsed = urlparse(base_url)
-        host = parsed.hostname or "127.0.0.1"
-        return f"http://{host}:{obs_port_int}"
+def _derive_obs_url(base_url: str) -> str:
+    override = _env("GATEWAY_OBS_URL")
+    if override:
+        return override
+
+    obs_port = _env("OBSERVABILITY_PORT", "8801")
+    try:
+        obs_port_int = int(obs_port)
+    except Exception:
+        obs_port_int = 8801
 
+    parsed = urlparse(base_url)
+    host = parsed.hostname or "127.0.0.1"
+    return f"http://{host}:{obs_port_int}"
 
+
+@functools.lru_cache(maxsize=None)
 def _env_gateway_token() -> str:
-    tok = (os.getenv("GATEWAY_BEARER_TOKEN") or "").strip()
+    tok = _env("GATEWAY_BEARER_TOKEN")
     if tok:
         return tok
-    raw = (os.getenv("GATEWAY_BEARER_TOKENS") or "").strip()
+    raw = _env("GATEWAY_BEARER_TOKENS")
     if raw:
         for part in raw.split(","):
             t = part.strip()
@@ -148,6 +280,13 @@ def _now_iso() -> str:
     return _dt.datetime.now(tz=_dt.timezone.utc).isoformat()
 
 
+def _vllm_cli_version() -> Optional[dict[str, Any]]:
+    if not shutil.which("vllm"):
+        return None
+    rc, out = _run_cmd(["vllm", "--version"], timeout_sec=2.0)
+    return {"rc": rc, "output": out}
+
+
 def _deployed_commit_stamps(app_dir: str) -> dict[str, Optional[str]]:
     return {
         "gateway_commit": _read_text(os.path.join(app_dir, "DEPLOYED_GATEWAY_COMMIT")),
@@ -164,30 +303,27 @@ def _collect_upstream_versions(
     mlx_base_url: str,
 ) -> dict[str, Any]:
     out: dict[str, Any] = {"vllm": {}, "vllm_fast": {}, "vllm_embeddings": {}, "mlx": {}}
-
-    if vllm_base_url:
-        st, j, err = _http_json("GET", vllm_base_url.rstrip("/") + "/models", timeout_sec=5.0)
-        out["vllm"]["models_status"] = st
-        out["vllm"]["models"] = j
-        out["vllm"]["models_error"] = err
-
-    if vllm_fast_base_url:
-        st, j, err = _http_json("GET", vllm_fast_base_url.rstrip("/") + "/models", timeout_sec=5.0)
-        out["vllm_fast"]["models_status"] = st
-        out["vllm_fast"]["models"] = j
-        out["vllm_fast"]["models_error"] = err
-
-    if vllm_embeddings_base_url:
-        st, j, err = _http_json("GET", vllm_embeddings_base_url.rstrip("/") + "/models", timeout_sec=5.0)
-        out["vllm_embeddings"]["models_status"] = st
-        out["vllm_embeddings"]["models"] = j
-        out["vllm_embeddings"]["models_error"] = err
-
-    if mlx_base_url:
-        st, j, err = _http_json("GET", mlx_base_url.rstrip("/") + "/models", timeout_sec=5.0)
-        out["mlx"]["models_status"] = st
-        out["mlx"]["models"] = j
-        out["mlx"]["models_error"] = err
+    targets = {
+        "vllm": vllm_base_url,
+        "vllm_fast": vllm_fast_base_url,
+        "vllm_embeddings": vllm_embeddings_base_url,
+        "mlx": mlx_base_url,
+    }
+    targets = {name: url for name, url in targets.items() if url}
+    if not targets:
+        return out
+
+    # Independent hosts; probe them concurrently so the wait is the slowest one.
+    with ThreadPoolExecutor(max_workers=len(targets)) as ex:
+        futures = {
+            name: ex.submit(_http_json, "GET", url.rstrip("/") + "/models", timeout_sec=5.0)
+            for name, url in targets.items()
+        }
+        for name, fut in futures.items():
+            st, j, err = fut.result()
+            out[name]["models_status"] = st
+            out[name]["models"] = j
+            out[name]["models_error"] = err
 
     return out
 
@@ -197,17 +333,17 @@ def main(argv: list[str]) -> int:
     p.add_argument("--out", default="", help="Output JSON path (default: /var/lib/gateway/app/release_manifest.json).")
     p.add_argument(
         "--app-dir",
-        default=os.getenv("GATEWAY_APP_DIR") or "/var/lib/gateway/app",
+        default=_env("GATEWAY_APP_DIR", "/var/lib/gateway/app"),
         help="Runtime app dir (default: /var/lib/gateway/app).",
     )
     p.add_argument(
         "--base-url",
-        default=os.getenv("GATEWAY_BASE_URL") or "https://127.0.0.1:8800",
+        default=_env("GATEWAY_BASE_URL", "https://127.0.0.1:8800"),
         help="Gateway base URL for /v1/* queries.",
     )
     p.add_argument(
         "--obs-url",
-        default=os.getenv("GATEWAY_OBS_URL") or "",
+        default=_env("GATEWAY_OBS_URL"),
         help="Observability base URL for /health and /health/upstreams (defaults to derive from base URL).",
     )
     p.add_argument(
@@ -222,33 +358,29 @@ def main(argv: list[str]) -> int:
     )
     p.add_argument(
         "--vllm-base-url",
-        default=os.getenv("VLLM_BASE_URL") or "",
+        default=_env("VLLM_BASE_URL"),
         help="Optional direct vLLM strong-chat base URL (for model list).",
     )
     p.add_argument(
         "--vllm-fast-base-url",
-        default=os.getenv("VLLM_FAST_BASE_URL") or "",
+        default=_env("VLLM_FAST_BASE_URL"),
         help="Optional direct vLLM fast-chat base URL (for model list).",
     )
     p.add_argument(
         "--vllm-embeddings-base-url",
-        default=os.getenv("VLLM_EMBEDDINGS_BASE_URL") or "",
+        default=_env("VLLM_EMBEDDINGS_BASE_URL"),
         help="Optional direct vLLM embeddings base URL (for model list).",
     )
     p.add_argument(
         "--mlx-base-url",
-        default=os.getenv("MLX_BASE_URL") or "",
+        default=_env("MLX_BASE_URL"),
         help="Optional direct MLX base URL (for model list).",
     )
 
     ns = p.parse_args(argv)
 
-    insecure = ns.insecure or (os.getenv("GATEWAY_TLS_INSECURE") or "").strip().lower() in {"1", "true", "yes", "on"}
-    global _TLS_CONTEXT
-    if insecure:
-        _TLS_CONTEXT = ssl._create_unverified_context()
-    else:
-        _TLS_CONTEXT = ssl.create_default_context()
+    global _TLS_INSECURE
+    _TLS_INSECURE = ns.insecure or _env("GATEWAY_TLS_INSECURE").lower() in {"1", "true", "yes", "on"}
 
     ns.token = (ns.token or "").strip() or _env_gateway_token()
 
@@ -264,34 +396,47 @@ def main(argv: list[str]) -> int:
 
     obs_url = (ns.obs_url or "").strip() or _derive_obs_url(ns.base_url)
 
-    # Gateway queries (best-effort)
-    health = _best_effort(_http_json, "GET", obs_url.rstrip("/") + "/health", headers=bearer, timeout_sec=3.0)
-    upstreams = _best_effort(
-        _http_json,
-        "GET",
-        obs_url.rstrip("/") + "/health/upstreams",
-        headers=bearer,
-        timeout_sec=5.0,
-    )
-    models = _best_effort(_http_json, "GET", ns.base_url.rstrip("/") + "/v1/models", headers=bearer, timeout_sec=10.0)
-
-    # CLI versions
-    vllm_cli = None
-    if shutil.which("vllm"):
-        rc, out = _run_cmd(["vllm", "--version"], timeout_sec=2.0)
-        vllm_cli = {"rc": rc, "output": out}
-
-    # Deployed stamp files written by deploy.sh (best-effort)
-    stamps = _deployed_commit_stamps(app_dir)
-
-    # Optional direct upstream inspection
-    upstream_details = _best_effort(
-        _collect_upstream_versions,
-        vllm_base_url=ns.vllm_base_url.strip(),
-        vllm_fast_base_url=ns.vllm_fast_base_url.strip(),
-        vllm_embeddings_base_url=ns.vllm_embeddings_base_url.strip(),
-        mlx_base_url=ns.mlx_base_url.strip(),
-    )
+    # Gateway queries, direct upstream inspection (best-effort) and the CLI version
+    # check are independent and latency-bound, so they run concurrently while the
+    # stamp files are read.
+    with ThreadPoolExecutor(max_workers=5) as ex:
+        health_f = ex.submit(
+            _best_effort, _http_json, "GET", obs_url.rstrip("/") + "/health", headers=bearer, timeout_sec=3.0
+        )
+        upstreams_f = ex.submit(
+            _best_effort,
+            _http_json,
+            "GET",
+            obs_url.rstrip("/") + "/health/upstreams",
+            headers=bearer,
+            timeout_sec=5.0,
+        )
+        models_f = ex.submit(
+            _best_effort, _http_json, "GET", ns.base_url.rstrip("/") + "/v1/models", headers=bearer, timeout_sec=10.0
+        )
+        upstream_details_f = ex.submit(
+            _best_effort,
+            _collect_upstream_versions,
+            vllm_base_url=ns.vllm_base_url.strip(),
+            vllm_fast_base_url=ns.vllm_fast_base_url.strip(),
+            vllm_embeddings_base_url=ns.vllm_embeddings_base_url.strip(),
+            mlx_base_url=ns.mlx_base_url.strip(),
+        )
+
+        # CLI versions: the fork+exec (and the PATH scan) overlap the probes too.
+        vllm_cli_f = ex.submit(_vllm_cli_version)
+
+        # Deployed stamp files written by deploy.sh (best-effort)
+        stamps = _deployed_commit_stamps(app_dir)
+
+        # _best_effort already turns exceptions into BestEffortField errors.
+        health = health_f.result()
+        upstreams = upstreams_f.result()
+        models = models_f.result()
+        upstream_details = upstream_details_f.result()
+        vllm_cli = vllm_cli_f.result()
+    # All network probes are done; don't leave keep-alive sockets to the GC.
+    _close_http_conns()
 
     manifest: Dict[str, Any] = {
         "schema": "gateway_appliance_release_manifest.v1",
@@ -329,9 +474,20 @@ def main(argv: list[str]) -> int:
     }
 
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=2, sort_keys=True)
-        f.write("\n")
+    out_bytes = _dumps_manifest(manifest)
+    # Write to a sibling temp file and rename so readers never see a partial manifest.
+    fd, tmp_path = tempfile.mkstemp(prefix=".release_manifest.", suffix=".tmp", dir=os.path.dirname(out_path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(out_bytes)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
     print(out_path)
     return 0
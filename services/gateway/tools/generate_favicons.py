@@ -13,6 +13,9 @@ Writes:
 
 Requires Pillow: pip install pillow
 """
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image
 
@@ -20,34 +23,78 @@ SRC = Path("app/static/ai-infra.png")
 OUT = Path("app/static")
 SIZES = [16, 32, 48, 64, 128, 180, 192, 512]
 ICO_SIZES = [16, 32, 48, 64]
+APPLE_TOUCH_SIZE = 180
+# Sizes below this are resized from a BOX-halved intermediate (see main).
+HALVING_MAX_SIZE = 128
 
-if not SRC.exists():
-    raise SystemExit(f"Source icon not found: {SRC}")
 
-im = Image.open(SRC).convert("RGBA")
-for s in SIZES:
+def _one(job):
+    s, base = job
     outp = OUT / f"favicon-{s}.png"
-    im_resized = im.resize((s, s), Image.LANCZOS)
-    im_resized.save(outp, format="PNG")
-    print("wrote", outp)
-
-# apple-touch-icon (180)
-if (OUT / "apple-touch-icon.png").exists():
-    pass
-else:
-    (OUT / "apple-touch-icon.png").write_bytes((OUT / "favicon-180.png").read_bytes())
-
-# favicon-192
-# already created above as favicon-192.png
-
-# Create multi-size ICO
-ico_path = OUT / "favicon.ico"
-# Pillow accepts sizes parameter when saving as ICO
-try:
-    im.save(ico_path, format="ICO", sizes=[(s, s) for s in ICO_SIZES])
-    print("wrote", ico_path)
-except Exception as e:
-    print("failed to write ico:", e)
-    raise
-
-print("Done.")
+    im_resized = base.resize((s, s), Image.LANCZOS)
+    buf = io.BytesIO()
+    im_resized.save(buf, format="PNG", compress_level=6)
+    data = buf.getvalue()
+    outp.write_bytes(data)
+    # apple-touch-icon (180): reuse the encoded bytes rather than reading
+    # favicon-180.png back from disk; an existing icon is left alone.
+    apple = OUT / "apple-touch-icon.png"
+    if s == APPLE_TOUCH_SIZE and not apple.exists():
+        apple.write_bytes(data)
+    # Hand ICO sizes back so the .ico is built from these instead of resampling again.
+    return outp, (im_resized if s in ICO_SIZES else None)
+
+
+def main():
+    if not SRC.exists():
+        raise SystemExit(f"Source icon not found: {SRC}")
+
+    src = Image.open(SRC)
+    # Lets JPEG sources decode at a reduced scale; a no-op for PNG.
+    src.draft("RGBA", (max(SIZES), max(SIZES)))
+    im = src.convert("RGBA")
+
+    # Sizes from HALVING_MAX_SIZE up are resampled straight from the source, as
+    # they always were. Below that, walk largest-first and halve a working copy
+    # with cheap BOX steps while it is more than 2x the target, so those LANCZOS
+    # passes run on a small intermediate instead of the full-resolution source.
+    jobs = []
+    current = im
+    for s in sorted(SIZES, reverse=True):
+        if s >= HALVING_MAX_SIZE:
+            jobs.append((s, im))
+            continue
+        while current.size[0] > 2 * s and current.size[1] > 2 * s:
+            current = current.resize((current.size[0] // 2, current.size[1] // 2), Image.BOX)
+        jobs.append((s, current))
+
+    # The final resize + PNG encode per size is independent work; fan it out.
+    ico_images = {}
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as ex:
+        for (s, _), (outp, resized) in zip(jobs, ex.map(_one, jobs)):
+            print("wrote", outp)
+            if resized is not None:
+                ico_images[s] = resized
+
+    # Create multi-size ICO
+    ico_path = OUT / "favicon.ico"
+    # Pillow takes exact-size frames from append_images and drops any size larger
+    # than the base image, so the largest ICO size is the base.
+    ico_base = ico_images[max(ICO_SIZES)]
+    try:
+        ico_base.save(
+            ico_path,
+            format="ICO",
+            sizes=[(s, s) for s in ICO_SIZES],
+            append_images=[ico_images[s] for s in ICO_SIZES if ico_images[s] is not ico_base],
+        )
+        print("wrote", ico_path)
+    except Exception as e:
+        print("failed to write ico:", e)
+        raise
+
+    print("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
+import argparse
+import atexit
 import json
 import os
 import sys
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 
+from _jsonutil import dumps as _json_dumps, loads as _json_loads
+
 
 def _env(name: str, default: str) -> str:
     value = os.environ.get(name)
@@ -19,16 +23,58 @@ def _base_url() -> str:
     return _env("LIGHTON_OCR_API_BASE_URL", "http://127.0.0.1:9155").rstrip("/")
 
 
-def main() -> int:
-    payload: Dict[str, Any] = json.load(sys.stdin)
-    with httpx.Client(timeout=120.0) as client:
-        resp = client.post(f"{_base_url()}/v1/ocr", json=payload)
-        if resp.status_code >= 400:
-            sys.stdout.write(json.dumps({"error": resp.text, "status": resp.status_code}))
-            return 1
-        sys.stdout.write(resp.text)
-    return 0
+_CLIENT: Optional[httpx.Client] = None
+
+
+def _client() -> httpx.Client:
+    # Created once per process so --jsonl runs reuse one keep-alive connection.
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.Client(
+            timeout=120.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+        atexit.register(_CLIENT.close)
+    return _CLIENT
+
+
+def _ocr(payload: Dict[str, Any]) -> Tuple[bytes, bool]:
+    resp = _client().post(
+        f"{_base_url()}/v1/ocr",
+        content=_json_dumps(payload),
+        headers={"content-type": "application/json"},
+    )
+    if resp.status_code >= 400:
+        return json.dumps({"error": resp.text, "status": resp.status_code}).encode("utf-8"), False
+    return resp.content, True
+
+
+def main(argv: List[str]) -> int:
+    p = argparse.ArgumentParser(description="Run LightOnOCR on JSON payload(s) read from stdin.")
+    p.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Read one JSON payload per line and write one result per line, reusing the connection.",
+    )
+    ns = p.parse_args(argv)
+
+    if not ns.jsonl:
+        out, ok = _ocr(_json_loads(sys.stdin.buffer.read()))
+        sys.stdout.buffer.write(out)
+        return 0 if ok else 1
+
+    all_ok = True
+    for line in sys.stdin.buffer:
+        line = line.strip()
+        if not line:
+            continue
+        out, ok = _ocr(_json_loads(line))
+        all_ok = all_ok and ok
+        # JSON cannot contain raw newlines inside strings, so dropping them keeps one result per line.
+        sys.stdout.buffer.write(out.replace(b"\r", b"").replace(b"\n", b"") + b"\n")
+        sys.stdout.buffer.flush()
+    return 0 if all_ok else 1
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    raise SystemExit(main(sys.argv[1:]))
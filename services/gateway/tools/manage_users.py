@@ -3,9 +3,7 @@ from __future__ import annotations
 import argparse
 import getpass
 import sys
-
-from app.config import S
-from app import user_store
+from types import ModuleType
 
 
 def _prompt_password(label: str) -> str:
@@ -15,40 +13,42 @@ def _prompt_password(label: str) -> str:
     return pw
 
 
-def cmd_create(args: argparse.Namespace) -> int:
+def cmd_create(args: argparse.Namespace, user_store: ModuleType, db_path: str) -> int:
     password = args.password or _prompt_password("New password: ")
     if getattr(args, "admin", False):
-        user = user_store.create_user_with_admin(S.USER_DB_PATH, username=args.username, password=password, admin=True)
+        user = user_store.create_user_with_admin(db_path, username=args.username, password=password, admin=True)
     else:
-        user = user_store.create_user(S.USER_DB_PATH, username=args.username, password=password)
+        user = user_store.create_user(db_path, username=args.username, password=password)
     print(f"created user {user.username} (id={user.id}) admin={getattr(user,'admin',False)}")
     return 0
 
 
-def cmd_reset(args: argparse.Namespace) -> int:
+def cmd_reset(args: argparse.Namespace, user_store: ModuleType, db_path: str) -> int:
     password = args.password or _prompt_password("New password: ")
-    user_store.set_password(S.USER_DB_PATH, username=args.username, password=password)
+    user_store.set_password(db_path, username=args.username, password=password)
     print(f"password updated for {args.username}")
     return 0
 
 
-def cmd_disable(args: argparse.Namespace) -> int:
-    user_store.disable_user(S.USER_DB_PATH, username=args.username, disabled=True)
+def cmd_disable(args: argparse.Namespace, user_store: ModuleType, db_path: str) -> int:
+    user_store.disable_user(db_path, username=args.username, disabled=True)
     print(f"disabled user {args.username}")
     return 0
 
 
-def cmd_enable(args: argparse.Namespace) -> int:
-    user_store.disable_user(S.USER_DB_PATH, username=args.username, disabled=False)
+def cmd_enable(args: argparse.Namespace, user_store: ModuleType, db_path: str) -> int:
+    user_store.disable_user(db_path, username=args.username, disabled=False)
     print(f"enabled user {args.username}")
     return 0
 
 
-def cmd_list(_args: argparse.Namespace) -> int:
-    users = user_store.list_users(S.USER_DB_PATH)
-    for u in users:
-        status = "disabled" if u.disabled else "active"
-        print(f"{u.username}\t{u.id}\t{status}")
+def cmd_list(_args: argparse.Namespace, user_store: ModuleType, db_path: str) -> int:
+    users = user_store.list_users(db_path)
+    if users:
+        # One write for the whole table instead of a print() per user.
+        sys.stdout.write(
+            "".join(f"{u.username}\t{u.id}\t{'disabled' if u.disabled else 'active'}\n" for u in users)
+        )
     return 0
 
 
@@ -79,13 +79,20 @@ def main() -> int:
     p_list.set_defaults(func=cmd_list)
 
     args = parser.parse_args()
+
+    # Deferred: app.config pulls in the full gateway settings surface, which
+    # `--help` and argument errors never need. The commands get the module and
+    # DB path from here rather than importing them again.
+    from app import user_store
+    from app.config import S
+
     try:
         user_store.init_db(S.USER_DB_PATH)
     except Exception as exc:
         print(f"error: failed to init user db ({type(exc).__name__}: {exc})", file=sys.stderr)
         return 1
     try:
-        return args.func(args)
+        return args.func(args, user_store, S.USER_DB_PATH)
     except Exception as exc:
         print(f"error: {exc}", file=sys.stderr)
         return 1